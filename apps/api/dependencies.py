@@ -1,11 +1,17 @@
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
+import hashlib
 import os
+import time
 import jwt
 from fastapi import HTTPException, Depends, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic_settings import BaseSettings
 
+from .lib.metrics import CACHE_LOOKUPS
+from .lib.timing import phase
+
 
 class Settings(BaseSettings):
     """Application settings."""
@@ -16,6 +22,71 @@ class Settings(BaseSettings):
     SUPABASE_URL: Optional[str] = None
     SUPABASE_SERVICE_ROLE_KEY: Optional[str] = None
     SUPABASE_JWT_SECRET: Optional[str] = None
+    SUPABASE_QUERY_TIMEOUT_SECONDS: float = 10.0  # Per-call timeout for database round-trips
+    SUPABASE_MAX_CONCURRENCY: int = 16  # Worker threads (and in-flight queries) per process
+    
+    # Persistence backend: "supabase", or "memory" / "sqlite" for local load testing
+    DATA_BACKEND: str = "supabase"
+    SQLITE_PATH: str = "catered_by_me.db"
+    
+    # In-process recipe library index (see services/library_index.py for refresh lag).
+    # It does not stem words the way Postgres search does, so a search for
+    # "potatoes" misses recipes that only say "potato" while it serves.
+    LIBRARY_INDEX_ENABLED: bool = True
+    LIBRARY_INDEX_REFRESH_SECONDS: float = 30.0  # Max age before a background incremental refresh
+    LIBRARY_INDEX_REBUILD_SECONDS: float = 3600.0  # Full rebuild, which also drops deleted recipes
+    LIBRARY_INDEX_MAX_DOCUMENTS: int = 200_000  # Beyond this, fall back to database search
+    
+    # Ingredient similarity index, built offline (python -m apps.api.services.similarity build)
+    SIMILARITY_INDEX_PATH: str = "similarity_index"
+    
+    # Cache-Control for public endpoints (library, shared event links)
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 60  # Browsers
+    HTTP_CACHE_SHARED_MAX_AGE_SECONDS: int = 300  # CDNs and other shared caches
+    HTTP_CACHE_STALE_WHILE_REVALIDATE_SECONDS: int = 600  # 0 to disable
+    
+    # Response compression (see middleware/compression.py for how the levels were picked)
+    COMPRESSION_MIN_BYTES: int = 1024  # Smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 4
+    COMPRESSION_BROTLI_QUALITY: int = 5  # Used when brotli is installed and the client accepts br
+    
+    # Rate limits (see middleware/rate_limit.py), as JSON merged over the defaults there:
+    # budgets as {"name": [units, window_seconds]}, routes as {"POST /path/{id}": ["budget", cost]}
+    RATE_LIMIT_BUDGETS: dict[str, tuple[int, int]] = {}
+    RATE_LIMIT_ROUTES: dict[str, Optional[tuple[str, int]]] = {}  # null for no limit
+    # Where the counters live: "memory" (one worker), "sqlite" (workers on one host) or "redis"
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = "rate_limits.db"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None  # e.g. redis://localhost:6379/0
+    RATE_LIMIT_SQLITE_BUSY_TIMEOUT_SECONDS: float = 0.05  # Longest wait for another worker's check
+    RATE_LIMIT_FAIL_OPEN: bool = True  # When the store cannot answer: allow the request, or refuse it with a 503
+    
+    # /metrics (Prometheus text format)
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: Optional[str] = None  # If set, scrapers must send "Authorization: Bearer <token>"
+    
+    # Server-Timing header with a per-phase breakdown (see lib/timing.py)
+    SERVER_TIMING_SAMPLE_RATE: float = 0.01  # Fraction of requests timed; 0 to disable
+    SERVER_TIMING_DEBUG: bool = False  # Time every request sending X-Debug-Timing and return each span
+    
+    # Sampling profiler for the routes in PROFILER_ROUTES (see middleware/profiling.py)
+    PROFILER_ENABLED: bool = False  # Profile a PROFILER_SAMPLE_RATE fraction of their requests
+    PROFILER_SAMPLE_RATE: float = 0.01
+    PROFILER_TOKEN: Optional[str] = None  # Requests sending it in X-Profile-Token are always profiled
+    PROFILER_ROUTES: list[str] = [
+        "POST /events/{event_id}/plan",
+        "POST /recipes/parse-text",
+        "POST /schedule/generate",
+    ]
+    PROFILER_INTERVAL_SECONDS: float = 0.005  # Time between stack samples
+    PROFILER_FORMAT: Literal["speedscope", "collapsed"] = "speedscope"
+    PROFILER_DIR: str = "profiles"
+    
+    # Logging (see lib/log_pipeline.py): records are written by a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_QUEUE_SIZE: int = 10_000  # Records waiting to be written; beyond this they are dropped
+    LOG_SAMPLE_RATES: dict[str, float] = {}  # Info logs kept per request, e.g. {"GET /recipes/library": 0.1}
     
     # Stripe settings
     STRIPE_SECRET_KEY: Optional[str] = None
@@ -39,19 +110,29 @@ def get_settings() -> Settings:
 security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user_id(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    settings: Settings = Depends(get_settings),
-) -> Optional[str]:
+# Verified tokens: {sha256(token): (user_id, exp, secret)}, least recently used first
+_verified_tokens: "OrderedDict[bytes, tuple[str, float, str]]" = OrderedDict()
+VERIFIED_TOKEN_CACHE_SIZE = 10_000
+
+
+def verify_token(token: str, settings: Settings) -> str:
     """
-    Verify Supabase JWT and extract user_id.
-    Returns None if no token provided (for anonymous endpoints).
-    Raises HTTPException if token is invalid.
+    Verify a Supabase JWT and return its user_id (the 'sub' claim).
+    Tokens verified before are answered from a bounded LRU until they
+    expire, so the rate limiter and the auth dependencies share one HMAC
+    check per token rather than one each per request.
+    Raises HTTPException if the token is invalid.
     """
-    if not credentials:
-        return None
-    
-    token = credentials.credentials
+    key = hashlib.sha256(token.encode()).digest()
+    cached = _verified_tokens.get(key)
+    if cached is not None:
+        user_id, exp, secret = cached
+        if time.time() < exp and secret == settings.SUPABASE_JWT_SECRET:
+            _verified_tokens.move_to_end(key)
+            CACHE_LOOKUPS.inc("verified_tokens", "hit")
+            return user_id
+        del _verified_tokens[key]
+    CACHE_LOOKUPS.inc("verified_tokens", "miss")
     
     if not settings.SUPABASE_JWT_SECRET:
         # In development, if JWT secret is not set, we can't verify tokens
@@ -70,18 +151,6 @@ async def get_current_user_id(
             algorithms=["HS256"],
             audience="authenticated",
         )
-        
-        # Extract user_id from the 'sub' claim (Supabase standard)
-        user_id = payload.get("sub")
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid token: missing user_id"
-            )
-        
-        return user_id
-        
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=401,
@@ -92,6 +161,39 @@ async def get_current_user_id(
             status_code=401,
             detail=f"Invalid token: {str(e)}"
         )
+    
+    # Extract user_id from the 'sub' claim (Supabase standard)
+    user_id = payload.get("sub")
+    
+    if not user_id:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid token: missing user_id"
+        )
+    
+    # Tokens without an expiry are verified every time
+    if "exp" in payload:
+        _verified_tokens[key] = (user_id, float(payload["exp"]), settings.SUPABASE_JWT_SECRET)
+        if len(_verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    
+    return user_id
+
+
+async def get_current_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    settings: Settings = Depends(get_settings),
+) -> Optional[str]:
+    """
+    Verify Supabase JWT and extract user_id.
+    Returns None if no token provided (for anonymous endpoints).
+    Raises HTTPException if token is invalid.
+    """
+    if not credentials:
+        return None
+    
+    with phase("auth"):
+        return verify_token(credentials.credentials, settings)
 
 
 async def require_auth(
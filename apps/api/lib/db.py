@@ -0,0 +1,85 @@
+"""
+Non-blocking data access for the Supabase client.
+
+supabase-py's query builders are synchronous, so calling ``.execute()`` from an
+``async def`` handler blocks the event loop for the whole Postgres round-trip.
+``execute()`` here runs that round-trip on a bounded worker pool instead and
+enforces a per-call timeout. Every call goes through the single cached client
+from ``supabase_client``, so all requests share its pooled HTTP connections.
+
+Usage:
+    response = await execute(supabase.table("recipes").select("*").eq("id", recipe_id))
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Optional, TypeVar
+
+from ..dependencies import get_settings
+from .metrics import DB_QUERY_SECONDS
+from .timing import record_phase
+
+T = TypeVar("T")
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a database call does not finish within its timeout."""
+
+
+@lru_cache()
+def get_db_executor() -> ThreadPoolExecutor:
+    """
+    Get the shared worker pool for blocking database calls.
+    Its size caps how many queries a worker process has in flight at once.
+    """
+    settings = get_settings()
+    return ThreadPoolExecutor(
+        max_workers=settings.SUPABASE_MAX_CONCURRENCY,
+        thread_name_prefix="supabase",
+    )
+
+
+async def run_blocking(
+    fn: Callable[..., T],
+    *args: Any,
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Run a blocking callable on the database worker pool.
+    Raises QueryTimeoutError if it takes longer than ``timeout`` seconds
+    (defaults to SUPABASE_QUERY_TIMEOUT_SECONDS).
+    """
+    if timeout is None:
+        timeout = get_settings().SUPABASE_QUERY_TIMEOUT_SECONDS
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_db_executor(), partial(fn, *args))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        raise QueryTimeoutError(f"Database call timed out after {timeout:g}s")
+
+
+async def execute(query: Any, timeout: Optional[float] = None) -> Any:
+    """
+    Execute a supabase-py query builder without blocking the event loop.
+    Returns the builder's APIResponse. Its latency is recorded per table
+    (the builder's path, e.g. "recipes" or "rpc/search_recipes") and method,
+    and as a "db" phase of the request.
+    """
+    started = time.perf_counter()
+    try:
+        return await run_blocking(query.execute, timeout=timeout)
+    finally:
+        elapsed = time.perf_counter() - started
+        table = str(getattr(query, "path", "")).lstrip("/") or "unknown"
+        DB_QUERY_SECONDS.observe(elapsed, table, getattr(query, "http_method", "unknown"))
+        record_phase("db", started, elapsed, table)
+
+
+def shutdown_db_executor() -> None:
+    """Stop the worker pool (called on application shutdown)."""
+    if get_db_executor.cache_info().currsize:
+        get_db_executor().shutdown(wait=False, cancel_futures=True)
+        get_db_executor.cache_clear()
@@ -0,0 +1,103 @@
+"""
+Conditional requests and Cache-Control for public, read-mostly endpoints.
+
+Responses carry a strong ETag (from a row's updated_at, or a hash of the
+exact body) and a Cache-Control policy from settings, so browsers and CDNs
+can reuse them and revalidate with If-None-Match / If-Modified-Since. A
+matching validator gets an empty 304 instead of the body.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from ..dependencies import Settings
+from .metrics import CACHE_LOOKUPS
+from .serialization import dumps
+
+
+def cache_control(settings: Settings) -> str:
+    """Cache-Control for public responses, from settings."""
+    directives = [
+        "public",
+        f"max-age={settings.HTTP_CACHE_MAX_AGE_SECONDS}",
+        f"s-maxage={settings.HTTP_CACHE_SHARED_MAX_AGE_SECONDS}",
+    ]
+    if settings.HTTP_CACHE_STALE_WHILE_REVALIDATE_SECONDS:
+        directives.append(f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE_SECONDS}")
+    return ", ".join(directives)
+
+
+def strong_etag(*parts: Any) -> str:
+    """Strong ETag from the values that determine a representation."""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag for an exact response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def http_date(timestamp: str) -> str:
+    """Format an ISO-8601 timestamp for Last-Modified."""
+    dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[str] = None) -> bool:
+    """
+    Evaluate the request's validators (RFC 9110 13.1). If-None-Match wins
+    over If-Modified-Since, and is compared weakly as GET requires.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        opaque = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+
+
+def cached_json(
+    request: Request,
+    content: Any,
+    settings: Settings,
+    etag: Optional[str] = None,
+    updated_at: Optional[str] = None,
+) -> Response:
+    """
+    JSON response with ETag, Last-Modified and Cache-Control, or a 304 when
+    the client's copy is current. Pass etag when it can be derived without
+    rendering (e.g. from updated_at); otherwise it is hashed from the body.
+    """
+    headers = {"Cache-Control": cache_control(settings)}
+    if updated_at:
+        headers["Last-Modified"] = http_date(updated_at)
+
+    body = None
+    if etag is None:
+        body = dumps(content)
+        etag = body_etag(body)
+    headers["ETag"] = etag
+
+    if is_not_modified(request, etag, headers.get("Last-Modified")):
+        CACHE_LOOKUPS.inc("http_revalidation", "hit")
+        return Response(status_code=304, headers=headers)
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        CACHE_LOOKUPS.inc("http_revalidation", "miss")
+    if body is None:
+        body = dumps(content)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,158 @@
+"""
+Logging off the request path, as one JSON object per line.
+
+configure_logging() gives the root logger a single handler that only puts
+the record, unformatted, on a bounded queue. A QueueListener thread started
+by start_logging() (at application startup) takes records off the queue
+and does the formatting and the writes to stderr, so a slow or blocked
+stream never holds up a request. If the queue is full the record is
+dropped and counted in log_records_dropped_total instead of waiting.
+
+Messages use %-style arguments (logger.info("Plan for %s", event_id)), so
+nothing is formatted for disabled levels and the rest is formatted on the
+listener thread. Fields passed in extra= become top-level JSON keys, and
+records logged during a request also carry its method and route template.
+
+Info and debug records of chatty routes can be sampled per request with
+LOG_SAMPLE_RATES ({"METHOD /template": fraction}): a request keeps all or
+none of them. Warnings and errors are always kept.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional, TextIO
+
+from ..dependencies import Settings, get_settings
+from .metrics import LOG_RECORDS_DROPPED
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Loggers that come with their own handlers; their records are routed through the queue too
+SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+# LogRecord attributes that are not extra= fields
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+# [scope, keep] for the current request; keep is decided at its first info record
+_request: ContextVar[Optional[list]] = ContextVar("log_request", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_running = False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, then the extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _RequestFilter(logging.Filter):
+    """Tags records with the current request's route and applies LOG_SAMPLE_RATES."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        state = _request.get()
+        if state is None:
+            return True
+        scope = state[0]
+        route = scope.get("route")
+        record.method = scope["method"]
+        if route is not None:
+            record.route = route.path_format
+        if record.levelno > logging.INFO:
+            return True
+        keep = state[1]
+        if keep is None:
+            if route is None:
+                # Not routed yet, so no rate applies
+                return True
+            rate = get_settings().LOG_SAMPLE_RATES.get(f"{scope['method']} {route.path_format}")
+            keep = state[1] = rate is None or random.random() < rate
+        return keep
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are (formatting happens on the listener) and never blocks."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging(settings: Settings, stream: Optional[TextIO] = None) -> None:
+    """
+    Route the root logger (and the server's loggers) through a queue to a
+    handler writing to stream (default stderr). Replaces any earlier
+    configuration; a running listener is restarted on the new queue.
+    """
+    global _listener
+    running = _running
+    stop_logging()
+
+    output = logging.StreamHandler(sys.stderr if stream is None else stream)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    records: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(_RequestFilter())
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, _DeferredQueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name in SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(records, output)
+    if running:
+        start_logging()
+
+
+def start_logging() -> None:
+    """Start writing queued records (called on application startup)."""
+    global _running
+    if _listener is not None and not _running:
+        _listener.start()
+        _running = True
+
+
+def stop_logging() -> None:
+    """Write out everything queued so far and stop the writer thread."""
+    global _running
+    if _listener is not None and _running:
+        _listener.stop()
+        _running = False
+
+
+def bind_request(scope: dict):
+    """Attribute records logged from here on to the request in scope; returns a token for unbind_request."""
+    return _request.set([scope, None])
+
+
+def unbind_request(token) -> None:
+    _request.reset(token)
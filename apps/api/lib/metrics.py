@@ -0,0 +1,147 @@
+"""
+In-process metrics in the Prometheus text format, served on /metrics.
+
+Counters and histograms keep one small record per label combination. They
+take no locks: every update happens on the event loop thread (database
+timings are observed after the await, not on the worker thread), so an
+update is a dict lookup and a couple of list increments. Each worker
+process keeps and serves its own numbers.
+
+Every series the API exposes is declared at the bottom of this module.
+"""
+from bisect import bisect_left
+from typing import Iterable
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label combination; label values are passed positionally."""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        values = self.values
+        values[labels] = values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Bucketed observations per label combination; label values are passed positionally."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # {labels: [count per bucket..., count above the last, sum]}
+        self.series: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        bounds = [f'le="{_number(bound)}"' for bound in self.buckets] + ['le="+Inf"']
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labels, labels, bound)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {series[-1]!r}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+def size_label(size: int, bounds: tuple[int, ...]) -> str:
+    """The smallest bound at or above size (or "+Inf"), to label a timing by input size."""
+    index = bisect_left(bounds, size)
+    return str(bounds[index]) if index < len(bounds) else "+Inf"
+
+
+def render_metrics() -> str:
+    """Every registered series in the Prometheus text exposition format."""
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+def reset_metrics() -> None:
+    """Drop all recorded values (useful for testing)."""
+    for metric in _registry:
+        if isinstance(metric, Counter):
+            metric.values.clear()
+        else:
+            metric.series.clear()
+
+
+# Series exposed by the API
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template, method and status.", ("route", "method", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to send the full response, by route template.", ("route", "method")
+)
+DB_QUERY_SECONDS = Histogram(
+    "supabase_query_duration_seconds", "Supabase round-trips by table and HTTP method.", ("table", "method")
+)
+
+TASK_COUNT_BOUNDS = (10, 100, 1000, 10000)
+SCHEDULE_SECONDS = Histogram(
+    "schedule_build_duration_seconds", "build_schedule run time by task count (upper bound).", ("tasks",)
+)
+TEXT_SIZE_BOUNDS = (1000, 10000, 100000)
+PARSE_SECONDS = Histogram(
+    "recipe_parse_duration_seconds", "parse_text_recipe run time by input characters (upper bound).", ("chars",)
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result")
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total", "Requests answered 429, by route template and budget.", ("route", "budget")
+)
+RATE_LIMIT_STORE_ERRORS = Counter(
+    "rate_limit_store_errors_total", "Rate limit checks the store could not answer, by outcome.", ("outcome",)
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full."
+)
@@ -0,0 +1,92 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+List endpoints order rows by ``created_at desc, id desc`` and hand out an
+opaque cursor naming the last row of the page. The next page is everything
+strictly after that row, which an index on (created_at, id) answers
+directly. Latency therefore stays flat however deep the client pages, unlike
+OFFSET, which has to scan and discard every earlier row.
+
+Ranked search results page on (rank, created_at, id) instead; their cursors
+carry the rank as well, and the source of the ranking when it is not the
+database (ranks from different scorers are not comparable).
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, Response
+
+
+class Cursor(NamedTuple):
+    """Sort key of the last row on the previous page."""
+    created_at: str
+    id: str
+    rank: Optional[float] = None  # only for ranked search results
+    source: Optional[str] = None  # scorer of rank, if not the database
+
+
+# List endpoints that return a bare JSON array report paging in headers
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# Rows fetched per query when a list endpoint streams its whole result
+STREAM_BATCH_SIZE = 200
+
+
+def encode_cursor(
+    created_at: str, row_id: str, rank: Optional[float] = None, source: Optional[str] = None
+) -> str:
+    """Encode a row's sort key as an opaque, URL-safe cursor (source only goes with a rank)."""
+    key: list = [created_at, row_id]
+    if rank is not None:
+        key.append(rank)
+        if source is not None:
+            key.append(source)
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """
+    Decode a cursor from a query parameter.
+    Raises a 400 if it is malformed, so values are safe to embed in filters.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id, *rest = json.loads(raw)
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        uuid.UUID(row_id)
+        if len(rest) > 2:
+            raise ValueError("too many cursor fields")
+        rank = float(rest[0]) if rest else None
+        source = rest[1] if len(rest) > 1 else None
+        if source is not None and not isinstance(source, str):
+            raise ValueError("cursor source must be a string")
+    except (binascii.Error, ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return Cursor(created_at, row_id, rank, source)
+
+
+def after_cursor(row: dict, cursor: Optional[Cursor]) -> bool:
+    """True if row sorts after cursor in (created_at desc, id desc) order."""
+    if cursor is None:
+        return True
+    return (row["created_at"], str(row["id"])) < (cursor.created_at, cursor.id)
+
+
+def sort_key(row: dict) -> tuple[str, str]:
+    return row["created_at"], str(row["id"])
+
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: Optional[int]) -> None:
+    """Expose a page's cursor and (optional) total on a list response."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
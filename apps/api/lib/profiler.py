@@ -0,0 +1,143 @@
+"""
+Statistical profiles of single requests, written as flame graph input.
+
+A StackSampler thread reads the event loop thread's Python stack every
+interval seconds (sys._current_frames, so nothing is instrumented and the
+profiled code runs unchanged) until stopped, then writes the samples to a
+file in one of two formats:
+
+- "speedscope": JSON for https://www.speedscope.app, one sample per stack
+  weighted by the time it stood for.
+- "collapsed": one "outer;...;inner count" line per distinct stack, as
+  read by flamegraph.pl, inferno and speedscope.
+
+Only the event loop thread is sampled. Synchronous code such as
+build_schedule and parse_text_recipe holds the loop while it runs, so its
+samples belong to the profiled request; while the request awaits, samples
+show the loop idle in the selector or running other requests' code.
+
+The sampler needs the GIL to read the stack, which CPU-bound code hands
+over every sys.getswitchinterval() (5 ms by default), so intervals shorter
+than that only sharpen samples taken while the loop is waiting. Each
+sample is weighted by the time since the previous one, so the profile's
+proportions stay right either way.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+PROFILE_FORMATS = ("speedscope", "collapsed")
+
+# Samples kept per profile (50 s at a 5 ms interval)
+MAX_SAMPLES = 10_000
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def _frame_label(code) -> tuple[str, str, int]:
+    """(name, file, first line) of a code object, with repo paths made relative."""
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    return code.co_qualname, filename, code.co_firstlineno
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's stack on a timer until stop(), then writes the profile to path."""
+
+    def __init__(self, thread_id: int, path: str, name: str, interval: float, fmt: str = "speedscope"):
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format {fmt!r}; expected one of {PROFILE_FORMATS}")
+        super().__init__(name="profiler", daemon=True)
+        self.target_id = thread_id
+        self.path = path
+        self.profile_name = name
+        self.interval = interval
+        self.format = fmt
+        # [(stack of code objects, outermost first, seconds it stood for)]
+        self.samples: list[tuple[tuple, float]] = []
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        """Stop sampling; the file is written on the sampler thread."""
+        self._stop_event.set()
+
+    def run(self) -> None:
+        started = last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            self.samples.append((tuple(reversed(stack)), now - last))
+            last = now
+            if len(self.samples) >= MAX_SAMPLES:
+                break
+        self.write(time.perf_counter() - started)
+
+    def write(self, duration: float) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            if self.format == "collapsed":
+                f.write(self.collapsed())
+            else:
+                json.dump(self.speedscope(duration), f, separators=(",", ":"))
+        # Readers never see a half-written profile
+        os.replace(tmp, self.path)
+
+    def collapsed(self) -> str:
+        counts: dict[tuple, int] = {}
+        for stack, _ in self.samples:
+            counts[stack] = counts.get(stack, 0) + 1
+        lines = []
+        for stack, count in counts.items():
+            names = ";".join(f"{name} ({filename}:{line})" for name, filename, line in map(_frame_label, stack))
+            lines.append(f"{names} {count}\n")
+        return "".join(lines)
+
+    def speedscope(self, duration: float) -> dict:
+        frames: list[dict] = []
+        index: dict = {}
+        samples = []
+        for stack, _ in self.samples:
+            sample = []
+            for code in stack:
+                position = index.get(code)
+                if position is None:
+                    name, filename, line = _frame_label(code)
+                    position = index[code] = len(frames)
+                    frames.append({"name": name, "file": filename, "line": line})
+                sample.append(position)
+            samples.append(sample)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "catered_by_me",
+            "name": self.profile_name,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.profile_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": samples,
+                "weights": [seconds for _, seconds in self.samples],
+            }],
+        }
+
+
+def profile_path(directory: str, label: str, fmt: str, now: Optional[float] = None) -> str:
+    """A new file name under directory for a profile of label (e.g. "POST /events/{event_id}/plan")."""
+    now = time.time() if now is None else now
+    slug = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+    extension = "speedscope.json" if fmt == "speedscope" else "collapsed.txt"
+    return os.path.join(directory, f"{stamp}-{int(now * 1e6) % 1_000_000:06d}-{os.getpid()}-{slug}.{extension}")
@@ -0,0 +1,30 @@
+"""
+Column projection for list endpoints.
+
+List views only need titles and metadata, so they select a lean set of
+columns by default and leave out heavy JSONB columns (``normalized``,
+``source_raw``). Clients opt back in with ``?expand=normalized,source_raw``.
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def expand_columns(
+    base: tuple[str, ...],
+    expand: Optional[str],
+    expandable: tuple[str, ...],
+) -> str:
+    """
+    Build a PostgREST column list from the lean base columns plus the
+    requested expandable ones. Raises a 400 for unknown expand fields.
+    """
+    requested = [f.strip() for f in (expand or "").split(",") if f.strip()]
+    unknown = [f for f in requested if f not in expandable]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot expand {', '.join(unknown)}. Expandable fields: {', '.join(expandable)}",
+        )
+    extra = [f for f in expandable if f in requested]
+    return ", ".join(base + tuple(extra))
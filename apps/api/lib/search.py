@@ -0,0 +1,86 @@
+"""
+Full-text search helpers for the recipe library.
+
+User input is reduced to plain word terms before it goes anywhere near a
+query, so punctuation can never break (or inject into) a PostgREST filter
+or a tsquery. Every term is prefix-matched and all terms must match, so
+"chick parm" finds "Chicken Parmesan" while the user is still typing.
+
+The in-process scorer mirrors the Postgres setup in
+supabase/migrations/add_recipe_library_search.sql: title (A), tags (B),
+ingredient names (C) and description (D), weighted like ts_rank's defaults.
+"""
+import re
+from typing import Iterable, Optional
+
+# Postgres ts_rank default weights for A, B, C, D
+FIELD_WEIGHTS = (
+    ("title", 1.0),
+    ("tags", 0.4),
+    ("ingredients", 0.2),
+    ("description", 0.1),
+)
+
+# Longer queries add cost without improving results
+MAX_TERMS = 8
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(query: Optional[str]) -> list[str]:
+    """Lowercase, de-duplicated word terms from a raw search string."""
+    if not query:
+        return []
+    terms: list[str] = []
+    for word in _WORD.findall(query.lower()):
+        if word not in terms:
+            terms.append(word)
+    return terms[:MAX_TERMS]
+
+
+def to_prefix_tsquery(terms: Iterable[str]) -> str:
+    """AND of prefix matches, for to_tsquery: ``chick:* & parm:*``."""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def to_fts5_query(terms: Iterable[str]) -> str:
+    """AND of prefix matches in SQLite FTS5 syntax: ``"chick"* "parm"*``."""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def ingredient_names(normalized: Optional[dict]) -> list[str]:
+    """Ingredient names from a normalized recipe, tolerating odd shapes."""
+    ingredients = (normalized or {}).get("ingredients")
+    if not isinstance(ingredients, list):
+        return []
+    return [i["name"] for i in ingredients if isinstance(i, dict) and isinstance(i.get("name"), str)]
+
+
+def document_fields(row: dict) -> dict[str, str]:
+    """The searchable text of a library row, by field."""
+    return {
+        "title": row.get("title") or "",
+        "tags": " ".join(row.get("tags") or []),
+        "ingredients": " ".join(ingredient_names(row.get("normalized"))),
+        "description": row.get("description") or "",
+    }
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def rank(row: dict, terms: list[str]) -> Optional[float]:
+    """
+    Weighted prefix-match score of row for terms, or None unless every term
+    matches some field. Unlike Postgres there is no stemming: "potatoes"
+    does not match "potato".
+    """
+    fields = {name: tokenize(text) for name, text in document_fields(row).items()}
+    score = 0.0
+    for term in terms:
+        matched = [w for name, w in FIELD_WEIGHTS if any(t.startswith(term) for t in fields[name])]
+        if not matched:
+            return None
+        score += sum(matched)
+    return score
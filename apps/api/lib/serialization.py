@@ -0,0 +1,88 @@
+"""
+Validate-once JSON responses.
+
+When an endpoint returns model instances through response_model=, FastAPI
+validates them a second time and serializes them through jsonable_encoder.
+Returning a Response skips that step (response_model= still documents the
+endpoint), so these helpers validate row dicts against the response model
+once and write the JSON bytes straight from pydantic-core. Plain data goes
+through orjson when it is installed, and through the standard library
+otherwise.
+
+Long lists can instead be streamed as NDJSON (one JSON document per line),
+encoded batch by batch while the rows are still being fetched.
+"""
+import json
+from functools import lru_cache
+from typing import Annotated, Any, AsyncIterator, Iterable, Optional
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, BeforeValidator, TypeAdapter
+
+from .timing import phase
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Row ids may come back from the database as UUIDs
+Id = Annotated[str, BeforeValidator(str)]
+
+
+@lru_cache(maxsize=None)
+def _orjson():
+    """Import orjson lazily; it is an optional speed-up."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON for models and plain data."""
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.dumps(content, default=jsonable_encoder)
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def validated_json(
+    model: Any,
+    data: Any,
+    status_code: int = 200,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """
+    Response with data validated against model (a response model or e.g.
+    list[Model]) and serialized once. Row dicts can be passed as they come
+    from the repositories; columns the model does not declare are dropped.
+    """
+    adapter = _adapter(model)
+    with phase("serialize"):
+        body = adapter.dump_json(adapter.validate_python(data))
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def ndjson_response(model: Any, batches: AsyncIterator[Iterable[Any]]) -> StreamingResponse:
+    """
+    Newline-delimited JSON, one line per item validated against model,
+    encoded and flushed a batch at a time as batches yields them. Memory
+    holds one batch, however many rows the stream covers.
+    """
+    adapter = _adapter(model)
+
+    async def body():
+        async for batch in batches:
+            yield b"".join(adapter.dump_json(adapter.validate_python(item)) + b"\n" for item in batch)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
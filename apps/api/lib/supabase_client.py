@@ -3,7 +3,7 @@ Supabase client for backend database operations.
 """
 from functools import lru_cache
 from typing import Optional
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from ..dependencies import get_settings, Settings
 
 
@@ -12,6 +12,10 @@ def get_supabase_client() -> Optional[Client]:
     """
     Get a Supabase client instance.
     Returns None if Supabase is not configured (for development).
+
+    The client is created once per process, so every query shares its
+    pooled HTTP connections. Run queries through ``lib.db.execute`` rather
+    than calling ``.execute()`` directly from async code.
     """
     settings = get_settings()
     
@@ -20,7 +24,10 @@ def get_supabase_client() -> Optional[Client]:
     
     return create_client(
         settings.SUPABASE_URL,
-        settings.SUPABASE_SERVICE_ROLE_KEY
+        settings.SUPABASE_SERVICE_ROLE_KEY,
+        options=ClientOptions(
+            postgrest_client_timeout=settings.SUPABASE_QUERY_TIMEOUT_SECONDS,
+        ),
     )
 
 
@@ -0,0 +1,120 @@
+"""
+Per-request phase timings, reported in the Server-Timing response header.
+
+ServerTimingMiddleware starts a RequestTimer for a sampled fraction of
+requests (SERVER_TIMING_SAMPLE_RATE) and keeps it in a context variable, so
+code anywhere below it can add spans without the timer being passed around:
+
+    with phase("hydrate"):
+        recipe = Recipe.model_validate(normalized)
+
+or, where a start time is already taken for /metrics,
+
+    record_phase("db", started, elapsed, "recipes")
+
+Outside a sampled request phase() returns a shared no-op context manager
+and record_phase() returns at once, so the calls can stay in hot paths.
+
+The header sums each phase (e.g. three queries are one "db" entry with
+desc="3x"). With SERVER_TIMING_DEBUG on, a request sending the
+X-Debug-Timing header is always timed and gets every span, in order, as
+JSON in the X-Server-Timing-Detail response header.
+"""
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Optional
+
+SERVER_TIMING_HEADER = "Server-Timing"
+SERVER_TIMING_DETAIL_HEADER = "X-Server-Timing-Detail"
+DEBUG_TIMING_REQUEST_HEADER = "X-Debug-Timing"
+
+# Spans kept per request; later ones still count towards the header totals
+MAX_SPANS = 200
+
+_current: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+_NOT_TIMED = nullcontext()
+
+
+class RequestTimer:
+    """Spans recorded during one request, as (phase, start offset, seconds, detail)."""
+
+    __slots__ = ("started", "spans", "totals", "token")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.token = None
+        self.spans: list[tuple[str, float, float, Optional[str]]] = []
+        # {phase: [seconds, count]}, in order of first use
+        self.totals: dict[str, list] = {}
+
+    def add(self, name: str, started: float, seconds: float, detail: Optional[str] = None) -> None:
+        total = self.totals.get(name)
+        if total is None:
+            self.totals[name] = [seconds, 1]
+        else:
+            total[0] += seconds
+            total[1] += 1
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append((name, started - self.started, seconds, detail))
+
+    def header(self) -> str:
+        """The Server-Timing value: one entry per phase plus the total so far, in milliseconds."""
+        entries = [
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="{count}x"' if count > 1 else "")
+            for name, (seconds, count) in self.totals.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def detail(self) -> list[dict]:
+        """Every kept span in order, for the debug header."""
+        return [
+            {"phase": name, "start_ms": round(offset * 1000, 3), "ms": round(seconds * 1000, 3), **(
+                {"detail": detail} if detail is not None else {}
+            )}
+            for name, offset, seconds, detail in self.spans
+        ]
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "detail", "started")
+
+    def __init__(self, timer: RequestTimer, name: str, detail: Optional[str]):
+        self.timer = timer
+        self.name = name
+        self.detail = detail
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        started = self.started
+        self.timer.add(self.name, started, time.perf_counter() - started, self.detail)
+
+
+def phase(name: str, detail: Optional[str] = None):
+    """Context manager timing its block as a span of the current request, if it is sampled."""
+    timer = _current.get()
+    if timer is None:
+        return _NOT_TIMED
+    return _Phase(timer, name, detail)
+
+
+def record_phase(name: str, started: float, seconds: float, detail: Optional[str] = None) -> None:
+    """Add a span measured by the caller (started is a perf_counter() reading)."""
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, started, seconds, detail)
+
+
+def start_request_timer() -> RequestTimer:
+    """Time the rest of the current request (called by ServerTimingMiddleware)."""
+    timer = RequestTimer()
+    timer.token = _current.set(timer)
+    return timer
+
+
+def stop_request_timer(timer: RequestTimer) -> None:
+    """Stop recording spans into timer."""
+    _current.reset(timer.token)
@@ -1,30 +1,65 @@
 from datetime import datetime
 from typing import Optional
+import hmac
 import logging
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from starlette.requests import Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
 from .dependencies import get_settings, Settings, require_auth
-from .middleware.rate_limit import check_rate_limit
+from .middleware.compression import CompressionMiddleware
+from .middleware.log_context import LogContextMiddleware
+from .middleware.metrics import MetricsMiddleware
+from .middleware.profiling import ProfilingMiddleware, compile_profiled_routes
+from .middleware.rate_limit import RATE_LIMITS, ROUTE_POLICIES, RateLimitMiddleware, compile_policies
+from .middleware.rate_limit_stores import get_rate_limit_store
+from .middleware.server_timing import ServerTimingMiddleware
+from .lib.db import run_blocking, shutdown_db_executor
+from .lib.log_pipeline import configure_logging, start_logging, stop_logging
+from .lib.metrics import render_metrics
+from .lib.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from .lib.timing import SERVER_TIMING_DETAIL_HEADER
+from .repositories import get_repositories
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging: records are queued here and written by a background thread
+configure_logging(get_settings())
 logger = logging.getLogger(__name__)
 from .models.recipes import Recipe
 from .models.schedule import Schedule
 from .services.parsing import parse_text_recipe
 from .services.scheduler import build_schedule
-from .routers import recipes, events, waitlist, gift_codes, billing
+from .routers import recipes, events, waitlist, gift_codes, billing, menus
 from .routers import recipe_library
 
 app = FastAPI(title="Catered By Me API", version="0.1.0")
 
+
+@app.on_event("startup")
+async def startup():
+    """
+    Start the log writer, open the rate limit store, and compile the rate
+    limit policies and profiled routes against the final route table.
+    """
+    start_logging()
+    settings = get_settings()
+    app.state.rate_limit_policies = compile_policies(
+        app.routes,
+        {**RATE_LIMITS, **settings.RATE_LIMIT_BUDGETS},
+        {**ROUTE_POLICIES, **settings.RATE_LIMIT_ROUTES},
+    )
+    app.state.profiled_routes = compile_profiled_routes(app.routes, settings.PROFILER_ROUTES)
+    # Opening a shared store can wait on other workers, so not on the first request
+    await run_blocking(get_rate_limit_store)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release the database worker pool and write out queued log records."""
+    shutdown_db_executor()
+    stop_logging()
+
+
 origins = [
     "http://localhost:3000",
     "http://localhost:5173",
@@ -32,63 +67,42 @@ origins = [
     "https://www.cateredby.me",
 ]
 
+# Innermost, so it sees the matched route
+app.add_middleware(MetricsMiddleware)
+
+# Inside the rate limiter, so refused requests are not profiled
+app.add_middleware(ProfilingMiddleware)
+
+# Inside CORS, so 429s carry CORS headers and preflights are not counted
+app.add_middleware(RateLimitMiddleware)
+
+# Outside the rate limiter, so its token checks and 429s are timed
+app.add_middleware(ServerTimingMiddleware)
+
+# Outside everything that logs during a request
+app.add_middleware(LogContextMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, SERVER_TIMING_DETAIL_HEADER],
 )
 
-
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    """Simple rate limiting middleware"""
-    # Get path as string
-    path = str(request.url.path)
-    
-    # Skip rate limiting for health check, webhooks, and public endpoints
-    if path in ["/health", "/docs", "/openapi.json", "/billing/webhook"] or path.startswith("/recipes/library"):
-        return await call_next(request)
-    
-    # Get user ID from auth header if present
-    auth_header = request.headers.get("Authorization")
-    user_id = "anonymous"
-    
-    if auth_header and auth_header.startswith("Bearer "):
-        try:
-            # Extract user ID from JWT (simplified - in production use proper JWT parsing)
-            # For now, use a hash of the token as user identifier
-            token = auth_header.split(" ")[1]
-            user_id = token[:16]  # Simplified user ID
-        except Exception:
-            pass
-    
-    # Check rate limit
-    allowed, retry_after = check_rate_limit(user_id, path)
-    
-    if not allowed:
-        logger.warning(f"Rate limit exceeded for {user_id} on {path}")
-        return JSONResponse(
-            status_code=429,
-            content={
-                "error": "rate_limit_exceeded",
-                "message": "You're making requests a bit too quickly. Take a breath and try again in a minute.",
-                "retry_after": retry_after,
-            },
-            headers={"Retry-After": str(retry_after)},
-        )
-    
-    response = await call_next(request)
-    return response
+# Outermost, so every response (including 429s and errors) goes through it
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
+# recipe_library goes first: /recipes/library would otherwise match /recipes/{recipe_id}
+app.include_router(recipe_library.router)
 app.include_router(recipes.router)
 app.include_router(events.router)
 app.include_router(waitlist.router)
 app.include_router(gift_codes.router)
 app.include_router(billing.router)
-app.include_router(recipe_library.router)
+app.include_router(menus.router)
 
 
 @app.get("/health")
@@ -97,6 +111,22 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request, settings: Settings = Depends(get_settings)):
+    """
+    Request, database, scheduler, cache and rate limit metrics in the
+    Prometheus text format. Off unless METRICS_ENABLED; with METRICS_TOKEN
+    set, only for requests bearing it.
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+        if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected):
+            raise HTTPException(status_code=401, detail="Unauthorized", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # Recipe endpoints
 
 class ParseTextRequest(BaseModel):
@@ -184,16 +214,14 @@ async def get_current_user_profile(
     Requires authentication.
     """
     try:
-        from .lib.supabase_client import require_supabase
-        supabase = require_supabase()
+        repos = get_repositories()
         
-        response = supabase.table("profiles").select("*").eq("id", user_id).execute()
+        row = await repos.profiles.get(user_id)
         
-        if not response.data:
+        if not row:
             # Profile might not exist yet (shouldn't happen due to trigger, but handle gracefully)
             raise HTTPException(status_code=404, detail="Profile not found")
         
-        row = response.data[0]
         return ProfileResponse(
             id=str(row["id"]),
             email=row["email"],
@@ -221,8 +249,7 @@ async def update_current_user_profile(
     Requires authentication.
     """
     try:
-        from .lib.supabase_client import require_supabase
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Build update dict
         update_data = {}
@@ -239,12 +266,11 @@ async def update_current_user_profile(
             # No fields to update, return existing profile
             return await get_current_user_profile(user_id, settings)
         
-        response = supabase.table("profiles").update(update_data).eq("id", user_id).execute()
+        row = await repos.profiles.update(user_id, update_data)
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=500, detail="Failed to update profile")
         
-        row = response.data[0]
         return ProfileResponse(
             id=str(row["id"]),
             email=row["email"],
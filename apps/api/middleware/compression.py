@@ -0,0 +1,214 @@
+"""
+Negotiated gzip / brotli compression for JSON responses.
+
+Schedules and recipe lists are repetitive JSON (station names, ISO
+timestamps, task labels) and shrink to around a tenth of their size, which
+matters on the mobile connections hosts use on event day. Responses are
+compressed when the client accepts it, the body is JSON or text, and it is
+at least COMPRESSION_MIN_BYTES long; smaller bodies gain too little to be
+worth the CPU and the extra headers. Streamed responses are compressed
+chunk by chunk and flushed, so each batch still reaches the client as soon
+as it is sent.
+
+brotli is an optional dependency; without it only gzip is offered. The
+default levels (gzip 4, brotli 5) were chosen on a 300-task plan: going
+higher costs several times the CPU for a few hundred bytes.
+
+The Stripe webhook is never touched, and responses that already carry a
+Content-Encoding are passed through.
+"""
+import zlib
+from functools import lru_cache
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..dependencies import get_settings
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+EXCLUDED_PATHS = frozenset({"/billing/webhook"})
+
+
+@lru_cache(maxsize=None)
+def _brotli():
+    """Import brotli lazily; without it only gzip is offered."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Encodings we can produce, most preferred first."""
+    return ("br", "gzip") if _brotli() is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str, available: tuple[str, ...]) -> Optional[str]:
+    """
+    Pick the encoding with the highest q-value in an Accept-Encoding header
+    (ties go to the earlier entry of available), or None for identity.
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Encoder:
+    """Incremental gzip or brotli stream."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = _brotli().Compressor(quality=brotli_quality)
+        else:
+            self._gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compressed bytes for data; flushed so the client can decode everything sent so far."""
+        if self.encoding == "br":
+            return self._br.process(data) + (self._br.finish() if final else self._br.flush())
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses per Accept-Encoding (see module docstring)."""
+
+    def __init__(self, app: ASGIApp, excluded_paths: frozenset[str] = EXCLUDED_PATHS):
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+        settings = get_settings()
+        request_headers = Headers(scope=scope)
+        responder = _CompressingSend(
+            send,
+            negotiate_encoding(request_headers.get("accept-encoding", ""), available_encodings()),
+            request_headers.get("if-none-match", ""),
+            settings.COMPRESSION_MIN_BYTES,
+            settings.COMPRESSION_GZIP_LEVEL,
+            settings.COMPRESSION_BROTLI_QUALITY,
+        )
+        await self.app(scope, receive, responder)
+
+
+class _CompressingSend:
+    """
+    Wraps send for one response. The start message is held until enough of
+    the body has arrived to tell whether it is worth compressing.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        encoding: Optional[str],
+        if_none_match: str,
+        minimum_size: int,
+        gzip_level: int,
+        brotli_quality: int,
+    ):
+        self.send = send
+        self.encoding = encoding
+        self.if_none_match = if_none_match
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.start: Optional[Message] = None
+        self.pending: list[bytes] = []
+        self.pending_size = 0
+        self.encoder: Optional[_Encoder] = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            # Responses with a Content-Length can still arrive in several
+            # chunks (e.g. through BaseHTTPMiddleware); they are already in
+            # memory, so collect them and compress in one go. Streams are
+            # buffered up to the threshold, then compressed chunk by chunk.
+            self.pending.append(body)
+            self.pending_size += len(body)
+            sized = any(name.lower() == b"content-length" for name, _ in self.start["headers"])
+            if more_body and (sized or self.pending_size < self.minimum_size):
+                return
+            body = b"".join(self.pending)
+            self.pending = []
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            self._negotiate(start["status"], headers, body, more_body)
+            if self.encoder is not None:
+                body = self.encoder.compress(body, final=not more_body)
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    headers["content-length"] = str(len(body))
+            await self.send(start)
+        elif self.encoder is not None:
+            body = self.encoder.compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    def _negotiate(self, status: int, headers: MutableHeaders, body: bytes, more_body: bool) -> None:
+        """Decide from the first chunk whether to compress, and adjust the headers to match."""
+        if status == 304:
+            # Echo the ETag in the form the client has: weak if what it
+            # cached was a compressed body
+            etag = headers.get("etag")
+            if etag and f"W/{etag}" in self.if_none_match:
+                _weaken_etag(headers)
+            return
+        compressible = (
+            status != 204
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            # Anything still streaming has already passed the threshold
+            and (more_body or len(body) >= self.minimum_size)
+        )
+        if not compressible:
+            return
+        headers.add_vary_header("Accept-Encoding")
+        if not self.encoding:
+            return
+        self.encoder = _Encoder(self.encoding, self.gzip_level, self.brotli_quality)
+        headers["Content-Encoding"] = self.encoding
+        _weaken_etag(headers)
+
+
+def _weaken_etag(headers: MutableHeaders) -> None:
+    """
+    A compressed body is a different representation of the same data, so its
+    ETag can only be weak. Conditional requests compare ETags weakly, so
+    revalidation keeps working.
+    """
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
@@ -0,0 +1,24 @@
+"""
+Ties log records to the request being handled (see lib/log_pipeline.py),
+for their method and route fields and per-route sampling.
+"""
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..lib.log_pipeline import bind_request, unbind_request
+
+
+class LogContextMiddleware:
+    """ASGI middleware binding each HTTP request's scope to the records logged while it runs."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = bind_request(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            unbind_request(token)
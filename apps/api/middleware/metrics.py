@@ -0,0 +1,48 @@
+"""
+Request count and latency per route template, for /metrics.
+
+The route is read back from the scope once the app has handled the
+request (routing stores the matched route there), so "/events/123/plan"
+counts as "/events/{event_id}/plan" and the number of series stays bounded.
+Requests no route matched count as "unmatched". It sits inside the rate
+limiter: 429s are counted by rate_limit_rejections_total instead.
+"""
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..lib.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk is sent."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                template = route.path_format
+            else:
+                # Plain Starlette routes (the docs) have no template but a fixed path
+                template = scope["path"] if "endpoint" in scope else "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.inc(template, method, str(status))
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, template, method)
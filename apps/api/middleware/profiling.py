@@ -0,0 +1,104 @@
+"""
+Opt-in sampling profiler for selected routes (see lib/profiler.py).
+
+Only routes in PROFILER_ROUTES ("METHOD /template" keys, resolved against
+the route table at startup into app.state.profiled_routes) are ever
+profiled. A request to one of them is profiled when:
+
+- PROFILER_ENABLED is on, for a PROFILER_SAMPLE_RATE fraction of requests, or
+- PROFILER_TOKEN is set and the request sends it in X-Profile-Token. The
+  response then names the file in X-Profile-File.
+
+Profiles go to PROFILER_DIR in PROFILER_FORMAT, sampled every
+PROFILER_INTERVAL_SECONDS. With both switches off, requests pay one
+settings read here.
+"""
+import hmac
+import logging
+import os
+import random
+import threading
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..dependencies import get_settings
+from ..lib.profiler import StackSampler, profile_path
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_FILE_HEADER = "X-Profile-File"
+
+
+def compile_profiled_routes(routes: Iterable, allowlist: Iterable[str]) -> list[tuple[str, object, str]]:
+    """
+    (method, path regex, key) for every allowlisted "METHOD /template".
+    Raises ValueError for an entry no route has.
+    """
+    wanted = set(allowlist)
+    compiled = []
+    for route in routes:
+        template = getattr(route, "path_format", None)
+        for method in getattr(route, "methods", None) or ():
+            key = f"{method} {template}"
+            if key in wanted:
+                compiled.append((method, route.path_regex, key))
+                wanted.discard(key)
+    if wanted:
+        raise ValueError(f"PROFILER_ROUTES has no matching route: {', '.join(sorted(wanted))}")
+    return compiled
+
+
+def _match(profiled: list, method: str, path: str) -> Optional[str]:
+    for route_method, regex, key in profiled:
+        if route_method == method and regex.match(path):
+            return key
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running a StackSampler for the length of selected requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        settings = get_settings()
+        if not settings.PROFILER_ENABLED and not settings.PROFILER_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        forced = False
+        if settings.PROFILER_TOKEN:
+            token = Headers(scope=scope).get(PROFILE_TOKEN_HEADER)
+            forced = token is not None and hmac.compare_digest(token.encode(), settings.PROFILER_TOKEN.encode())
+        if not forced and not (settings.PROFILER_ENABLED and random.random() < settings.PROFILER_SAMPLE_RATE):
+            await self.app(scope, receive, send)
+            return
+        key = _match(scope["app"].state.profiled_routes, scope["method"], scope["path"])
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        path = profile_path(settings.PROFILER_DIR, key, settings.PROFILER_FORMAT)
+        sampler = StackSampler(
+            threading.get_ident(), path, f"{key} ({scope['path']})",
+            settings.PROFILER_INTERVAL_SECONDS, settings.PROFILER_FORMAT,
+        )
+
+        async def send_with_file(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_FILE_HEADER, os.path.basename(path))
+            await send(message)
+
+        logger.info("Profiling %s %s to %s", scope["method"], scope["path"], path)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_file if forced else send)
+        finally:
+            sampler.stop()
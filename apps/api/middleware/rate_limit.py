@@ -1,61 +1,280 @@
 """
-Simple in-memory rate limiting middleware.
-For production, consider using Redis or a dedicated rate limiting service.
+Rate limiting middleware.
+
+Limits are budgets of units per window, and each route spends a cost from
+one budget: recipe and event writes cost more than reads, and plan
+generation has a budget of its own. Routes are matched on their FastAPI
+path template (so /events/123/plan is "/events/{event_id}/plan"), using a
+lookup table compiled from the app's routes and the policy config at
+startup; see compile_policies.
+
+Budgets are enforced with a sliding-window counter: each (user, budget)
+pair keeps the number of requests in the current fixed window and in the
+previous one, and the previous count is weighted by how much of it still
+overlaps the sliding window. That is one small record per key and constant
+work per request, at the price of assuming the previous window's requests
+were spread evenly. The records live in the store picked by
+RATE_LIMIT_BACKEND (see rate_limit_stores.py): this process's memory by
+default, or SQLite or Redis to share limits between workers. Checks against
+those two run on the worker pool, and when the store cannot answer in time
+the request is let through, or refused with a 503 if RATE_LIMIT_FAIL_OPEN
+is off.
+
+RateLimitMiddleware is plain ASGI rather than BaseHTTPMiddleware, so
+allowed requests (and their streamed responses) pass straight through
+without an extra task or re-wrapped body stream.
 """
+import logging
 import time
-from collections import defaultdict
-from typing import Dict, Tuple
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..dependencies import get_settings, verify_token
+from ..lib.db import QueryTimeoutError, run_blocking
+from ..lib.metrics import RATE_LIMIT_REJECTIONS, RATE_LIMIT_STORE_ERRORS
+from ..lib.timing import phase
+from .rate_limit_stores import RateLimitStoreUnavailable, get_rate_limit_store
 
-# In-memory store: {user_id: [(timestamp, endpoint), ...]}
-_request_history: Dict[str, list[Tuple[float, str]]] = defaultdict(list)
+logger = logging.getLogger(__name__)
 
-# Rate limits per endpoint (requests per window)
+# Budgets: name -> (units per window, window in seconds)
 RATE_LIMITS = {
-    "/schedule/generate": (10, 60),  # 10 requests per 60 seconds
-    "/recipes": (20, 3600),  # 20 requests per hour
-    "/events": (20, 3600),  # 20 requests per hour
-    "/events/{id}/plan": (10, 60),  # 10 requests per minute
+    "schedule": (10, 60),  # 10 requests per minute
+    "plan": (10, 60),  # 10 plan generations per minute
+    "recipes": (60, 3600),  # 60 reads or 20 writes per hour
+    "events": (60, 3600),  # 60 reads or 20 writes per hour
+    "default": (100, 3600),  # 100 requests per hour
 }
 
-# Default limit
-DEFAULT_LIMIT = (100, 3600)  # 100 requests per hour
+# Route template -> (budget, cost per request), or None for no limit.
+# Keys may start with a method ("GET /recipes") and end with "*" to cover
+# every template with that prefix. An exact template wins over a "*" key,
+# a longer prefix over a shorter one, and a key with a method over one
+# without. Routes nothing matches cost 1 from the default budget.
+ROUTE_POLICIES: dict[str, Optional[Tuple[str, int]]] = {
+    "/health": None,
+    "/docs": None,
+    "/openapi.json": None,
+    "/metrics": None,  # Scrapers have no user budget; the endpoint checks METRICS_TOKEN itself
+    "/billing/webhook": None,
+    "/recipes/library*": None,  # Public and cached
+    "/schedule/generate": ("schedule", 1),
+    "/events/{event_id}/plan": ("plan", 1),
+    "GET /recipes*": ("recipes", 1),
+    "/recipes*": ("recipes", 3),
+    "GET /events*": ("events", 1),
+    "/events*": ("events", 3),
+    "/menus/build": ("default", 5),
+}
+
+DEFAULT_BUDGET = "default"
+
+# Longest a check against a shared store may take, including waiting for a pool thread
+STORE_TIMEOUT_SECONDS = 1.0
+
+
+class RatePolicy(NamedTuple):
+    """What a request to one route spends, and from which budget."""
+    template: str
+    budget: str
+    limit: int
+    window: int
+    cost: int
 
 
-def check_rate_limit(user_id: str, endpoint: str) -> Tuple[bool, int]:
+def check_rate_limit(user_id: str, policy: RatePolicy, now: Optional[float] = None) -> Tuple[bool, int]:
     """
-    Check if user has exceeded rate limit for endpoint.
+    Check if user can spend policy.cost from its budget, and spend it if so.
     Returns (allowed, retry_after_seconds)
     """
-    # Normalize endpoint (remove IDs)
-    normalized = endpoint.split("/")[0] + "/" + endpoint.split("/")[1] if "/" in endpoint else endpoint
-    
-    # Get limit for this endpoint
-    limit, window = RATE_LIMITS.get(normalized, DEFAULT_LIMIT)
-    
-    now = time.time()
-    user_history = _request_history[user_id]
-    
-    # Clean old entries (outside window)
-    cutoff = now - window
-    user_history[:] = [(ts, ep) for ts, ep in user_history if ts > cutoff]
-    
-    # Count requests in window for this endpoint
-    count = sum(1 for ts, ep in user_history if ep == normalized)
-    
-    if count >= limit:
-        # Find oldest request in window to calculate retry_after
-        oldest = min((ts for ts, ep in user_history if ep == normalized), default=now)
-        retry_after = int(window - (now - oldest)) + 1
-        return False, retry_after
-    
-    # Add this request
-    user_history.append((now, normalized))
-    
-    return True, 0
+    if now is None:
+        now = time.time()
+    retry_after = get_rate_limit_store().hit(user_id, policy.budget, policy.limit, policy.window, policy.cost, now)
+    return not retry_after, retry_after
+
+
+async def check_rate_limit_nonblocking(user_id: str, policy: RatePolicy) -> Tuple[bool, int]:
+    """
+    check_rate_limit for the event loop: checks against a store that does
+    I/O run on the worker pool. Raises RateLimitStoreUnavailable if the
+    store cannot answer within STORE_TIMEOUT_SECONDS.
+    """
+    if not get_rate_limit_store().blocking:
+        return check_rate_limit(user_id, policy)
+    try:
+        return await run_blocking(check_rate_limit, user_id, policy, timeout=STORE_TIMEOUT_SECONDS)
+    except QueryTimeoutError as e:
+        raise RateLimitStoreUnavailable(str(e)) from e
 
 
 def clear_rate_limit(user_id: str):
     """Clear rate limit history for a user (useful for testing)"""
-    if user_id in _request_history:
-        del _request_history[user_id]
+    get_rate_limit_store().clear(user_id)
+
+
+class PolicyTable:
+    """
+    Route policies compiled for lookup by method and path. Paths under an
+    exempt "*" key (for any method) return straight away, static paths are
+    a dict lookup, and templated paths are tried in the app's routing order,
+    but only those for the same method whose first segment matches.
+    """
+
+    def __init__(self, default: RatePolicy, exempt_prefixes: tuple[str, ...] = ()):
+        self.default = default
+        self.exempt_prefixes = exempt_prefixes
+        self.static: dict[Tuple[str, str], Optional[RatePolicy]] = {}
+        self.templated: dict[Tuple[str, str], list] = {}
+
+    def lookup(self, method: str, path: str) -> Optional[RatePolicy]:
+        """Policy of the route that will handle the request, or None for no limit."""
+        if path.startswith(self.exempt_prefixes):
+            return None
+        try:
+            return self.static[method, path]
+        except KeyError:
+            pass
+        for regex, policy in self.templated.get((method, _first_segment(path)), ()):
+            if regex.match(path):
+                return policy
+        return self.default
+
+
+def _first_segment(path: str) -> str:
+    return path.split("/", 2)[1] if path.startswith("/") else ""
+
+
+def _resolve(method: str, template: str, policies: dict) -> Tuple[bool, Optional[Tuple[str, int]]]:
+    """(found, entry) for a route from the ROUTE_POLICIES-style config."""
+    for key in (f"{method} {template}", template):
+        if key in policies:
+            return True, policies[key]
+    best = None
+    for key, entry in policies.items():
+        if not key.endswith("*"):
+            continue
+        prefix_method, _, prefix = key[:-1].rpartition(" ")
+        if prefix_method not in ("", method) or not template.startswith(prefix):
+            continue
+        rank = (len(prefix), bool(prefix_method))
+        if best is None or rank > best[0]:
+            best = (rank, entry)
+    return (True, best[1]) if best else (False, None)
+
+
+def compile_policies(
+    routes: Iterable,
+    budgets: Optional[dict] = None,
+    policies: Optional[dict] = None,
+) -> PolicyTable:
+    """
+    Resolve the policy of every route up front (see ROUTE_POLICIES for how
+    config keys match templates). budgets and policies default to
+    RATE_LIMITS and ROUTE_POLICIES. Raises ValueError for an unknown budget
+    or a cost the budget can never cover.
+    """
+    budgets = RATE_LIMITS if budgets is None else budgets
+    policies = ROUTE_POLICIES if policies is None else policies
+
+    def policy(template: str, entry: Tuple[str, int]) -> RatePolicy:
+        budget, cost = entry
+        if budget not in budgets:
+            raise ValueError(f"Rate limit policy for {template} uses unknown budget {budget!r}")
+        limit, window = budgets[budget]
+        if not 0 < cost <= limit:
+            raise ValueError(f"Rate limit cost {cost} for {template} must be between 1 and {limit}")
+        return RatePolicy(template, budget, limit, window, cost)
+
+    exempt_prefixes = tuple(
+        key[:-1] for key, entry in policies.items() if entry is None and key.endswith("*") and " " not in key
+    )
+    table = PolicyTable(policy("*", (DEFAULT_BUDGET, 1)), exempt_prefixes)
+    templated: list = []
+    for route in routes:
+        template = getattr(route, "path_format", None)
+        methods = getattr(route, "methods", None)
+        if template is None or not methods:
+            continue
+        for method in methods:
+            found, entry = _resolve(method, template, policies)
+            if not found:
+                resolved = table.default
+            else:
+                resolved = policy(template, entry) if entry is not None else None
+            if "{" in template:
+                templated.append((method, route.path_regex))
+                table.templated.setdefault((method, _first_segment(template)), []).append((route.path_regex, resolved))
+            elif not any(method == m and regex.match(template) for m, regex in templated):
+                # Unless an earlier templated route takes the path first
+                table.static.setdefault((method, template), resolved)
+    return table
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware answering 429 once a caller's budget for the route is
+    spent. Callers are keyed on their verified user id (see verify_token,
+    whose cache the auth dependencies then hit); requests without a valid
+    token share the "anonymous" budget. Policies come from the table that
+    main.py compiles into app.state.rate_limit_policies at startup.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        policy = scope["app"].state.rate_limit_policies.lookup(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = "anonymous"
+        scheme, token = get_authorization_scheme_param(Headers(scope=scope).get("authorization"))
+        if scheme.lower() == "bearer" and token:
+            try:
+                with phase("auth"):
+                    user_id = verify_token(token, get_settings())
+            except HTTPException:
+                pass
+
+        try:
+            with phase("rate_limit"):
+                allowed, retry_after = await check_rate_limit_nonblocking(user_id, policy)
+        except RateLimitStoreUnavailable as e:
+            fail_open = get_settings().RATE_LIMIT_FAIL_OPEN
+            RATE_LIMIT_STORE_ERRORS.inc("allowed" if fail_open else "refused")
+            logger.warning("Rate limit store unavailable (%s); %s request", e, "allowing" if fail_open else "refusing")
+            if fail_open:
+                await self.app(scope, receive, send)
+                return
+            response = JSONResponse(
+                status_code=503,
+                content={"error": "rate_limit_unavailable", "message": "Please try again in a moment.", "retry_after": 1},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        if allowed:
+            await self.app(scope, receive, send)
+            return
 
+        RATE_LIMIT_REJECTIONS.inc(policy.template, policy.budget)
+        logger.warning("Rate limit exceeded for %s on %s (%s)", user_id, policy.template, policy.budget)
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "error": "rate_limit_exceeded",
+                "message": "You're making requests a bit too quickly. Take a breath and try again in a minute.",
+                "retry_after": retry_after,
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
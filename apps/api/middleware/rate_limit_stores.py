@@ -0,0 +1,353 @@
+"""
+Where rate limit counters live.
+
+Counters kept in one process's memory are only right with a single worker:
+with N uvicorn workers every limit is effectively N times larger. The
+RATE_LIMIT_BACKEND setting picks a store:
+
+- "memory" (default): an LRU dict in this process, for a single worker.
+- "sqlite": a WAL-mode SQLite file at RATE_LIMIT_SQLITE_PATH, shared by
+  every worker on the host. Each check is one short write transaction.
+- "redis": any Redis-protocol server at RATE_LIMIT_REDIS_URL, shared by
+  every host. Each check is one server-side script call. Needs the redis
+  package, imported lazily.
+
+All three implement the same sliding-window counter (see rate_limit.py):
+per key, the start of the current fixed window and the units spent in it
+and in the previous one, updated atomically by hit().
+
+The SQLite and Redis stores block on I/O, so they are marked blocking and
+the middleware runs their checks on the worker pool (lib/db.run_blocking).
+Neither waits long: SQLite gives up on a write lock another worker holds
+after RATE_LIMIT_SQLITE_BUSY_TIMEOUT_SECONDS, Redis after
+REDIS_TIMEOUT_SECONDS, and both then raise RateLimitStoreUnavailable for
+the middleware to fail open or closed (RATE_LIMIT_FAIL_OPEN).
+"""
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from ..dependencies import get_settings
+
+# Hard cap on tracked (user, budget) pairs per memory store: about 35 MB when full
+MAX_TRACKED_KEYS = 100_000
+
+# Idle records expired per new key in the memory store, so eviction cost stays flat
+_EXPIRE_PER_CALL = 2
+
+# The SQLite store sweeps expired rows every this many checks
+SQLITE_SWEEP_INTERVAL = 1000
+
+# How long a SQLite check waits for another worker's. A check holds the lock
+# for well under a millisecond, so this rides out bursts of contention while
+# staying far below the middleware's STORE_TIMEOUT_SECONDS
+SQLITE_BUSY_TIMEOUT_SECONDS = 0.05
+
+# Socket timeouts of the Redis client
+REDIS_TIMEOUT_SECONDS = 0.25
+
+
+class RateLimitStoreUnavailable(RuntimeError):
+    """Raised by hit() when the store cannot answer in time."""
+
+
+def spend(
+    start: float, previous: int, current: int, limit: int, window: int, cost: int, now: float
+) -> Tuple[int, float, int, int]:
+    """
+    Apply one request to a counter. Returns (retry_after, start, previous,
+    current): retry_after is 0 and cost is added to current if the request
+    is allowed; otherwise the counts are unchanged.
+    """
+    # Advance to the fixed window containing now
+    elapsed = int((now - start) // window)
+    if elapsed > 0:
+        previous = current if elapsed == 1 else 0
+        current = 0
+        start += elapsed * window
+
+    # Units spent in the last `window` seconds, counting the previous fixed
+    # window in proportion to its overlap
+    overlap = 1 - (now - start) / window
+    if previous * overlap + current + cost > limit:
+        if current + cost > limit:
+            # Too full on its own: wait for the next fixed window, and for
+            # enough of this one to slide out
+            retry_at = start + window * (2 - (limit - cost) / current)
+        else:
+            # Wait until enough of the previous window has slid out
+            retry_at = start + window * (1 - (limit - current - cost) / previous)
+        return int(retry_at - now) + 1, start, previous, current
+
+    return 0, start, previous, current + cost
+
+
+class RateLimitStore(ABC):
+    """Counters keyed by (user_id, budget)."""
+
+    # Whether hit() waits on I/O, and so must not run on the event loop
+    blocking = False
+
+    @abstractmethod
+    def hit(self, user_id: str, budget: str, limit: int, window: int, cost: int, now: float) -> int:
+        """Spend cost from the key's budget if it fits. Returns 0 if allowed, else seconds to wait."""
+
+    @abstractmethod
+    def clear(self, user_id: Optional[str] = None) -> None:
+        """Forget one user's counters, or everyone's."""
+
+
+class _Window:
+    """Units spent by one (user, budget) pair."""
+
+    __slots__ = ("start", "window", "previous", "current")
+
+    def __init__(self, start: float, window: int):
+        self.start = start
+        self.window = window
+        self.previous = 0
+        self.current = 0
+
+    def expired(self, now: float) -> bool:
+        """True once both counted windows are over, so the record holds nothing."""
+        return now >= self.start + 2 * self.window
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Counters in an LRU dict. A record whose windows have both passed holds
+    nothing and is dropped once it reaches the cold end, and the dict never
+    holds more than max_keys records: past that the least recently used
+    ones are evicted, which at worst resets the limit of a caller idle
+    longer than everyone else.
+    """
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        # {(user_id, budget): _Window}, least recently used first
+        self.records: "OrderedDict[Tuple[str, str], _Window]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        for _ in range(_EXPIRE_PER_CALL):
+            if not self.records:
+                return
+            key, record = next(iter(self.records.items()))
+            if not record.expired(now):
+                break
+            del self.records[key]
+        while len(self.records) >= self.max_keys:
+            self.records.popitem(last=False)
+
+    def hit(self, user_id: str, budget: str, limit: int, window: int, cost: int, now: float) -> int:
+        key = (user_id, budget)
+        record = self.records.get(key)
+        if record is None:
+            self._evict(now)
+            record = self.records[key] = _Window(now, window)
+        else:
+            self.records.move_to_end(key)
+        retry_after, record.start, record.previous, record.current = spend(
+            record.start, record.previous, record.current, limit, window, cost, now
+        )
+        return retry_after
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        if user_id is None:
+            self.records.clear()
+            return
+        for key in [key for key in self.records if key[0] == user_id]:
+            del self.records[key]
+
+
+SQLITE_SCHEMA = """
+create table if not exists rate_limits (
+  user_id text not null,
+  budget text not null,
+  window_start real not null,
+  previous integer not null,
+  current integer not null,
+  expires_at real not null,
+  primary key (user_id, budget)
+) without rowid;
+create index if not exists rate_limits_expires_at on rate_limits (expires_at);
+"""
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Counters in a SQLite file shared by the workers on one host. Each check
+    is a BEGIN IMMEDIATE transaction, so concurrent workers see each other's
+    updates; one that cannot get the write lock within busy_timeout seconds
+    raises RateLimitStoreUnavailable. Expired rows are swept every
+    SQLITE_SWEEP_INTERVAL checks, and above max_keys rows the soonest to
+    expire go first.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_keys: int = MAX_TRACKED_KEYS, busy_timeout: float = SQLITE_BUSY_TIMEOUT_SECONDS):
+        self.max_keys = max_keys
+        # Setup may wait for other workers; checks then give up after busy_timeout
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            self.conn.execute("pragma journal_mode = wal")
+            # Counters are disposable: don't wait for the disk
+            self.conn.execute("pragma synchronous = off")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.conn.execute(f"pragma busy_timeout = {int(busy_timeout * 1000)}")
+        self._checks = 0
+
+    def hit(self, user_id: str, budget: str, limit: int, window: int, cost: int, now: float) -> int:
+        with self.lock:
+            conn = self.conn
+            try:
+                conn.execute("begin immediate")
+            except sqlite3.OperationalError as e:
+                # Another worker held the write lock past the busy timeout
+                raise RateLimitStoreUnavailable(f"SQLite rate limit store: {e}") from e
+            try:
+                self._checks += 1
+                if self._checks % SQLITE_SWEEP_INTERVAL == 0:
+                    self._sweep(now)
+                row = conn.execute(
+                    "select window_start, previous, current from rate_limits where user_id = ? and budget = ?",
+                    (user_id, budget),
+                ).fetchone()
+                start, previous, current = row if row else (now, 0, 0)
+                retry_after, start, previous, current = spend(start, previous, current, limit, window, cost, now)
+                if not retry_after:
+                    conn.execute(
+                        "insert or replace into rate_limits values (?, ?, ?, ?, ?, ?)",
+                        (user_id, budget, start, previous, current, start + 2 * window),
+                    )
+                conn.execute("commit")
+            except BaseException:
+                conn.execute("rollback")
+                raise
+            return retry_after
+
+    def _sweep(self, now: float) -> None:
+        self.conn.execute("delete from rate_limits where expires_at <= ?", (now,))
+        self.conn.execute(
+            "delete from rate_limits where (user_id, budget) in (select user_id, budget from rate_limits"
+            " order by expires_at limit max(0, (select count(*) from rate_limits) - ?))",
+            (self.max_keys,),
+        )
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        with self.lock:
+            if user_id is None:
+                self.conn.execute("delete from rate_limits")
+            else:
+                self.conn.execute("delete from rate_limits where user_id = ?", (user_id,))
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# spend() as a Redis script, so the read-modify-write is atomic on the server.
+# The counter is a hash with a TTL of two windows, after which it holds nothing.
+REDIS_SPEND_SCRIPT = """
+local limit, window, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'start', 'previous', 'current')
+local start = tonumber(state[1]) or now
+local previous = tonumber(state[2]) or 0
+local current = tonumber(state[3]) or 0
+local elapsed = math.floor((now - start) / window)
+if elapsed > 0 then
+  if elapsed == 1 then previous = current else previous = 0 end
+  current = 0
+  start = start + elapsed * window
+end
+local overlap = 1 - (now - start) / window
+if previous * overlap + current + cost > limit then
+  local retry_at
+  if current + cost > limit then
+    retry_at = start + window * (2 - (limit - cost) / current)
+  else
+    retry_at = start + window * (1 - (limit - current - cost) / previous)
+  end
+  return math.floor(retry_at - now) + 1
+end
+redis.call('HSET', KEYS[1], 'start', string.format('%.6f', start), 'previous', previous, 'current', current + cost)
+redis.call('PEXPIRE', KEYS[1], math.ceil((start + 2 * window - now) * 1000))
+return 0
+"""
+
+
+@lru_cache(maxsize=None)
+def _redis():
+    """Import redis lazily; only the redis store needs it."""
+    try:
+        import redis
+    except ImportError:
+        return None
+    return redis
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Counters on a Redis-protocol server, one hash per key that expires on
+    its own once idle. Bound memory on the server with maxmemory and
+    maxmemory-policy volatile-lru. Connection errors and timeouts raise
+    RateLimitStoreUnavailable.
+    """
+
+    blocking = True
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._spend = client.register_script(REDIS_SPEND_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitStore":
+        redis = _redis()
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package")
+        return cls(redis.Redis.from_url(
+            url, socket_timeout=REDIS_TIMEOUT_SECONDS, socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+        ))
+
+    def _key(self, user_id: str, budget: str) -> str:
+        return f"{self.prefix}{budget}:{user_id}"
+
+    def hit(self, user_id: str, budget: str, limit: int, window: int, cost: int, now: float) -> int:
+        redis = _redis()
+        unavailable = (redis.ConnectionError, redis.TimeoutError) if redis else ()
+        try:
+            return int(self._spend(keys=[self._key(user_id, budget)], args=[limit, window, cost, now]))
+        except unavailable as e:
+            raise RateLimitStoreUnavailable(f"Redis rate limit store: {e}") from e
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        pattern = self._key("*", "*") if user_id is None else self._key(user_id, "*")
+        keys = list(self.client.scan_iter(match=pattern, count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+
+@lru_cache()
+def get_rate_limit_store() -> RateLimitStore:
+    """The store selected by RATE_LIMIT_BACKEND (one per process)."""
+    settings = get_settings()
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+
+    if backend == "memory":
+        return MemoryRateLimitStore()
+
+    if backend == "sqlite":
+        return SQLiteRateLimitStore(
+            settings.RATE_LIMIT_SQLITE_PATH, busy_timeout=settings.RATE_LIMIT_SQLITE_BUSY_TIMEOUT_SECONDS
+        )
+
+    if backend == "redis":
+        if not settings.RATE_LIMIT_REDIS_URL:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs RATE_LIMIT_REDIS_URL")
+        return RedisRateLimitStore.from_url(settings.RATE_LIMIT_REDIS_URL)
+
+    raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND!r}")
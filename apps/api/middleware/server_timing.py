@@ -0,0 +1,60 @@
+"""
+Server-Timing header with a per-phase breakdown of sampled requests.
+
+A SERVER_TIMING_SAMPLE_RATE fraction of requests is timed: the phases
+recorded below (see lib/timing.py) are summed into a Server-Timing header
+added to the response start, which browsers show in their network panel.
+A phase still running when the response starts, such as the body of a
+streamed response, is not included. Requests that are not sampled cost a
+random() call here and a context variable read per phase.
+
+It sits outside the rate limiter, so token checks made there count as
+"auth", and 429s are timed too.
+"""
+import json
+import random
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..dependencies import get_settings
+from ..lib.timing import (
+    DEBUG_TIMING_REQUEST_HEADER,
+    SERVER_TIMING_DETAIL_HEADER,
+    SERVER_TIMING_HEADER,
+    start_request_timer,
+    stop_request_timer,
+)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding Server-Timing (and, on request, the span detail) to sampled responses."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        debug = settings.SERVER_TIMING_DEBUG and DEBUG_TIMING_REQUEST_HEADER.lower() in Headers(scope=scope)
+        if not debug and random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        timer = start_request_timer()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(SERVER_TIMING_HEADER, timer.header())
+                if debug:
+                    headers.append(SERVER_TIMING_DETAIL_HEADER, json.dumps(timer.detail(), separators=(",", ":")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            stop_request_timer(timer)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, BeforeValidator, Field
+from typing import Annotated, Optional
 
 
 class Ingredient(BaseModel):
@@ -30,3 +30,19 @@ class Recipe(BaseModel):
     tasks: list[AtomicTask]
     source: Optional[str] = None  # url, "manual", etc.
 
+
+
+# Earlier versions stamped stored normalized blobs with this key. Nothing
+# reads it, so responses leave it out for rows that still carry it.
+SCHEMA_VERSION_KEY = "schema_version"
+
+
+def public_normalized(normalized: Optional[dict]) -> Optional[dict]:
+    """A stored normalized blob as the API returns it, without the storage-only schema_version."""
+    if not isinstance(normalized, dict) or SCHEMA_VERSION_KEY not in normalized:
+        return normalized
+    return {key: value for key, value in normalized.items() if key != SCHEMA_VERSION_KEY}
+
+
+# Response field type for stored normalized blobs
+PublicNormalized = Annotated[Optional[dict], BeforeValidator(public_normalized)]
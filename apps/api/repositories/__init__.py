@@ -0,0 +1,35 @@
+"""
+Data access repositories.
+
+``get_repositories()`` returns the backend selected by the DATA_BACKEND
+setting: "supabase" (default), "memory" or "sqlite" (at SQLITE_PATH).
+"""
+from functools import lru_cache
+
+from ..dependencies import get_settings
+from .base import DuplicateKeyError, Repositories
+
+
+@lru_cache()
+def get_repositories() -> Repositories:
+    """Get the repositories for the configured backend (one set per process)."""
+    settings = get_settings()
+    backend = settings.DATA_BACKEND.lower()
+
+    if backend == "memory":
+        from .memory import create_memory_repositories
+        return create_memory_repositories()
+
+    if backend == "sqlite":
+        from .sqlite import SQLiteDatabase, create_sqlite_repositories
+        return create_sqlite_repositories(SQLiteDatabase(settings.SQLITE_PATH))
+
+    if backend == "supabase":
+        from ..lib.supabase_client import require_supabase
+        from .supabase import create_supabase_repositories
+        return create_supabase_repositories(require_supabase())
+
+    raise RuntimeError(f"Unknown DATA_BACKEND: {settings.DATA_BACKEND!r}")
+
+
+__all__ = ["DuplicateKeyError", "Repositories", "get_repositories"]
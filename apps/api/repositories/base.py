@@ -0,0 +1,281 @@
+"""
+Repository interfaces for backend persistence.
+
+Routers and services talk to these interfaces instead of building Supabase
+queries inline, so the API can run against Supabase in production or against
+the in-memory / SQLite backends for local benchmarking and load tests.
+
+Rows are plain dicts shaped like Supabase's JSON responses: string ids,
+ISO-8601 timestamp strings and decoded JSON columns.
+"""
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Optional
+
+from ..lib.pagination import Cursor, decode_cursor, encode_cursor
+
+
+class DuplicateKeyError(Exception):
+    """Raised when an insert violates a unique constraint."""
+
+
+def new_id() -> str:
+    """Generate a row id the way gen_random_uuid() would."""
+    return str(uuid.uuid4())
+
+
+def utcnow_iso() -> str:
+    """Current time as an ISO-8601 string, matching Supabase's timestamptz output."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_columns(columns: str) -> Optional[list[str]]:
+    """
+    Parse a PostgREST-style column list ("id, title") into names.
+    Returns None for "*" (all columns).
+    """
+    if columns.strip() == "*":
+        return None
+    return [c.strip() for c in columns.split(",") if c.strip()]
+
+
+def project(row: dict, columns: Optional[Iterable[str]]) -> dict:
+    """Return a copy of row limited to columns (all columns if None)."""
+    if columns is None:
+        return dict(row)
+    return {c: row.get(c) for c in columns}
+
+
+@dataclass
+class Page:
+    """
+    One page of a keyset-paginated list, ordered created_at desc, id desc.
+    next_cursor is None on the last page; total is only filled in when the
+    caller asks for it, and may be an estimate.
+    """
+    rows: list[dict]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+def make_page(
+    rows: list[dict], limit: Optional[int], total: Optional[int] = None, source: Optional[str] = None
+) -> Page:
+    """
+    Build a Page from rows fetched with ``limit + 1``: the extra row only
+    signals that another page exists and is dropped. source names the
+    scorer of ranked rows when it is not the database.
+    """
+    if limit is None or len(rows) <= limit:
+        return Page(rows=rows, total=total)
+    rows = rows[:limit]
+    last = rows[-1]
+    cursor = encode_cursor(last["created_at"], str(last["id"]), last.get("rank"), source)
+    return Page(rows=rows, next_cursor=cursor, total=total)
+
+
+async def iter_pages(first: Page, fetch: Callable[[Cursor], Awaitable[Page]]) -> AsyncIterator[list[dict]]:
+    """
+    Rows of first and of each following page, fetched with fetch(after) by
+    following next_cursor. Only one page is held at a time.
+    """
+    page = first
+    while True:
+        yield page.rows
+        if not page.next_cursor:
+            return
+        page = await fetch(decode_cursor(page.next_cursor))
+
+
+class ProfileRepository(ABC):
+    @abstractmethod
+    async def get(self, user_id: str, columns: str = "*") -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_by_stripe_customer(self, customer_id: str, columns: str = "id") -> Optional[dict]: ...
+
+    @abstractmethod
+    async def create(self, data: dict) -> dict: ...
+
+    @abstractmethod
+    async def update(self, user_id: str, data: dict) -> Optional[dict]: ...
+
+
+class RecipeRepository(ABC):
+    @abstractmethod
+    async def list_for_user(
+        self,
+        user_id: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        """
+        Recipes owned by user_id, newest first, starting after the cursor.
+        columns must include created_at and id when paginating.
+        """
+
+    @abstractmethod
+    async def get(self, recipe_id: str, user_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def exists(self, recipe_id: str, user_id: str) -> bool: ...
+
+    @abstractmethod
+    async def create(self, data: dict) -> dict: ...
+
+    @abstractmethod
+    async def update(self, recipe_id: str, user_id: str, data: dict) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def delete(self, recipe_id: str, user_id: str) -> None: ...
+
+    @abstractmethod
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        """Up to limit recipes (id, user_id, normalized) without a station-load summary."""
+
+
+class EventRepository(ABC):
+    @abstractmethod
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        """Events owned by user_id, newest first, starting after the cursor."""
+
+    @abstractmethod
+    async def get(self, event_id: str, user_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_by_public_token(self, token: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def exists(self, event_id: str, user_id: str) -> bool: ...
+
+    @abstractmethod
+    async def create(self, data: dict) -> dict: ...
+
+    @abstractmethod
+    async def update(self, event_id: str, user_id: str, data: dict) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def delete(self, event_id: str, user_id: str) -> None: ...
+
+
+class EventRecipeRepository(ABC):
+    @abstractmethod
+    async def list_for_event(self, event_id: str, recipe_columns: str) -> list[dict]:
+        """
+        Recipes attached to an event. Each row holds the event_recipes columns
+        plus a "recipes" dict with recipe_columns of the joined recipe
+        (the shape of a PostgREST ``recipes!inner(...)`` embed).
+        """
+
+    @abstractmethod
+    async def attach(self, data: dict) -> dict: ...
+
+    @abstractmethod
+    async def detach(self, event_id: str, recipe_id: str) -> None: ...
+
+
+class RecipeLibraryRepository(ABC):
+    @abstractmethod
+    async def list(
+        self,
+        category: Optional[str],
+        search: Optional[str],
+        limit: int,
+        after: Optional[Cursor] = None,
+        columns: str = "*",
+        with_total: bool = False,
+    ) -> Page:
+        """
+        A page of library recipes starting after the cursor: newest first,
+        or by descending relevance (rows carry a "rank") when searching.
+        """
+
+    @abstractmethod
+    async def list_updated_since(
+        self,
+        after: Optional[tuple[str, str]],
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        """
+        Up to limit recipes whose (updated_at, id) is past the given
+        watermark, oldest change first. Used to refresh in-process copies.
+        """
+
+    @abstractmethod
+    async def list_by_load(
+        self,
+        category: str,
+        max_critical_path_minutes: int,
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        """
+        Up to limit recipes in a category whose summarised critical path
+        fits in max_critical_path_minutes, shortest first. Recipes without
+        a summary are left out.
+        """
+
+    @abstractmethod
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        """Up to limit library recipes (id, normalized) without a station-load summary."""
+
+    @abstractmethod
+    async def get(self, recipe_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_many(self, recipe_ids: List[str], columns: str = "*") -> List[dict]:
+        """The recipes among recipe_ids that exist, in no particular order."""
+
+    @abstractmethod
+    async def create(self, data: dict) -> dict: ...
+
+    @abstractmethod
+    async def update(self, recipe_id: str, data: dict) -> Optional[dict]: ...
+
+
+class GiftCodeRepository(ABC):
+    @abstractmethod
+    async def get_by_code(self, code: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def code_exists(self, code: str) -> bool: ...
+
+    @abstractmethod
+    async def create(self, data: dict) -> dict: ...
+
+    @abstractmethod
+    async def update(self, gift_code_id: str, data: dict) -> Optional[dict]: ...
+
+
+class WaitlistRepository(ABC):
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def create(self, data: dict) -> dict: ...
+
+    @abstractmethod
+    async def update_by_email(self, email: str, data: dict) -> Optional[dict]: ...
+
+
+@dataclass
+class Repositories:
+    """One repository per table, all backed by the same store."""
+    profiles: ProfileRepository
+    recipes: RecipeRepository
+    events: EventRepository
+    event_recipes: EventRecipeRepository
+    recipe_library: RecipeLibraryRepository
+    gift_codes: GiftCodeRepository
+    waitlist: WaitlistRepository
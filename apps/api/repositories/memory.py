@@ -0,0 +1,420 @@
+"""
+In-memory implementation of the repositories.
+
+Everything lives in Python dicts inside one process, so the API can be
+exercised at full speed without any database, e.g. for profiling and
+performance regression tests. Columns that the routers filter on are kept in
+secondary indexes so lookups stay O(1) as the data set grows.
+"""
+import heapq
+from collections import defaultdict
+from typing import Iterable, List, Optional
+
+from ..lib.pagination import Cursor, after_cursor, sort_key
+from ..lib.search import rank, search_terms
+from .base import (
+    DuplicateKeyError,
+    EventRecipeRepository,
+    EventRepository,
+    GiftCodeRepository,
+    Page,
+    ProfileRepository,
+    RecipeLibraryRepository,
+    RecipeRepository,
+    Repositories,
+    WaitlistRepository,
+    make_page,
+    parse_columns,
+    project,
+)
+from .tables import LOAD_SUMMARY_DEFAULTS, TABLES, TableSpec, apply_defaults, touch
+
+# Columns with a secondary index, per table
+_INDEXED_COLUMNS = {
+    "profiles": ("stripe_customer_id",),
+    "recipes": ("user_id",),
+    "events": ("user_id", "public_token"),
+    "event_recipes": ("event_id", "recipe_id"),
+    "recipe_library": (),
+    "gift_codes": ("code",),
+    "waitlist": ("email",),
+}
+
+
+class MemoryTable:
+    """Rows keyed by id, with secondary and unique indexes."""
+
+    def __init__(self, spec: TableSpec, indexed: Iterable[str] = ()):
+        self.spec = spec
+        self.rows: dict[str, dict] = {}
+        # column -> value -> ordered set of row ids
+        self._indexes: dict[str, defaultdict] = {col: defaultdict(dict) for col in indexed}
+        # unique key columns -> values -> row id
+        self._unique: dict[tuple[str, ...], dict[tuple, str]] = {key: {} for key in spec.unique}
+
+    def insert(self, data: dict) -> dict:
+        row = apply_defaults(self.spec, data)
+        for key, seen in self._unique.items():
+            if tuple(row.get(c) for c in key) in seen:
+                raise DuplicateKeyError(f"{self.spec.name}: duplicate key {key}")
+        self.rows[row["id"]] = row
+        self._index(row)
+        return row
+
+    def get(self, row_id: str) -> Optional[dict]:
+        return self.rows.get(row_id)
+
+    def where(self, **filters) -> list[dict]:
+        """Rows whose columns equal every filter value."""
+        indexed = next((c for c in filters if c in self._indexes), None)
+        if indexed is not None:
+            candidates = (self.rows[i] for i in self._indexes[indexed].get(filters[indexed], ()))
+        elif "id" in filters:
+            row = self.rows.get(filters["id"])
+            candidates = (row,) if row else ()
+        else:
+            candidates = self.rows.values()
+        return [row for row in candidates if all(row.get(c) == v for c, v in filters.items())]
+
+    def first(self, **filters) -> Optional[dict]:
+        matches = self.where(**filters)
+        return matches[0] if matches else None
+
+    def update(self, row_id: str, data: dict) -> dict:
+        row = self.rows[row_id]
+        data = touch(self.spec, data)
+        updated = {**row, **data}
+        for key, seen in self._unique.items():
+            values = tuple(updated.get(c) for c in key)
+            if seen.get(values, row_id) != row_id:
+                raise DuplicateKeyError(f"{self.spec.name}: duplicate key {key}")
+        self._unindex(row)
+        row.update(data)
+        self._index(row)
+        return row
+
+    def delete(self, row_id: str) -> Optional[dict]:
+        row = self.rows.pop(row_id, None)
+        if row is not None:
+            self._unindex(row)
+        return row
+
+    def _index(self, row: dict) -> None:
+        for col, index in self._indexes.items():
+            index[row.get(col)][row["id"]] = None
+        for key, seen in self._unique.items():
+            seen[tuple(row.get(c) for c in key)] = row["id"]
+
+    def _unindex(self, row: dict) -> None:
+        for col, index in self._indexes.items():
+            bucket = index.get(row.get(col))
+            if bucket is not None:
+                bucket.pop(row["id"], None)
+                if not bucket:
+                    del index[row.get(col)]
+        for key, seen in self._unique.items():
+            seen.pop(tuple(row.get(c) for c in key), None)
+
+
+class MemoryDatabase:
+    """All tables for one in-memory store."""
+
+    def __init__(self):
+        self.tables = {
+            name: MemoryTable(spec, _INDEXED_COLUMNS.get(name, ()))
+            for name, spec in TABLES.items()
+        }
+
+    def __getitem__(self, name: str) -> MemoryTable:
+        return self.tables[name]
+
+    def delete(self, table: str, row_id: str) -> None:
+        """Delete a row and cascade to child tables like the foreign keys do."""
+        row = self.tables[table].delete(row_id)
+        if row is None:
+            return
+        for child, column in self.tables[table].spec.cascades:
+            for child_row in self.tables[child].where(**{column: row_id}):
+                self.delete(child, child_row["id"])
+
+
+def _copy(row: Optional[dict], columns: Optional[list[str]] = None) -> Optional[dict]:
+    return project(row, columns) if row is not None else None
+
+
+def _missing_summary(rows: Iterable[dict], columns: str, limit: int) -> List[dict]:
+    names = parse_columns(columns)
+    missing = (r for r in rows if r.get("critical_path_minutes") is None)
+    return [_copy(r, names) for r in heapq.nsmallest(limit, missing, key=lambda r: r["id"])]
+
+
+def _keyset_page(
+    rows: Iterable[dict],
+    columns: str,
+    limit: Optional[int],
+    after: Optional[Cursor],
+    with_total: bool,
+) -> Page:
+    """Sort rows created_at desc, id desc and cut the page after the cursor."""
+    rows = list(rows)
+    total = len(rows) if with_total else None
+    remaining = (r for r in rows if after_cursor(r, after))
+    if limit is None:
+        ordered = sorted(remaining, key=sort_key, reverse=True)
+    else:
+        ordered = heapq.nlargest(limit + 1, remaining, key=sort_key)
+    names = parse_columns(columns)
+    return make_page([_copy(r, names) for r in ordered], limit, total)
+
+
+class MemoryProfileRepository(ProfileRepository):
+    def __init__(self, db: MemoryDatabase):
+        self.table = db["profiles"]
+
+    async def get(self, user_id: str, columns: str = "*") -> Optional[dict]:
+        return _copy(self.table.get(user_id), parse_columns(columns))
+
+    async def get_by_stripe_customer(self, customer_id: str, columns: str = "id") -> Optional[dict]:
+        return _copy(self.table.first(stripe_customer_id=customer_id), parse_columns(columns))
+
+    async def create(self, data: dict) -> dict:
+        return _copy(self.table.insert(data))
+
+    async def update(self, user_id: str, data: dict) -> Optional[dict]:
+        if user_id not in self.table.rows:
+            return None
+        return _copy(self.table.update(user_id, data))
+
+
+class MemoryRecipeRepository(RecipeRepository):
+    def __init__(self, db: MemoryDatabase):
+        self.db = db
+        self.table = db["recipes"]
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        return _keyset_page(self.table.where(user_id=user_id), columns, limit, after, with_total)
+
+    async def get(self, recipe_id: str, user_id: str) -> Optional[dict]:
+        return _copy(self.table.first(id=recipe_id, user_id=user_id))
+
+    async def exists(self, recipe_id: str, user_id: str) -> bool:
+        return self.table.first(id=recipe_id, user_id=user_id) is not None
+
+    async def create(self, data: dict) -> dict:
+        return _copy(self.table.insert(data))
+
+    async def update(self, recipe_id: str, user_id: str, data: dict) -> Optional[dict]:
+        if not await self.exists(recipe_id, user_id):
+            return None
+        return _copy(self.table.update(recipe_id, data))
+
+    async def delete(self, recipe_id: str, user_id: str) -> None:
+        if await self.exists(recipe_id, user_id):
+            self.db.delete("recipes", recipe_id)
+
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        return _missing_summary(self.table.rows.values(), "id, user_id, normalized", limit)
+
+
+class MemoryEventRepository(EventRepository):
+    def __init__(self, db: MemoryDatabase):
+        self.db = db
+        self.table = db["events"]
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        return _keyset_page(self.table.where(user_id=user_id), "*", limit, after, with_total)
+
+    async def get(self, event_id: str, user_id: str) -> Optional[dict]:
+        return _copy(self.table.first(id=event_id, user_id=user_id))
+
+    async def get_by_public_token(self, token: str) -> Optional[dict]:
+        return _copy(self.table.first(public_token=token))
+
+    async def exists(self, event_id: str, user_id: str) -> bool:
+        return self.table.first(id=event_id, user_id=user_id) is not None
+
+    async def create(self, data: dict) -> dict:
+        return _copy(self.table.insert(data))
+
+    async def update(self, event_id: str, user_id: str, data: dict) -> Optional[dict]:
+        if not await self.exists(event_id, user_id):
+            return None
+        return _copy(self.table.update(event_id, data))
+
+    async def delete(self, event_id: str, user_id: str) -> None:
+        if await self.exists(event_id, user_id):
+            self.db.delete("events", event_id)
+
+
+class MemoryEventRecipeRepository(EventRecipeRepository):
+    def __init__(self, db: MemoryDatabase):
+        self.table = db["event_recipes"]
+        self.recipes = db["recipes"]
+
+    async def list_for_event(self, event_id: str, recipe_columns: str) -> list[dict]:
+        columns = parse_columns(recipe_columns)
+        rows = []
+        for er_row in self.table.where(event_id=event_id):
+            recipe = self.recipes.get(er_row["recipe_id"])
+            if recipe is None:  # inner join
+                continue
+            rows.append({**er_row, "recipes": project(recipe, columns)})
+        return rows
+
+    async def attach(self, data: dict) -> dict:
+        return _copy(self.table.insert(data))
+
+    async def detach(self, event_id: str, recipe_id: str) -> None:
+        for row in self.table.where(event_id=event_id, recipe_id=recipe_id):
+            self.table.delete(row["id"])
+
+
+class MemoryRecipeLibraryRepository(RecipeLibraryRepository):
+    def __init__(self, db: MemoryDatabase):
+        self.table = db["recipe_library"]
+
+    async def list(
+        self,
+        category: Optional[str],
+        search: Optional[str],
+        limit: int,
+        after: Optional[Cursor] = None,
+        columns: str = "*",
+        with_total: bool = False,
+    ) -> Page:
+        rows = self.table.where(category=category) if category else list(self.table.rows.values())
+        terms = search_terms(search)
+        if not terms:
+            return _keyset_page(rows, columns, limit, after, with_total)
+
+        ranked = []
+        for row in rows:
+            score = rank(row, terms)
+            if score is not None:
+                ranked.append(((score, *sort_key(row)), row))
+        total = len(ranked) if with_total else None
+        if after is not None:
+            bound = (after.rank or 0.0, after.created_at, after.id)
+            ranked = [item for item in ranked if item[0] < bound]
+        top = heapq.nlargest(limit + 1, ranked, key=lambda item: item[0])
+        names = parse_columns(columns)
+        return make_page([{**_copy(row, names), "rank": key[0]} for key, row in top], limit, total)
+
+    async def list_updated_since(
+        self,
+        after: Optional[tuple[str, str]],
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        def key(row: dict) -> tuple[str, str]:
+            return row["updated_at"], row["id"]
+
+        rows = (r for r in self.table.rows.values() if after is None or key(r) > after)
+        names = parse_columns(columns)
+        return [_copy(r, names) for r in heapq.nsmallest(limit, rows, key=key)]
+
+    async def list_by_load(
+        self,
+        category: str,
+        max_critical_path_minutes: int,
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        rows = [
+            r for r in self.table.where(category=category)
+            if r.get("critical_path_minutes") is not None
+            and r["critical_path_minutes"] <= max_critical_path_minutes
+        ]
+        names = parse_columns(columns)
+        top = heapq.nsmallest(limit, rows, key=lambda r: (r["critical_path_minutes"], r["id"]))
+        return [_copy(r, names) for r in top]
+
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        return _missing_summary(self.table.rows.values(), "id, normalized", limit)
+
+    async def get(self, recipe_id: str) -> Optional[dict]:
+        return _copy(self.table.get(recipe_id))
+
+    async def get_many(self, recipe_ids: List[str], columns: str = "*") -> List[dict]:
+        names = parse_columns(columns)
+        rows = (self.table.get(recipe_id) for recipe_id in recipe_ids)
+        return [_copy(row, names) for row in rows if row is not None]
+
+    async def create(self, data: dict) -> dict:
+        return _copy(self.table.insert(data))
+
+    async def update(self, recipe_id: str, data: dict) -> Optional[dict]:
+        row = self.table.get(recipe_id)
+        if row is None:
+            return None
+        # Mirrors the recipe_library_clear_load_summary trigger: new
+        # normalized JSON with the old summary leaves the summary stale
+        if (
+            data.get("normalized", row["normalized"]) != row["normalized"]
+            and data.get("critical_path_minutes", row["critical_path_minutes"]) == row["critical_path_minutes"]
+            and data.get("station_minutes", row["station_minutes"]) == row["station_minutes"]
+        ):
+            data = {**data, **LOAD_SUMMARY_DEFAULTS}
+        return _copy(self.table.update(recipe_id, data))
+
+
+class MemoryGiftCodeRepository(GiftCodeRepository):
+    def __init__(self, db: MemoryDatabase):
+        self.table = db["gift_codes"]
+
+    async def get_by_code(self, code: str) -> Optional[dict]:
+        return _copy(self.table.first(code=code))
+
+    async def code_exists(self, code: str) -> bool:
+        return self.table.first(code=code) is not None
+
+    async def create(self, data: dict) -> dict:
+        return _copy(self.table.insert(data))
+
+    async def update(self, gift_code_id: str, data: dict) -> Optional[dict]:
+        if gift_code_id not in self.table.rows:
+            return None
+        return _copy(self.table.update(gift_code_id, data))
+
+
+class MemoryWaitlistRepository(WaitlistRepository):
+    def __init__(self, db: MemoryDatabase):
+        self.table = db["waitlist"]
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return _copy(self.table.first(email=email))
+
+    async def create(self, data: dict) -> dict:
+        return _copy(self.table.insert(data))
+
+    async def update_by_email(self, email: str, data: dict) -> Optional[dict]:
+        row = self.table.first(email=email)
+        if row is None:
+            return None
+        return _copy(self.table.update(row["id"], data))
+
+
+def create_memory_repositories(db: Optional[MemoryDatabase] = None) -> Repositories:
+    db = db or MemoryDatabase()
+    return Repositories(
+        profiles=MemoryProfileRepository(db),
+        recipes=MemoryRecipeRepository(db),
+        events=MemoryEventRepository(db),
+        event_recipes=MemoryEventRecipeRepository(db),
+        recipe_library=MemoryRecipeLibraryRepository(db),
+        gift_codes=MemoryGiftCodeRepository(db),
+        waitlist=MemoryWaitlistRepository(db),
+    )
@@ -0,0 +1,656 @@
+"""
+SQLite implementation of the repositories.
+
+The schema below mirrors supabase/schema.sql and supabase/migrations (minus
+auth.users, RLS and the Postgres-only triggers, whose effects are applied in
+Python). Use a file path for a persistent local database or ":memory:" for a
+throwaway one. Queries are sub-millisecond against a local file, so they run
+inline rather than on the Supabase worker pool.
+"""
+import json
+import sqlite3
+import threading
+from typing import Any, List, Optional
+
+from ..lib.pagination import Cursor
+from ..lib.search import search_terms, to_fts5_query
+from .base import (
+    DuplicateKeyError,
+    EventRecipeRepository,
+    EventRepository,
+    GiftCodeRepository,
+    Page,
+    ProfileRepository,
+    RecipeLibraryRepository,
+    RecipeRepository,
+    Repositories,
+    WaitlistRepository,
+    make_page,
+    parse_columns,
+)
+from .tables import TABLES, TableSpec, apply_defaults, touch
+
+SCHEMA = """
+create table if not exists profiles (
+  id text primary key,
+  email text not null,
+  display_name text,
+  default_headcount integer,
+  oven_capacity_lbs integer,
+  burner_count integer,
+  tier text default 'free' check (tier in ('free', 'pro', 'holiday_pass')),
+  subscription_status text,
+  renewal_date text,
+  stripe_customer_id text,
+  stripe_subscription_id text,
+  onboarding_completed integer default 0,
+  created_at text not null,
+  updated_at text not null
+);
+
+create table if not exists recipes (
+  id text primary key,
+  user_id text not null references profiles(id) on delete cascade,
+  title text not null,
+  category text not null check (category in ('main', 'side', 'dessert', 'app', 'other')),
+  base_headcount integer not null,
+  prep_time_minutes integer default 0,
+  cook_time_minutes integer default 0,
+  method text not null check (method in ('oven', 'stovetop', 'no_cook', 'mixed')),
+  day_before_ok integer default 0,
+  -- schema.sql limits source_type to text/url/pdf/image, but saving from the
+  -- library writes 'library', so the check is left off here
+  source_type text not null,
+  source_raw text,
+  normalized text,
+  notes text,
+  station_minutes text,
+  oven_minutes integer,
+  stove_minutes integer,
+  hands_on_minutes integer,
+  critical_path_minutes integer,
+  peak_concurrency integer,
+  task_count integer,
+  ingredient_grams real,
+  created_at text not null,
+  updated_at text not null
+);
+
+create table if not exists events (
+  id text primary key,
+  user_id text not null references profiles(id) on delete cascade,
+  name text not null,
+  event_type text not null check (event_type in ('prep_week', 'event')),
+  event_date text,
+  headcount integer,
+  location text,
+  vibe text check (vibe in ('chill', 'formal', 'family_chaos')),
+  notes text,
+  public_token text,
+  created_at text not null,
+  updated_at text not null
+);
+
+create table if not exists event_recipes (
+  id text primary key,
+  event_id text not null references events(id) on delete cascade,
+  recipe_id text not null references recipes(id) on delete cascade,
+  target_headcount integer not null,
+  course_order integer default 0,
+  is_primary integer default 0,
+  created_at text not null,
+  unique(event_id, recipe_id)
+);
+
+create table if not exists recipe_library (
+  id text primary key,
+  title text not null,
+  category text not null check (category in ('main', 'side', 'dessert', 'app', 'other')),
+  base_headcount integer not null default 4,
+  prep_time_minutes integer default 0,
+  cook_time_minutes integer default 0,
+  method text not null check (method in ('oven', 'stovetop', 'no_cook', 'mixed')),
+  day_before_ok integer default 0,
+  source_type text not null default 'library',
+  source_raw text,
+  normalized text not null,
+  description text,
+  image_url text,
+  tags text default '[]',
+  station_minutes text,
+  oven_minutes integer,
+  stove_minutes integer,
+  hands_on_minutes integer,
+  critical_path_minutes integer,
+  peak_concurrency integer,
+  task_count integer,
+  ingredient_grams real,
+  created_at text not null,
+  updated_at text not null
+);
+
+create table if not exists gift_codes (
+  id text primary key,
+  code text not null unique,
+  purchaser_email text,
+  recipient_name text,
+  recipient_email text,
+  message text,
+  plan text not null default 'pro_annual',
+  status text not null default 'new',
+  redeemed_by text references profiles(id),
+  redeemed_at text,
+  expires_at text not null,
+  created_at text not null
+);
+
+create table if not exists waitlist (
+  id text primary key,
+  email text not null unique,
+  wants_tips integer default 0,
+  source text,
+  created_at text not null,
+  updated_at text not null
+);
+
+create index if not exists idx_recipes_user_id on recipes(user_id);
+create index if not exists idx_events_user_id on events(user_id);
+create index if not exists idx_events_event_date on events(event_date);
+create index if not exists idx_events_public_token on events(public_token);
+create index if not exists idx_event_recipes_event_id on event_recipes(event_id);
+create index if not exists idx_event_recipes_recipe_id on event_recipes(recipe_id);
+create index if not exists idx_recipe_library_category on recipe_library(category);
+create index if not exists idx_gift_codes_status on gift_codes(status);
+create index if not exists idx_gift_codes_redeemed_by on gift_codes(redeemed_by);
+create index if not exists idx_profiles_stripe_customer_id on profiles(stripe_customer_id);
+create index if not exists idx_recipes_user_keyset on recipes(user_id, created_at desc, id desc);
+create index if not exists idx_events_user_keyset on events(user_id, created_at desc, id desc);
+create index if not exists idx_recipe_library_keyset on recipe_library(created_at desc, id desc);
+create index if not exists idx_recipe_library_category_keyset on recipe_library(category, created_at desc, id desc);
+create index if not exists idx_recipe_library_updated_at on recipe_library(updated_at, id);
+create index if not exists idx_recipe_library_category_critical_path
+on recipe_library(category, critical_path_minutes);
+create index if not exists idx_recipes_missing_summary on recipes(id) where critical_path_minutes is null;
+create index if not exists idx_recipe_library_missing_summary
+on recipe_library(id) where critical_path_minutes is null;
+
+-- A library recipe whose normalized changes without a new summary loses its stale one
+create trigger if not exists recipe_library_clear_load_summary
+after update of normalized on recipe_library
+when new.normalized is not old.normalized
+  and new.critical_path_minutes is old.critical_path_minutes
+  and new.station_minutes is old.station_minutes
+  and new.critical_path_minutes is not null
+begin
+  update recipe_library set
+    station_minutes = null, oven_minutes = null, stove_minutes = null, hands_on_minutes = null,
+    critical_path_minutes = null, peak_concurrency = null, task_count = null, ingredient_grams = null
+  where rowid = new.rowid;
+end;
+
+-- Full-text index standing in for recipe_library.search_vector in Postgres.
+-- Rows are linked by rowid, which is stable as long as the file is never VACUUMed.
+create virtual table if not exists recipe_library_fts using fts5(
+  title, tags, ingredients, description, tokenize = 'porter unicode61'
+);
+
+create trigger if not exists recipe_library_fts_insert after insert on recipe_library begin
+  insert into recipe_library_fts (rowid, title, tags, ingredients, description) values (
+    new.rowid,
+    new.title,
+    (select group_concat(value, ' ') from json_each(new.tags)),
+    (select group_concat(json_extract(value, '$.name'), ' ') from json_each(new.normalized, '$.ingredients')),
+    new.description
+  );
+end;
+
+create trigger if not exists recipe_library_fts_delete after delete on recipe_library begin
+  delete from recipe_library_fts where rowid = old.rowid;
+end;
+
+create trigger if not exists recipe_library_fts_update
+after update of title, tags, normalized, description on recipe_library begin
+  delete from recipe_library_fts where rowid = old.rowid;
+  insert into recipe_library_fts (rowid, title, tags, ingredients, description) values (
+    new.rowid,
+    new.title,
+    (select group_concat(value, ' ') from json_each(new.tags)),
+    (select group_concat(json_extract(value, '$.name'), ' ') from json_each(new.normalized, '$.ingredients')),
+    new.description
+  );
+end;
+"""
+
+
+class SQLiteDatabase:
+    """A single SQLite connection shared by all repositories."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.conn.execute("pragma foreign_keys = on")
+        if path != ":memory:":
+            self.conn.execute("pragma journal_mode = wal")
+            self.conn.execute("pragma synchronous = normal")
+        self._add_missing_columns()
+        self.conn.executescript(SCHEMA)
+
+    def _add_missing_columns(self) -> None:
+        """Bring tables created by an older SCHEMA up to date (create table if not exists won't)."""
+        for spec in TABLES.values():
+            existing = {row["name"] for row in self.conn.execute(f"pragma table_info({spec.name})")}
+            if not existing:
+                continue
+            for column in spec.columns:
+                if column not in existing:
+                    # Untyped: SQLite stores whatever encode() hands it
+                    self.conn.execute(f"alter table {spec.name} add column {column}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def query(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def write(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        with self.lock:
+            try:
+                return self.conn.execute(sql, params).fetchall()
+            except sqlite3.IntegrityError as e:
+                if "UNIQUE" in str(e):
+                    raise DuplicateKeyError(str(e)) from e
+                raise
+
+    # Row encoding
+
+    @staticmethod
+    def encode(spec: TableSpec, column: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if column in spec.json_columns:
+            return json.dumps(value)
+        if column in spec.bool_columns:
+            return int(bool(value))
+        return value
+
+    @staticmethod
+    def decode(spec: TableSpec, row: sqlite3.Row, prefix: str = "") -> dict:
+        out = {}
+        for key in row.keys():
+            if not key.startswith(prefix):
+                continue
+            column = key[len(prefix):]
+            value = row[key]
+            if value is not None:
+                if column in spec.json_columns:
+                    value = json.loads(value)
+                elif column in spec.bool_columns:
+                    value = bool(value)
+            out[column] = value
+        return out
+
+    @staticmethod
+    def select_list(spec: TableSpec, columns: str, alias: str = "", prefix: str = "") -> str:
+        """Validated SQL column list for a PostgREST-style column string."""
+        names = parse_columns(columns) or spec.columns
+        unknown = set(names) - set(spec.columns)
+        if unknown:
+            raise ValueError(f"Unknown columns for {spec.name}: {sorted(unknown)}")
+        qualifier = f"{alias}." if alias else ""
+        return ", ".join(f'{qualifier}"{c}" as "{prefix}{c}"' for c in names)
+
+    # Generic table operations
+
+    def insert(self, table: str, data: dict) -> dict:
+        spec = TABLES[table]
+        row = apply_defaults(spec, data)
+        columns = list(row)
+        placeholders = ", ".join("?" for _ in columns)
+        sql = (
+            f"insert into {table} ({', '.join(columns)}) values ({placeholders}) returning *"
+        )
+        result = self.write(sql, tuple(self.encode(spec, c, row[c]) for c in columns))
+        return self.decode(spec, result[0])
+
+    def select(self, table: str, where: dict, columns: str = "*") -> list[dict]:
+        spec = TABLES[table]
+        clause = " and ".join(f'"{c}" = ?' for c in where) or "1 = 1"
+        sql = f"select {self.select_list(spec, columns)} from {table} where {clause}"
+        rows = self.query(sql, tuple(self.encode(spec, c, v) for c, v in where.items()))
+        return [self.decode(spec, r) for r in rows]
+
+    def select_page(
+        self,
+        table: str,
+        conditions: list[str],
+        params: list,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        """Keyset page ordered created_at desc, id desc; conditions are ANDed SQL fragments."""
+        spec = TABLES[table]
+        clause = " and ".join(conditions) or "1 = 1"
+        total = None
+        if with_total:
+            total = self.query(f"select count(*) from {table} where {clause}", tuple(params))[0][0]
+        params = list(params)
+        if after is not None:
+            clause += " and (created_at, id) < (?, ?)"
+            params += [after.created_at, after.id]
+        sql = (
+            f"select {self.select_list(spec, columns)} from {table} "
+            f"where {clause} order by created_at desc, id desc"
+        )
+        if limit is not None:
+            sql += " limit ?"
+            params.append(limit + 1)
+        rows = self.query(sql, tuple(params))
+        return make_page([self.decode(spec, r) for r in rows], limit, total)
+
+    def select_missing_summary(self, table: str, columns: str, limit: int) -> list[dict]:
+        spec = TABLES[table]
+        rows = self.query(
+            f"select {self.select_list(spec, columns)} from {table} "
+            "where critical_path_minutes is null order by id limit ?",
+            (limit,),
+        )
+        return [self.decode(spec, r) for r in rows]
+
+    def first(self, table: str, where: dict, columns: str = "*") -> Optional[dict]:
+        rows = self.select(table, where, columns)
+        return rows[0] if rows else None
+
+    def update(self, table: str, where: dict, data: dict) -> Optional[dict]:
+        spec = TABLES[table]
+        data = touch(spec, data)
+        assignments = ", ".join(f'"{c}" = ?' for c in data)
+        clause = " and ".join(f'"{c}" = ?' for c in where)
+        params = tuple(self.encode(spec, c, v) for c, v in data.items()) + tuple(
+            self.encode(spec, c, v) for c, v in where.items()
+        )
+        rows = self.write(f"update {table} set {assignments} where {clause} returning *", params)
+        return self.decode(spec, rows[0]) if rows else None
+
+    def delete(self, table: str, where: dict) -> None:
+        spec = TABLES[table]
+        clause = " and ".join(f'"{c}" = ?' for c in where)
+        self.write(
+            f"delete from {table} where {clause}",
+            tuple(self.encode(spec, c, v) for c, v in where.items()),
+        )
+
+
+class SQLiteProfileRepository(ProfileRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def get(self, user_id: str, columns: str = "*") -> Optional[dict]:
+        return self.db.first("profiles", {"id": user_id}, columns)
+
+    async def get_by_stripe_customer(self, customer_id: str, columns: str = "id") -> Optional[dict]:
+        return self.db.first("profiles", {"stripe_customer_id": customer_id}, columns)
+
+    async def create(self, data: dict) -> dict:
+        return self.db.insert("profiles", data)
+
+    async def update(self, user_id: str, data: dict) -> Optional[dict]:
+        return self.db.update("profiles", {"id": user_id}, data)
+
+
+class SQLiteRecipeRepository(RecipeRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        return self.db.select_page(
+            "recipes", ["user_id = ?"], [user_id], columns, limit, after, with_total
+        )
+
+    async def get(self, recipe_id: str, user_id: str) -> Optional[dict]:
+        return self.db.first("recipes", {"id": recipe_id, "user_id": user_id})
+
+    async def exists(self, recipe_id: str, user_id: str) -> bool:
+        return self.db.first("recipes", {"id": recipe_id, "user_id": user_id}, "id") is not None
+
+    async def create(self, data: dict) -> dict:
+        return self.db.insert("recipes", data)
+
+    async def update(self, recipe_id: str, user_id: str, data: dict) -> Optional[dict]:
+        return self.db.update("recipes", {"id": recipe_id, "user_id": user_id}, data)
+
+    async def delete(self, recipe_id: str, user_id: str) -> None:
+        self.db.delete("recipes", {"id": recipe_id, "user_id": user_id})
+
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        return self.db.select_missing_summary("recipes", "id, user_id, normalized", limit)
+
+
+class SQLiteEventRepository(EventRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        return self.db.select_page(
+            "events", ["user_id = ?"], [user_id], "*", limit, after, with_total
+        )
+
+    async def get(self, event_id: str, user_id: str) -> Optional[dict]:
+        return self.db.first("events", {"id": event_id, "user_id": user_id})
+
+    async def get_by_public_token(self, token: str) -> Optional[dict]:
+        return self.db.first("events", {"public_token": token})
+
+    async def exists(self, event_id: str, user_id: str) -> bool:
+        return self.db.first("events", {"id": event_id, "user_id": user_id}, "id") is not None
+
+    async def create(self, data: dict) -> dict:
+        return self.db.insert("events", data)
+
+    async def update(self, event_id: str, user_id: str, data: dict) -> Optional[dict]:
+        return self.db.update("events", {"id": event_id, "user_id": user_id}, data)
+
+    async def delete(self, event_id: str, user_id: str) -> None:
+        self.db.delete("events", {"id": event_id, "user_id": user_id})
+
+
+class SQLiteEventRecipeRepository(EventRecipeRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def list_for_event(self, event_id: str, recipe_columns: str) -> list[dict]:
+        er_spec, recipe_spec = TABLES["event_recipes"], TABLES["recipes"]
+        sql = (
+            f"select {self.db.select_list(er_spec, '*', 'er')}, "
+            f"{self.db.select_list(recipe_spec, recipe_columns, 'r', 'r__')} "
+            "from event_recipes er join recipes r on r.id = er.recipe_id "
+            "where er.event_id = ?"
+        )
+        rows = []
+        for row in self.db.query(sql, (event_id,)):
+            er_row = {k: v for k, v in self.db.decode(er_spec, row).items() if not k.startswith("r__")}
+            er_row["recipes"] = self.db.decode(recipe_spec, row, "r__")
+            rows.append(er_row)
+        return rows
+
+    async def attach(self, data: dict) -> dict:
+        return self.db.insert("event_recipes", data)
+
+    async def detach(self, event_id: str, recipe_id: str) -> None:
+        self.db.delete("event_recipes", {"event_id": event_id, "recipe_id": recipe_id})
+
+
+class SQLiteRecipeLibraryRepository(RecipeLibraryRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def list(
+        self,
+        category: Optional[str],
+        search: Optional[str],
+        limit: int,
+        after: Optional[Cursor] = None,
+        columns: str = "*",
+        with_total: bool = False,
+    ) -> Page:
+        terms = search_terms(search)
+        if terms:
+            return self._search(to_fts5_query(terms), category, limit, after, columns, with_total)
+        conditions, params = [], []
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        return self.db.select_page(
+            "recipe_library", conditions, params, columns, limit, after, with_total
+        )
+
+    async def list_updated_since(
+        self,
+        after: Optional[tuple[str, str]],
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        spec = TABLES["recipe_library"]
+        clause, params = "1 = 1", []
+        if after is not None:
+            clause, params = "(updated_at, id) > (?, ?)", list(after)
+        rows = self.db.query(
+            f"select {self.db.select_list(spec, columns)} from recipe_library "
+            f"where {clause} order by updated_at, id limit ?",
+            tuple(params) + (limit,),
+        )
+        return [self.db.decode(spec, r) for r in rows]
+
+    def _search(
+        self,
+        match: str,
+        category: Optional[str],
+        limit: int,
+        after: Optional[Cursor],
+        columns: str,
+        with_total: bool,
+    ) -> Page:
+        """Ranked FTS5 search, paged on (rank, created_at, id)."""
+        spec = TABLES["recipe_library"]
+        clause, params = "recipe_library_fts match ?", [match]
+        if category:
+            clause += " and l.category = ?"
+            params.append(category)
+        matches = (
+            "from recipe_library_fts join recipe_library l on l.rowid = recipe_library_fts.rowid "
+            f"where {clause}"
+        )
+
+        total = None
+        if with_total:
+            total = self.db.query(f"select count(*) {matches}", tuple(params))[0][0]
+
+        # Same column weights as the tsvector in Postgres: title, tags, ingredients, description
+        sql = (
+            f"select * from (select {self.db.select_list(spec, columns, 'l')}, "
+            f"-bm25(recipe_library_fts, 10.0, 4.0, 2.0, 1.0) as rank {matches})"
+        )
+        if after is not None:
+            sql += " where (rank, created_at, id) < (?, ?, ?)"
+            params += [after.rank or 0.0, after.created_at, after.id]
+        sql += " order by rank desc, created_at desc, id desc limit ?"
+        params.append(limit + 1)
+        rows = self.db.query(sql, tuple(params))
+        return make_page([self.db.decode(spec, r) for r in rows], limit, total)
+
+    async def list_by_load(
+        self,
+        category: str,
+        max_critical_path_minutes: int,
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        spec = TABLES["recipe_library"]
+        rows = self.db.query(
+            f"select {self.db.select_list(spec, columns)} from recipe_library "
+            "where category = ? and critical_path_minutes <= ? order by critical_path_minutes, id limit ?",
+            (category, max_critical_path_minutes, limit),
+        )
+        return [self.db.decode(spec, r) for r in rows]
+
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        return self.db.select_missing_summary("recipe_library", "id, normalized", limit)
+
+    async def get(self, recipe_id: str) -> Optional[dict]:
+        return self.db.first("recipe_library", {"id": recipe_id})
+
+    async def get_many(self, recipe_ids: List[str], columns: str = "*") -> List[dict]:
+        if not recipe_ids:
+            return []
+        spec = TABLES["recipe_library"]
+        placeholders = ", ".join("?" for _ in recipe_ids)
+        rows = self.db.query(
+            f"select {self.db.select_list(spec, columns)} from recipe_library where id in ({placeholders})",
+            tuple(recipe_ids),
+        )
+        return [self.db.decode(spec, r) for r in rows]
+
+    async def create(self, data: dict) -> dict:
+        return self.db.insert("recipe_library", data)
+
+    async def update(self, recipe_id: str, data: dict) -> Optional[dict]:
+        return self.db.update("recipe_library", {"id": recipe_id}, data)
+
+
+class SQLiteGiftCodeRepository(GiftCodeRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def get_by_code(self, code: str) -> Optional[dict]:
+        return self.db.first("gift_codes", {"code": code})
+
+    async def code_exists(self, code: str) -> bool:
+        return self.db.first("gift_codes", {"code": code}, "code") is not None
+
+    async def create(self, data: dict) -> dict:
+        return self.db.insert("gift_codes", data)
+
+    async def update(self, gift_code_id: str, data: dict) -> Optional[dict]:
+        return self.db.update("gift_codes", {"id": gift_code_id}, data)
+
+
+class SQLiteWaitlistRepository(WaitlistRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return self.db.first("waitlist", {"email": email})
+
+    async def create(self, data: dict) -> dict:
+        return self.db.insert("waitlist", data)
+
+    async def update_by_email(self, email: str, data: dict) -> Optional[dict]:
+        return self.db.update("waitlist", {"email": email}, data)
+
+
+def create_sqlite_repositories(db: SQLiteDatabase) -> Repositories:
+    return Repositories(
+        profiles=SQLiteProfileRepository(db),
+        recipes=SQLiteRecipeRepository(db),
+        events=SQLiteEventRepository(db),
+        event_recipes=SQLiteEventRecipeRepository(db),
+        recipe_library=SQLiteRecipeLibraryRepository(db),
+        gift_codes=SQLiteGiftCodeRepository(db),
+        waitlist=SQLiteWaitlistRepository(db),
+    )
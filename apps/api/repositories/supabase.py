@@ -0,0 +1,327 @@
+"""
+Supabase (PostgREST) implementation of the repositories.
+All queries run through lib.db.execute so they never block the event loop.
+"""
+from typing import List, Optional
+
+from supabase import Client
+
+from ..lib.db import execute
+from ..lib.pagination import Cursor
+from ..lib.search import search_terms, to_prefix_tsquery
+from .base import (
+    EventRecipeRepository,
+    EventRepository,
+    GiftCodeRepository,
+    Page,
+    ProfileRepository,
+    RecipeLibraryRepository,
+    RecipeRepository,
+    Repositories,
+    WaitlistRepository,
+    make_page,
+    utcnow_iso,
+)
+
+
+def _first(response) -> Optional[dict]:
+    return response.data[0] if response.data else None
+
+
+def _keyset(query, limit: Optional[int], after: Optional[Cursor]):
+    """
+    Order by (created_at desc, id desc) and start after the cursor, so
+    Postgres can seek straight into the (…, created_at, id) index instead of
+    scanning past an OFFSET. Fetches one extra row to detect a next page.
+    """
+    if after is not None:
+        created_at, row_id = after.created_at, after.id
+        # Timestamps contain ':' and '.', which are reserved in PostgREST logic trees
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})'
+        )
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def _count(with_total: bool) -> Optional[str]:
+    # Planner estimate for large results; PostgREST falls back to an exact count for small ones
+    return "estimated" if with_total else None
+
+
+class SupabaseProfileRepository(ProfileRepository):
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def get(self, user_id: str, columns: str = "*") -> Optional[dict]:
+        return _first(await execute(self.client.table("profiles").select(columns).eq("id", user_id)))
+
+    async def get_by_stripe_customer(self, customer_id: str, columns: str = "id") -> Optional[dict]:
+        return _first(await execute(
+            self.client.table("profiles").select(columns).eq("stripe_customer_id", customer_id)
+        ))
+
+    async def create(self, data: dict) -> dict:
+        return _first(await execute(self.client.table("profiles").insert(data)))
+
+    async def update(self, user_id: str, data: dict) -> Optional[dict]:
+        return _first(await execute(self.client.table("profiles").update(data).eq("id", user_id)))
+
+
+class SupabaseRecipeRepository(RecipeRepository):
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        query = self.client.table("recipes").select(columns, count=_count(with_total)).eq("user_id", user_id)
+        response = await execute(_keyset(query, limit, after))
+        return make_page(response.data, limit, response.count)
+
+    async def get(self, recipe_id: str, user_id: str) -> Optional[dict]:
+        return _first(await execute(
+            self.client.table("recipes").select("*").eq("id", recipe_id).eq("user_id", user_id)
+        ))
+
+    async def exists(self, recipe_id: str, user_id: str) -> bool:
+        response = await execute(
+            self.client.table("recipes").select("id").eq("id", recipe_id).eq("user_id", user_id)
+        )
+        return bool(response.data)
+
+    async def create(self, data: dict) -> dict:
+        return _first(await execute(self.client.table("recipes").insert(data)))
+
+    async def update(self, recipe_id: str, user_id: str, data: dict) -> Optional[dict]:
+        return _first(await execute(
+            self.client.table("recipes").update(data).eq("id", recipe_id).eq("user_id", user_id)
+        ))
+
+    async def delete(self, recipe_id: str, user_id: str) -> None:
+        await execute(self.client.table("recipes").delete().eq("id", recipe_id).eq("user_id", user_id))
+
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        query = self.client.table("recipes").select("id, user_id, normalized").is_("critical_path_minutes", "null")
+        response = await execute(query.order("id").limit(limit))
+        return response.data
+
+
+class SupabaseEventRepository(EventRepository):
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        with_total: bool = False,
+    ) -> Page:
+        query = self.client.table("events").select("*", count=_count(with_total)).eq("user_id", user_id)
+        response = await execute(_keyset(query, limit, after))
+        return make_page(response.data, limit, response.count)
+
+    async def get(self, event_id: str, user_id: str) -> Optional[dict]:
+        return _first(await execute(
+            self.client.table("events").select("*").eq("id", event_id).eq("user_id", user_id)
+        ))
+
+    async def get_by_public_token(self, token: str) -> Optional[dict]:
+        return _first(await execute(self.client.table("events").select("*").eq("public_token", token)))
+
+    async def exists(self, event_id: str, user_id: str) -> bool:
+        response = await execute(
+            self.client.table("events").select("id").eq("id", event_id).eq("user_id", user_id)
+        )
+        return bool(response.data)
+
+    async def create(self, data: dict) -> dict:
+        return _first(await execute(self.client.table("events").insert(data)))
+
+    async def update(self, event_id: str, user_id: str, data: dict) -> Optional[dict]:
+        return _first(await execute(
+            self.client.table("events").update(data).eq("id", event_id).eq("user_id", user_id)
+        ))
+
+    async def delete(self, event_id: str, user_id: str) -> None:
+        await execute(self.client.table("events").delete().eq("id", event_id).eq("user_id", user_id))
+
+
+class SupabaseEventRecipeRepository(EventRecipeRepository):
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def list_for_event(self, event_id: str, recipe_columns: str) -> list[dict]:
+        response = await execute(
+            self.client.table("event_recipes").select(
+                f"recipe_id, target_headcount, course_order, is_primary, recipes!inner({recipe_columns})"
+            ).eq("event_id", event_id)
+        )
+        return response.data
+
+    async def attach(self, data: dict) -> dict:
+        return _first(await execute(self.client.table("event_recipes").insert(data)))
+
+    async def detach(self, event_id: str, recipe_id: str) -> None:
+        await execute(
+            self.client.table("event_recipes").delete().eq("event_id", event_id).eq("recipe_id", recipe_id)
+        )
+
+
+class SupabaseRecipeLibraryRepository(RecipeLibraryRepository):
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def list(
+        self,
+        category: Optional[str],
+        search: Optional[str],
+        limit: int,
+        after: Optional[Cursor] = None,
+        columns: str = "*",
+        with_total: bool = False,
+    ) -> Page:
+        terms = search_terms(search)
+        if terms:
+            return await self._search(to_prefix_tsquery(terms), category, limit, after, columns, with_total)
+
+        query = self.client.table("recipe_library").select(columns, count=_count(with_total))
+        if category:
+            query = query.eq("category", category)
+        response = await execute(_keyset(query, limit, after))
+        return make_page(response.data, limit, response.count)
+
+    async def list_updated_since(
+        self,
+        after: Optional[tuple[str, str]],
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        query = self.client.table("recipe_library").select(columns)
+        if after is not None:
+            updated_at, row_id = after
+            query = query.or_(
+                f'updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt.{row_id})'
+            )
+        response = await execute(query.order("updated_at").order("id").limit(limit))
+        return response.data
+
+    async def _search(
+        self,
+        tsquery: str,
+        category: Optional[str],
+        limit: int,
+        after: Optional[Cursor],
+        columns: str,
+        with_total: bool,
+    ) -> Page:
+        """
+        Ranked search through the search_recipe_library function, which
+        matches against the GIN-indexed search_vector and pages on
+        (rank, created_at, id).
+        """
+        params = {
+            "search_query": tsquery,
+            "filter_category": category,
+            "after_rank": after.rank if after else None,
+            "after_created_at": after.created_at if after else None,
+            "after_id": after.id if after else None,
+        }
+        select = "*" if columns.strip() == "*" else f"{columns}, rank"
+        query = (
+            self.client.postgrest.rpc("search_recipe_library", params, count=_count(with_total))
+            .select(select)
+            .limit(limit + 1)
+        )
+        response = await execute(query)
+        return make_page(response.data, limit, response.count)
+
+    async def list_by_load(
+        self,
+        category: str,
+        max_critical_path_minutes: int,
+        limit: int,
+        columns: str = "*",
+    ) -> List[dict]:
+        query = (
+            self.client.table("recipe_library")
+            .select(columns)
+            .eq("category", category)
+            .lte("critical_path_minutes", max_critical_path_minutes)
+        )
+        response = await execute(query.order("critical_path_minutes").order("id").limit(limit))
+        return response.data
+
+    async def list_missing_summary(self, limit: int) -> List[dict]:
+        query = self.client.table("recipe_library").select("id, normalized").is_("critical_path_minutes", "null")
+        response = await execute(query.order("id").limit(limit))
+        return response.data
+
+    async def get(self, recipe_id: str) -> Optional[dict]:
+        return _first(await execute(self.client.table("recipe_library").select("*").eq("id", recipe_id)))
+
+    async def get_many(self, recipe_ids: List[str], columns: str = "*") -> List[dict]:
+        if not recipe_ids:
+            return []
+        response = await execute(self.client.table("recipe_library").select(columns).in_("id", recipe_ids))
+        return response.data
+
+    async def create(self, data: dict) -> dict:
+        return _first(await execute(self.client.table("recipe_library").insert(data)))
+
+    async def update(self, recipe_id: str, data: dict) -> Optional[dict]:
+        return _first(await execute(self.client.table("recipe_library").update(data).eq("id", recipe_id)))
+
+
+class SupabaseGiftCodeRepository(GiftCodeRepository):
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def get_by_code(self, code: str) -> Optional[dict]:
+        return _first(await execute(self.client.table("gift_codes").select("*").eq("code", code)))
+
+    async def code_exists(self, code: str) -> bool:
+        response = await execute(self.client.table("gift_codes").select("code").eq("code", code))
+        return bool(response.data)
+
+    async def create(self, data: dict) -> dict:
+        return _first(await execute(self.client.table("gift_codes").insert(data)))
+
+    async def update(self, gift_code_id: str, data: dict) -> Optional[dict]:
+        return _first(await execute(self.client.table("gift_codes").update(data).eq("id", gift_code_id)))
+
+
+class SupabaseWaitlistRepository(WaitlistRepository):
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return _first(await execute(self.client.table("waitlist").select("*").eq("email", email)))
+
+    async def create(self, data: dict) -> dict:
+        return _first(await execute(self.client.table("waitlist").insert(data)))
+
+    async def update_by_email(self, email: str, data: dict) -> Optional[dict]:
+        # waitlist has no updated_at trigger, so stamp it here
+        data = {**data, "updated_at": utcnow_iso()}
+        return _first(await execute(self.client.table("waitlist").update(data).eq("email", email)))
+
+
+def create_supabase_repositories(client: Client) -> Repositories:
+    return Repositories(
+        profiles=SupabaseProfileRepository(client),
+        recipes=SupabaseRecipeRepository(client),
+        events=SupabaseEventRepository(client),
+        event_recipes=SupabaseEventRecipeRepository(client),
+        recipe_library=SupabaseRecipeLibraryRepository(client),
+        gift_codes=SupabaseGiftCodeRepository(client),
+        waitlist=SupabaseWaitlistRepository(client),
+    )
@@ -0,0 +1,198 @@
+"""
+Table definitions shared by the local (in-memory and SQLite) backends.
+
+These mirror supabase/schema.sql plus the migrations in supabase/migrations:
+the same columns, defaults, unique keys and cascades. Column defaults that
+Postgres computes (ids, timestamps, gift code expiry) are filled in by
+``apply_defaults``.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from .base import new_id, utcnow_iso
+
+
+# Station-load summary columns of recipes and recipe_library (services/station_load.py)
+LOAD_SUMMARY_DEFAULTS = {
+    "station_minutes": None,
+    "oven_minutes": None,
+    "stove_minutes": None,
+    "hands_on_minutes": None,
+    "critical_path_minutes": None,
+    "peak_concurrency": None,
+    "task_count": None,
+    "ingredient_grams": None,
+}
+
+
+def _one_year_from_now() -> str:
+    return (datetime.now(timezone.utc) + timedelta(days=365)).isoformat()
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    defaults: dict[str, Any]
+    json_columns: frozenset[str] = frozenset()
+    bool_columns: frozenset[str] = frozenset()
+    unique: tuple[tuple[str, ...], ...] = ()
+    has_updated_at: bool = True
+    # Columns whose default must be computed at insert time
+    computed_defaults: dict[str, Callable[[], Any]] = field(default_factory=dict)
+    # (child table, foreign key column) rows removed when a row here is deleted
+    cascades: tuple[tuple[str, str], ...] = ()
+
+    @property
+    def columns(self) -> list[str]:
+        base = ["id"] + list(self.defaults) + list(self.computed_defaults) + ["created_at"]
+        if self.has_updated_at:
+            base.append("updated_at")
+        return base
+
+
+TABLES: dict[str, TableSpec] = {
+    spec.name: spec
+    for spec in [
+        TableSpec(
+            name="profiles",
+            defaults={
+                "email": None,
+                "display_name": None,
+                "default_headcount": None,
+                "oven_capacity_lbs": None,
+                "burner_count": None,
+                "tier": "free",
+                "subscription_status": None,
+                "renewal_date": None,
+                "stripe_customer_id": None,
+                "stripe_subscription_id": None,
+                "onboarding_completed": False,
+            },
+            bool_columns=frozenset({"onboarding_completed"}),
+            cascades=(("recipes", "user_id"), ("events", "user_id")),
+        ),
+        TableSpec(
+            name="recipes",
+            defaults={
+                "user_id": None,
+                "title": None,
+                "category": None,
+                "base_headcount": None,
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "method": None,
+                "day_before_ok": False,
+                "source_type": None,
+                "source_raw": None,
+                "normalized": None,
+                "notes": None,
+                **LOAD_SUMMARY_DEFAULTS,
+            },
+            json_columns=frozenset({"source_raw", "normalized", "station_minutes"}),
+            bool_columns=frozenset({"day_before_ok"}),
+            cascades=(("event_recipes", "recipe_id"),),
+        ),
+        TableSpec(
+            name="events",
+            defaults={
+                "user_id": None,
+                "name": None,
+                "event_type": None,
+                "event_date": None,
+                "headcount": None,
+                "location": None,
+                "vibe": None,
+                "notes": None,
+                "public_token": None,
+            },
+            cascades=(("event_recipes", "event_id"),),
+        ),
+        TableSpec(
+            name="event_recipes",
+            defaults={
+                "event_id": None,
+                "recipe_id": None,
+                "target_headcount": None,
+                "course_order": 0,
+                "is_primary": False,
+            },
+            bool_columns=frozenset({"is_primary"}),
+            unique=(("event_id", "recipe_id"),),
+            has_updated_at=False,
+        ),
+        TableSpec(
+            name="recipe_library",
+            defaults={
+                "title": None,
+                "category": None,
+                "base_headcount": 4,
+                "prep_time_minutes": 0,
+                "cook_time_minutes": 0,
+                "method": None,
+                "day_before_ok": False,
+                "source_type": "library",
+                "source_raw": None,
+                "normalized": None,
+                "description": None,
+                "image_url": None,
+                "tags": [],
+                **LOAD_SUMMARY_DEFAULTS,
+            },
+            json_columns=frozenset({"source_raw", "normalized", "tags", "station_minutes"}),
+            bool_columns=frozenset({"day_before_ok"}),
+        ),
+        TableSpec(
+            name="gift_codes",
+            defaults={
+                "code": None,
+                "purchaser_email": None,
+                "recipient_name": None,
+                "recipient_email": None,
+                "message": None,
+                "plan": "pro_annual",
+                "status": "new",
+                "redeemed_by": None,
+                "redeemed_at": None,
+            },
+            computed_defaults={"expires_at": _one_year_from_now},
+            unique=(("code",),),
+            has_updated_at=False,
+        ),
+        TableSpec(
+            name="waitlist",
+            defaults={
+                "email": None,
+                "wants_tips": False,
+                "source": None,
+            },
+            bool_columns=frozenset({"wants_tips"}),
+            unique=(("email",),),
+        ),
+    ]
+}
+
+
+def apply_defaults(spec: TableSpec, data: dict) -> dict:
+    """Build a full row for insert: schema defaults overlaid with data."""
+    now = utcnow_iso()
+    row = {"id": new_id(), **spec.defaults}
+    for column, factory in spec.computed_defaults.items():
+        row[column] = factory()
+    row["created_at"] = now
+    if spec.has_updated_at:
+        row["updated_at"] = now
+    # Mutable defaults (tags) must not be shared between rows
+    for column in spec.json_columns:
+        if isinstance(row.get(column), list):
+            row[column] = list(row[column])
+    row.update({k: v for k, v in data.items() if k != "id" or v is not None})
+    return row
+
+
+def touch(spec: TableSpec, data: dict) -> dict:
+    """Add the updated_at stamp the Postgres trigger would set."""
+    if spec.has_updated_at and "updated_at" not in data:
+        return {**data, "updated_at": utcnow_iso()}
+    return data
+
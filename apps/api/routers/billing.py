@@ -9,7 +9,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from ..dependencies import require_auth, Settings, get_settings
-from ..lib.supabase_client import require_supabase
+from ..repositories import get_repositories, Repositories
 
 logger = logging.getLogger(__name__)
 
@@ -94,7 +94,7 @@ def get_stripe_price_id(plan: str, stripe_client) -> str:
         # Check if it's a Stripe error
         error_type = type(e).__name__
         if "Stripe" in error_type or "stripe" in str(type(e)).lower():
-            logger.error(f"Stripe error getting price ID: {str(e)}", exc_info=True)
+            logger.error("Stripe error getting price ID: %s", e, exc_info=True)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to get Stripe price: {str(e)}"
@@ -114,17 +114,14 @@ async def create_checkout_session(
     """
     try:
         stripe_client = get_stripe_client(settings)
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Get user profile to check for existing Stripe customer ID
-        profile_response = supabase.table("profiles").select(
-            "email, stripe_customer_id"
-        ).eq("id", user_id).execute()
+        profile = await repos.profiles.get(user_id, "email, stripe_customer_id")
         
-        if not profile_response.data:
+        if not profile:
             raise HTTPException(status_code=404, detail="User profile not found")
         
-        profile = profile_response.data[0]
         user_email = profile.get("email")
         stripe_customer_id = profile.get("stripe_customer_id")
         
@@ -137,25 +134,26 @@ async def create_checkout_session(
             stripe_customer_id = customer.id
             
             # Save customer ID to profile
-            supabase.table("profiles").update({
+            await repos.profiles.update(user_id, {
                 "stripe_customer_id": stripe_customer_id
-            }).eq("id", user_id).execute()
+            })
         else:
             # Verify customer exists
             try:
                 stripe_client.Customer.retrieve(stripe_customer_id)
             except Exception as e:
                 # Check if it's a Stripe InvalidRequestError
-                if "InvalidRequestError" in str(type(e)) or "stripe" in str(type(e)).lower():
+                if "InvalidRequestError" not in str(type(e)) and "stripe" not in str(type(e)).lower():
+                    raise
                 # Customer doesn't exist, create new one
                 customer = stripe_client.Customer.create(
                     email=user_email,
                     metadata={"user_id": user_id}
                 )
                 stripe_customer_id = customer.id
-                supabase.table("profiles").update({
+                await repos.profiles.update(user_id, {
                     "stripe_customer_id": stripe_customer_id
-                }).eq("id", user_id).execute()
+                })
         
         # Get price ID for the plan
         price_id = get_stripe_price_id(request.plan, stripe_client)
@@ -183,7 +181,7 @@ async def create_checkout_session(
             },
         )
         
-        logger.info(f"Checkout session created for user {user_id}, plan {request.plan}")
+        logger.info("Checkout session created for user %s, plan %s", user_id, request.plan)
         
         return CheckoutResponse(url=checkout_session.url)
         
@@ -192,7 +190,7 @@ async def create_checkout_session(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Failed to create checkout session: {str(e)}", exc_info=True)
+        logger.error("Failed to create checkout session: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create checkout session: {str(e)}"
@@ -227,7 +225,7 @@ async def handle_webhook(
     
     try:
         stripe_client = get_stripe_client(settings)
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Get raw body - read as bytes before FastAPI processes it
         payload = await request.body()
@@ -244,50 +242,50 @@ async def handle_webhook(
                 settings.STRIPE_WEBHOOK_SECRET
             )
         except ValueError as e:
-            logger.error(f"Invalid webhook payload: {str(e)}")
+            logger.error("Invalid webhook payload: %s", e)
             raise HTTPException(status_code=400, detail="Invalid payload")
         except Exception as e:
             # Check if it's a Stripe SignatureVerificationError
             if "SignatureVerificationError" not in str(type(e)) and "stripe" not in str(type(e)).lower():
                 raise
             # It's a Stripe signature error
-            logger.error(f"Invalid webhook signature: {str(e)}")
+            logger.error("Invalid webhook signature: %s", e)
             raise HTTPException(status_code=400, detail="Invalid signature")
         
         # Handle the event
         event_type = event["type"]
         event_data = event["data"]["object"]
         
-        logger.info(f"Received Stripe webhook: {event_type}")
+        logger.info("Received Stripe webhook: %s", event_type)
         
         if event_type == "checkout.session.completed":
-            await handle_checkout_completed(event_data, supabase, stripe_client)
+            await handle_checkout_completed(event_data, repos, stripe_client)
         
         elif event_type == "invoice.payment_succeeded":
-            await handle_invoice_payment_succeeded(event_data, supabase, stripe_client)
+            await handle_invoice_payment_succeeded(event_data, repos, stripe_client)
         
         elif event_type == "customer.subscription.updated":
-            await handle_subscription_updated(event_data, supabase)
+            await handle_subscription_updated(event_data, repos)
         
         elif event_type == "customer.subscription.deleted":
-            await handle_subscription_deleted(event_data, supabase)
+            await handle_subscription_deleted(event_data, repos)
         
         else:
-            logger.info(f"Unhandled webhook event type: {event_type}")
+            logger.info("Unhandled webhook event type: %s", event_type)
         
         return JSONResponse({"status": "success"})
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to handle webhook: {str(e)}", exc_info=True)
+        logger.error("Failed to handle webhook: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to handle webhook: {str(e)}"
         )
 
 
-async def handle_checkout_completed(session_data: dict, supabase, stripe_client):
+async def handle_checkout_completed(session_data: dict, repos: Repositories, stripe_client):
     """Handle checkout.session.completed event."""
     try:
         user_id = session_data.get("metadata", {}).get("user_id")
@@ -312,7 +310,7 @@ async def handle_checkout_completed(session_data: dict, supabase, stripe_client)
                     subscription.current_period_end
                 ).isoformat()
             except Exception as e:
-                logger.error(f"Failed to get subscription: {str(e)}")
+                logger.error("Failed to get subscription: %s", e)
         
         # Update profile
         update_data = {
@@ -324,16 +322,16 @@ async def handle_checkout_completed(session_data: dict, supabase, stripe_client)
         if renewal_date:
             update_data["renewal_date"] = renewal_date
         
-        supabase.table("profiles").update(update_data).eq("id", user_id).execute()
+        await repos.profiles.update(user_id, update_data)
         
-        logger.info(f"Updated profile for user {user_id}: tier={tier}, subscription={subscription_id}")
+        logger.info("Updated profile for user %s: tier=%s, subscription=%s", user_id, tier, subscription_id)
         
     except Exception as e:
-        logger.error(f"Error handling checkout completed: {str(e)}", exc_info=True)
+        logger.error("Error handling checkout completed: %s", e, exc_info=True)
         raise
 
 
-async def handle_invoice_payment_succeeded(invoice_data: dict, supabase, stripe_client):
+async def handle_invoice_payment_succeeded(invoice_data: dict, repos: Repositories, stripe_client):
     """Handle invoice.payment_succeeded event."""
     try:
         subscription_id = invoice_data.get("subscription")
@@ -348,14 +346,12 @@ async def handle_invoice_payment_succeeded(invoice_data: dict, supabase, stripe_
         
         # Find user by customer ID if metadata doesn't have user_id
         if not user_id:
-            profile_response = supabase.table("profiles").select("id").eq(
-                "stripe_customer_id", customer_id
-            ).execute()
-            if profile_response.data:
-                user_id = profile_response.data[0]["id"]
+            profile = await repos.profiles.get_by_stripe_customer(customer_id)
+            if profile:
+                user_id = profile["id"]
         
         if not user_id:
-            logger.warning(f"Invoice payment succeeded but no user_id found for customer {customer_id}")
+            logger.warning("Invoice payment succeeded but no user_id found for customer %s", customer_id)
             return
         
         # Update renewal date
@@ -363,19 +359,19 @@ async def handle_invoice_payment_succeeded(invoice_data: dict, supabase, stripe_
             subscription.current_period_end
         ).isoformat()
         
-        supabase.table("profiles").update({
+        await repos.profiles.update(user_id, {
             "renewal_date": renewal_date,
             "subscription_status": "active",
-        }).eq("id", user_id).execute()
+        })
         
-        logger.info(f"Updated renewal date for user {user_id}")
+        logger.info("Updated renewal date for user %s", user_id)
         
     except Exception as e:
-        logger.error(f"Error handling invoice payment succeeded: {str(e)}", exc_info=True)
+        logger.error("Error handling invoice payment succeeded: %s", e, exc_info=True)
         raise
 
 
-async def handle_subscription_updated(subscription_data: dict, supabase):
+async def handle_subscription_updated(subscription_data: dict, repos: Repositories):
     """Handle customer.subscription.updated event."""
     try:
         subscription_id = subscription_data.get("id")
@@ -383,15 +379,13 @@ async def handle_subscription_updated(subscription_data: dict, supabase):
         status = subscription_data.get("status")
         
         # Find user by customer ID
-        profile_response = supabase.table("profiles").select("id").eq(
-            "stripe_customer_id", customer_id
-        ).execute()
+        profile = await repos.profiles.get_by_stripe_customer(customer_id)
         
-        if not profile_response.data:
-            logger.warning(f"Subscription updated but no user found for customer {customer_id}")
+        if not profile:
+            logger.warning("Subscription updated but no user found for customer %s", customer_id)
             return
         
-        user_id = profile_response.data[0]["id"]
+        user_id = profile["id"]
         
         # Determine tier from subscription metadata or default to pro
         plan = subscription_data.get("metadata", {}).get("plan", "pro")
@@ -411,42 +405,40 @@ async def handle_subscription_updated(subscription_data: dict, supabase):
             ).isoformat()
             update_data["renewal_date"] = renewal_date
         
-        supabase.table("profiles").update(update_data).eq("id", user_id).execute()
+        await repos.profiles.update(user_id, update_data)
         
-        logger.info(f"Updated subscription status for user {user_id}: status={status}")
+        logger.info("Updated subscription status for user %s: status=%s", user_id, status)
         
     except Exception as e:
-        logger.error(f"Error handling subscription updated: {str(e)}", exc_info=True)
+        logger.error("Error handling subscription updated: %s", e, exc_info=True)
         raise
 
 
-async def handle_subscription_deleted(subscription_data: dict, supabase):
+async def handle_subscription_deleted(subscription_data: dict, repos: Repositories):
     """Handle customer.subscription.deleted event."""
     try:
         customer_id = subscription_data.get("customer")
         
         # Find user by customer ID
-        profile_response = supabase.table("profiles").select("id").eq(
-            "stripe_customer_id", customer_id
-        ).execute()
+        profile = await repos.profiles.get_by_stripe_customer(customer_id)
         
-        if not profile_response.data:
-            logger.warning(f"Subscription deleted but no user found for customer {customer_id}")
+        if not profile:
+            logger.warning("Subscription deleted but no user found for customer %s", customer_id)
             return
         
-        user_id = profile_response.data[0]["id"]
+        user_id = profile["id"]
         
         # Downgrade to free tier
-        supabase.table("profiles").update({
+        await repos.profiles.update(user_id, {
             "tier": "free",
             "subscription_status": "canceled",
             "stripe_subscription_id": None,
             "renewal_date": None,
-        }).eq("id", user_id).execute()
+        })
         
-        logger.info(f"Downgraded user {user_id} to free tier")
+        logger.info("Downgraded user %s to free tier", user_id)
         
     except Exception as e:
-        logger.error(f"Error handling subscription deleted: {str(e)}", exc_info=True)
+        logger.error("Error handling subscription deleted: %s", e, exc_info=True)
         raise
 
@@ -3,13 +3,19 @@ from uuid import UUID
 import uuid
 import logging
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 
 from ..dependencies import require_auth, Settings, get_settings
-from ..lib.supabase_client import require_supabase
+from ..repositories import get_repositories
+from ..repositories.base import iter_pages
+from ..lib.pagination import STREAM_BATCH_SIZE, decode_cursor, set_page_headers
+from ..lib.http_cache import cached_json
+from ..lib.serialization import Id, ndjson_response, validated_json
+from ..lib.timing import phase
 from ..services.scheduler import build_schedule
 from ..models.recipes import Recipe as RecipeModel
+from ..models.schedule import Schedule
 
 logger = logging.getLogger(__name__)
 
@@ -45,8 +51,8 @@ class EventRecipeAttachRequest(BaseModel):
 
 
 class EventResponse(BaseModel):
-    id: str
-    user_id: str
+    id: Id
+    user_id: Id
     name: str
     event_type: str
     event_date: Optional[str] = None
@@ -64,32 +70,35 @@ class EventWithRecipesResponse(EventResponse):
 
 @router.get("", response_model=list[EventResponse])
 async def list_events(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    include_total: bool = Query(False, description="Report an (estimated) total in X-Total-Count"),
+    stream: bool = Query(False, description="Stream every event after the cursor as NDJSON instead of one page"),
     user_id: str = Depends(require_auth),
     settings: Settings = Depends(get_settings),
 ):
     """
-    List all events for the current user.
+    List events for the current user, most recently created first.
+    Paginated by cursor: pass the X-Next-Cursor response header back as ?cursor=.
+    With ?stream=true, returns all remaining events as NDJSON, one per line;
+    limit does not apply.
     """
+    after = decode_cursor(cursor)
     try:
-        supabase = require_supabase()
-        response = supabase.table("events").select("*").eq("user_id", user_id).order("event_date", desc=True).execute()
-        
-        return [
-            EventResponse(
-                id=str(row["id"]),
-                user_id=str(row["user_id"]),
-                name=row["name"],
-                event_type=row["event_type"],
-                event_date=row.get("event_date"),
-                headcount=row.get("headcount"),
-                location=row.get("location"),
-                vibe=row.get("vibe"),
-                notes=row.get("notes"),
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
-            for row in response.data
-        ]
+        repos = get_repositories()
+        if stream:
+            first = await repos.events.list_for_user(user_id, STREAM_BATCH_SIZE, after, include_total)
+            response = ndjson_response(EventResponse, iter_pages(
+                first, lambda after: repos.events.list_for_user(user_id, STREAM_BATCH_SIZE, after)
+            ))
+            set_page_headers(response, None, first.total)
+            return response
+        
+        page = await repos.events.list_for_user(user_id, limit, after, include_total)
+        
+        response = validated_json(list[EventResponse], page.rows)
+        set_page_headers(response, page.next_cursor, page.total)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch events: {str(e)}")
 
@@ -104,7 +113,7 @@ async def create_event(
     Create a new event.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Validate enums
         if request.event_type not in ["prep_week", "event"]:
@@ -128,25 +137,12 @@ async def create_event(
         if request.notes:
             insert_data["notes"] = request.notes
         
-        response = supabase.table("events").insert(insert_data).execute()
+        row = await repos.events.create(insert_data)
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=500, detail="Failed to create event")
         
-        row = response.data[0]
-        return EventResponse(
-            id=str(row["id"]),
-            user_id=str(row["user_id"]),
-            name=row["name"],
-            event_type=row["event_type"],
-            event_date=row.get("event_date"),
-            headcount=row.get("headcount"),
-            location=row.get("location"),
-            vibe=row.get("vibe"),
-            notes=row.get("notes"),
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-        )
+        return validated_json(EventResponse, row, status_code=201)
     except HTTPException:
         raise
     except Exception as e:
@@ -164,22 +160,18 @@ async def get_event(
     Only returns events owned by the current user.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Get event
-        event_response = supabase.table("events").select("*").eq("id", event_id).eq("user_id", user_id).execute()
-        if not event_response.data:
+        event_row = await repos.events.get(event_id, user_id)
+        if not event_row:
             raise HTTPException(status_code=404, detail="Event not found")
         
-        event_row = event_response.data[0]
-        
         # Get attached recipes
-        recipes_response = supabase.table("event_recipes").select(
-            "recipe_id, target_headcount, course_order, is_primary, recipes!inner(title)"
-        ).eq("event_id", event_id).execute()
+        attached = await repos.event_recipes.list_for_event(event_id, "title")
         
         recipes = []
-        for er_row in recipes_response.data:
+        for er_row in attached:
             recipes.append({
                 "recipe_id": str(er_row["recipe_id"]),
                 "recipe_title": er_row["recipes"]["title"],
@@ -188,20 +180,7 @@ async def get_event(
                 "is_primary": er_row["is_primary"],
             })
         
-        return EventWithRecipesResponse(
-            id=str(event_row["id"]),
-            user_id=str(event_row["user_id"]),
-            name=event_row["name"],
-            event_type=event_row["event_type"],
-            event_date=event_row.get("event_date"),
-            headcount=event_row.get("headcount"),
-            location=event_row.get("location"),
-            vibe=event_row.get("vibe"),
-            notes=event_row.get("notes"),
-            created_at=event_row["created_at"],
-            updated_at=event_row["updated_at"],
-            recipes=recipes,
-        )
+        return validated_json(EventWithRecipesResponse, {**event_row, "recipes": recipes})
     except HTTPException:
         raise
     except Exception as e:
@@ -220,11 +199,10 @@ async def update_event(
     Only allows updating events owned by the current user.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Verify event exists and belongs to user
-        check_response = supabase.table("events").select("id").eq("id", event_id).eq("user_id", user_id).execute()
-        if not check_response.data:
+        if not await repos.events.exists(event_id, user_id):
             raise HTTPException(status_code=404, detail="Event not found")
         
         # Build update dict
@@ -252,25 +230,12 @@ async def update_event(
             # Return existing event
             return await get_event(event_id, user_id, settings)
         
-        response = supabase.table("events").update(update_data).eq("id", event_id).eq("user_id", user_id).execute()
+        row = await repos.events.update(event_id, user_id, update_data)
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=500, detail="Failed to update event")
         
-        row = response.data[0]
-        return EventResponse(
-            id=str(row["id"]),
-            user_id=str(row["user_id"]),
-            name=row["name"],
-            event_type=row["event_type"],
-            event_date=row.get("event_date"),
-            headcount=row.get("headcount"),
-            location=row.get("location"),
-            vibe=row.get("vibe"),
-            notes=row.get("notes"),
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-        )
+        return validated_json(EventResponse, row)
     except HTTPException:
         raise
     except Exception as e:
@@ -288,8 +253,8 @@ async def delete_event(
     Only allows deleting events owned by the current user.
     """
     try:
-        supabase = require_supabase()
-        supabase.table("events").delete().eq("id", event_id).eq("user_id", user_id).execute()
+        repos = get_repositories()
+        await repos.events.delete(event_id, user_id)
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete event: {str(e)}")
@@ -306,28 +271,26 @@ async def attach_recipe_to_event(
     Attach a recipe to an event.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Verify event belongs to user
-        event_check = supabase.table("events").select("id").eq("id", event_id).eq("user_id", user_id).execute()
-        if not event_check.data:
+        if not await repos.events.exists(event_id, user_id):
             raise HTTPException(status_code=404, detail="Event not found")
         
         # Verify recipe belongs to user
-        recipe_check = supabase.table("recipes").select("id").eq("id", request.recipe_id).eq("user_id", user_id).execute()
-        if not recipe_check.data:
+        if not await repos.recipes.exists(request.recipe_id, user_id):
             raise HTTPException(status_code=404, detail="Recipe not found")
         
         # Insert into event_recipes (unique constraint will prevent duplicates)
-        response = supabase.table("event_recipes").insert({
+        row = await repos.event_recipes.attach({
             "event_id": event_id,
             "recipe_id": request.recipe_id,
             "target_headcount": request.target_headcount,
             "course_order": request.course_order,
             "is_primary": request.is_primary,
-        }).execute()
+        })
         
-        return {"success": True, "id": str(response.data[0]["id"])}
+        return {"success": True, "id": str(row["id"])}
     except HTTPException:
         raise
     except Exception as e:
@@ -345,14 +308,13 @@ async def detach_recipe_from_event(
     Remove a recipe from an event.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Verify event belongs to user (via join check)
-        event_check = supabase.table("events").select("id").eq("id", event_id).eq("user_id", user_id).execute()
-        if not event_check.data:
+        if not await repos.events.exists(event_id, user_id):
             raise HTTPException(status_code=404, detail="Event not found")
         
-        supabase.table("event_recipes").delete().eq("event_id", event_id).eq("recipe_id", recipe_id).execute()
+        await repos.event_recipes.detach(event_id, recipe_id)
         return None
     except HTTPException:
         raise
@@ -360,7 +322,7 @@ async def detach_recipe_from_event(
         raise HTTPException(status_code=500, detail=f"Failed to detach recipe: {str(e)}")
 
 
-@router.post("/{event_id}/plan", response_model=dict)
+@router.post("/{event_id}/plan", response_model=Schedule)
 async def generate_event_plan(
     event_id: str,
     serve_time: Optional[str] = None,  # ISO datetime, optional override
@@ -372,18 +334,13 @@ async def generate_event_plan(
     Uses event.event_date as serve_time unless serve_time is provided.
     """
     try:
-        logger.info(f"Generating plan for event {event_id}", extra={
-            "event_id": event_id,
-            "user_id": user_id,
-        })
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Get event
-        event_response = supabase.table("events").select("*").eq("id", event_id).eq("user_id", user_id).execute()
-        if not event_response.data:
+        event_row = await repos.events.get(event_id, user_id)
+        if not event_row:
             raise HTTPException(status_code=404, detail="Event not found")
         
-        event_row = event_response.data[0]
         
         # Determine serve time
         if serve_time:
@@ -394,16 +351,14 @@ async def generate_event_plan(
             raise HTTPException(status_code=400, detail="Event has no date and serve_time not provided")
         
         # Get attached recipes with their normalized data
-        recipes_response = supabase.table("event_recipes").select(
-            "recipe_id, target_headcount, recipes!inner(normalized, base_headcount)"
-        ).eq("event_id", event_id).execute()
+        attached = await repos.event_recipes.list_for_event(event_id, "normalized, base_headcount")
         
-        if not recipes_response.data:
+        if not attached:
             raise HTTPException(status_code=400, detail="Event has no recipes attached")
         
         # Load and scale recipes
         recipe_models = []
-        for er_row in recipes_response.data:
+        for er_row in attached:
             normalized = er_row["recipes"].get("normalized")
             if not normalized:
                 raise HTTPException(
@@ -411,36 +366,25 @@ async def generate_event_plan(
                     detail=f"Recipe {er_row['recipe_id']} has no normalized data. Please save the recipe first."
                 )
             
-            # Convert normalized dict back to Recipe model
-            # This is a simplified version - in production you'd want better validation
-            recipe_dict = normalized
+            with phase("hydrate"):
+                recipe_model = RecipeModel.model_validate(normalized)
             target_headcount = er_row["target_headcount"]
             base_headcount = er_row["recipes"]["base_headcount"]
             
             # Scale if needed
             if target_headcount != base_headcount:
                 from ..services.scaling import scale_recipe
-                recipe_model = RecipeModel(**recipe_dict)
                 recipe_model = scale_recipe(recipe_model, target_headcount)
-            else:
-                recipe_model = RecipeModel(**recipe_dict)
             
             recipe_models.append(recipe_model)
         
         # Get user profile for capacity checks
-        profile_response = supabase.table("profiles").select("oven_capacity_lbs, burner_count").eq("id", user_id).execute()
-        user_profile = profile_response.data[0] if profile_response.data else None
-        
-        logger.info(f"Generating plan for event {event_id}", extra={
-            "event_id": event_id,
-            "user_id": user_id,
-            "recipe_count": len(recipe_models),
-        })
+        user_profile = await repos.profiles.get(user_id, "oven_capacity_lbs, burner_count")
         
         # Generate schedule
         schedule = build_schedule(recipe_models, serve_time_dt, user_profile)
         
-        logger.info(f"Schedule generated successfully for event {event_id}", extra={
+        logger.info("Schedule generated for event %s", event_id, extra={
             "event_id": event_id,
             "user_id": user_id,
             "recipe_count": len(recipe_models),
@@ -448,39 +392,11 @@ async def generate_event_plan(
             "warning_count": len(schedule.warnings),
         })
         
-        logger.info(f"Schedule generated successfully for event {event_id}", extra={
-            "event_id": event_id,
-            "user_id": user_id,
-            "recipe_count": len(recipe_models),
-            "task_count": sum(len(r.tasks) for r in recipe_models),
-            "warning_count": len(schedule.warnings),
-        })
-        
-        # Convert to dict for JSON response
-        return {
-            "serve_time": schedule.serve_time.isoformat(),
-            "lanes": [
-                {
-                    "station": lane.station,
-                    "tasks": [
-                        {
-                            "id": task.id,
-                            "label": task.label,
-                            "start_time": task.start_time.isoformat(),
-                            "end_time": task.end_time.isoformat(),
-                            "notes": task.notes,
-                        }
-                        for task in lane.tasks
-                    ],
-                }
-                for lane in schedule.lanes
-            ],
-            "notes": schedule.notes,
-        }
+        return validated_json(Schedule, schedule)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to generate plan for event {event_id}", extra={
+        logger.error("Failed to generate plan for event %s", event_id, extra={
             "event_id": event_id,
             "user_id": user_id,
             "error": str(e),
@@ -499,20 +415,19 @@ async def create_share_link(
     Creates a read-only link that doesn't require authentication.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Verify event belongs to user
-        event_check = supabase.table("events").select("id").eq("id", event_id).eq("user_id", user_id).execute()
-        if not event_check.data:
+        if not await repos.events.exists(event_id, user_id):
             raise HTTPException(status_code=404, detail="Event not found")
         
         # Generate public token
         public_token = str(uuid.uuid4())
         
         # Update event with public token
-        supabase.table("events").update({"public_token": public_token}).eq("id", event_id).execute()
+        await repos.events.update(event_id, user_id, {"public_token": public_token})
         
-        logger.info(f"Share link created for event {event_id}", extra={
+        logger.info("Share link created for event %s", event_id, extra={
             "event_id": event_id,
             "user_id": user_id,
         })
@@ -521,7 +436,7 @@ async def create_share_link(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to create share link for event {event_id}", extra={
+        logger.error("Failed to create share link for event %s", event_id, extra={
             "event_id": event_id,
             "error": str(e),
         }, exc_info=True)
@@ -531,29 +446,27 @@ async def create_share_link(
 @router.get("/public/{token}", response_model=dict)
 async def get_public_event(
     token: str,
+    request: Request,
     settings: Settings = Depends(get_settings),
 ):
     """
     Get event details by public token (no auth required).
     Returns read-only event data with schedule and grocery list.
+    Cacheable: carries an ETag of the body, since recipe edits change it too.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Find event by public token
-        event_response = supabase.table("events").select("*").eq("public_token", token).execute()
-        if not event_response.data:
+        event_row = await repos.events.get_by_public_token(token)
+        if not event_row:
             raise HTTPException(status_code=404, detail="Event not found or link expired")
         
-        event_row = event_response.data[0]
-        
         # Get attached recipes
-        recipes_response = supabase.table("event_recipes").select(
-            "recipe_id, target_headcount, course_order, is_primary, recipes!inner(title, normalized, base_headcount)"
-        ).eq("event_id", event_row["id"]).execute()
+        attached = await repos.event_recipes.list_for_event(event_row["id"], "title")
         
         recipes = []
-        for er_row in recipes_response.data:
+        for er_row in attached:
             recipes.append({
                 "recipe_id": str(er_row["recipe_id"]),
                 "recipe_title": er_row["recipes"]["title"],
@@ -563,7 +476,7 @@ async def get_public_event(
             })
         
         # Return public event data (no sensitive info)
-        return {
+        return cached_json(request, {
             "id": str(event_row["id"]),
             "name": event_row["name"],
             "event_type": event_row["event_type"],
@@ -573,11 +486,11 @@ async def get_public_event(
             "vibe": event_row.get("vibe"),
             "notes": event_row.get("notes"),
             "recipes": recipes,
-        }
+        }, settings)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to fetch public event {token}", extra={
+        logger.error("Failed to fetch public event %s", token, extra={
             "token": token,
             "error": str(e),
         }, exc_info=True)
@@ -7,7 +7,6 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 
 from ..dependencies import require_auth, Settings, get_settings
-from ..lib.supabase_client import require_supabase
 from ..services.gift_codes import create_gift_code, redeem_gift_code, get_gift_code
 
 logger = logging.getLogger(__name__)
@@ -52,7 +51,7 @@ async def create_gift(
     Create a new gift code (no auth required for demo, but will require payment in production).
     """
     try:
-        gift_code = create_gift_code(
+        gift_code = await create_gift_code(
             plan=request.plan,
             purchaser_email=request.purchaser_email,
             recipient_name=request.recipient_name,
@@ -60,7 +59,7 @@ async def create_gift(
             message=request.message,
         )
         
-        logger.info(f"Gift code created: {gift_code['code']}")
+        logger.info("Gift code created: %s", gift_code['code'])
         
         return GiftCodeResponse(
             id=str(gift_code["id"]),
@@ -77,7 +76,7 @@ async def create_gift(
             created_at=gift_code["created_at"],
         )
     except Exception as e:
-        logger.error(f"Failed to create gift code: {str(e)}", exc_info=True)
+        logger.error("Failed to create gift code: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to create gift code: {str(e)}")
 
 
@@ -91,9 +90,9 @@ async def redeem_gift(
     Redeem a gift code (requires authentication).
     """
     try:
-        redeemed = redeem_gift_code(request.code, user_id)
+        redeemed = await redeem_gift_code(request.code, user_id)
         
-        logger.info(f"Gift code redeemed: {request.code} by user {user_id}")
+        logger.info("Gift code redeemed: %s by user %s", request.code, user_id)
         
         return GiftCodeResponse(
             id=str(redeemed["id"]),
@@ -112,7 +111,7 @@ async def redeem_gift(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Failed to redeem gift code: {str(e)}", exc_info=True)
+        logger.error("Failed to redeem gift code: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to redeem gift code: {str(e)}")
 
 
@@ -125,7 +124,7 @@ async def get_gift(
     Get gift code details by code (public, for certificate viewing).
     """
     try:
-        gift_code = get_gift_code(code)
+        gift_code = await get_gift_code(code)
         
         if not gift_code:
             raise HTTPException(status_code=404, detail="Gift code not found")
@@ -147,6 +146,6 @@ async def get_gift(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to fetch gift code: {str(e)}", exc_info=True)
+        logger.error("Failed to fetch gift code: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to fetch gift code: {str(e)}")
 
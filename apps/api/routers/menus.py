@@ -0,0 +1,151 @@
+"""
+Menus Router
+Build menus from the recipe library that fit the host's kitchen.
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field, field_validator
+
+from ..dependencies import require_auth, Settings, get_settings
+from ..repositories import get_repositories
+from ..services.library_index import get_library_index
+from ..services.menu_builder import Candidate, build_menus
+from ..services.station_load import SUMMARY_COLUMNS, KitchenLimits, StationLoad
+from .recipe_library import LIBRARY_LIST_COLUMNS, LibraryRecipeResponse, library_recipe_response
+
+router = APIRouter(prefix="/menus", tags=["menus"])
+
+COURSES = ("main", "side", "dessert", "app", "other")
+
+# Library recipes considered per course
+MAX_CANDIDATES_PER_COURSE = 200
+
+# Recipes asked for across all courses, and recipes pinned with include_ids
+MAX_MENU_RECIPES = 8
+
+
+class MenuBuildRequest(BaseModel):
+    headcount: int = Field(..., ge=1, le=500)
+    serve_time: datetime
+    window_minutes: int = Field(240, ge=30, le=1440)  # How long before serve_time cooking can start
+    courses: Dict[str, int] = {"main": 1, "side": 2, "dessert": 1}
+    search: Optional[str] = None  # Only consider library recipes matching this
+    include_ids: List[str] = Field([], max_length=MAX_MENU_RECIPES)  # Library recipes already chosen
+    limit: int = Field(5, ge=1, le=20)
+
+    @field_validator("courses")
+    @classmethod
+    def check_courses(cls, courses: Dict[str, int]) -> Dict[str, int]:
+        unknown = set(courses) - set(COURSES)
+        if unknown:
+            raise ValueError(f"Unknown course(s): {', '.join(sorted(unknown))}")
+        if any(count < 0 for count in courses.values()) or sum(courses.values()) > MAX_MENU_RECIPES:
+            raise ValueError(f"Ask for 0-{MAX_MENU_RECIPES} recipes in total")
+        return {course: count for course, count in courses.items() if count}
+
+
+class MenuLoadResponse(BaseModel):
+    span_minutes: int  # First task to serve time
+    oven_minutes: int
+    stove_minutes: int
+    hands_on_minutes: int
+    task_count: int
+
+
+class MenuResponse(BaseModel):
+    recipes: List[LibraryRecipeResponse]
+    start_by: datetime
+    load: MenuLoadResponse
+    warnings: List[str] = []  # e.g. "too_many_projects"; the menu still fits
+
+
+class MenuBuildResponse(BaseModel):
+    menus: List[MenuResponse]
+    evaluated: int  # Menus and partial menus scored
+
+
+async def _candidates(course: str, search: Optional[str], window_minutes: int) -> List[Candidate]:
+    repos = get_repositories()
+    index = get_library_index()
+    if await index.ensure_ready(repos):
+        pairs = index.candidates(course, search, ", ".join(LIBRARY_LIST_COLUMNS))
+        # Quickest first, as list_by_load picks them from the database
+        return heapq.nsmallest(
+            MAX_CANDIDATES_PER_COURSE,
+            (Candidate(row, load) for row, load in pairs if load.critical_path_minutes <= window_minutes),
+            key=lambda c: (c.load.critical_path_minutes, str(c.row["id"])),
+        )
+
+    # Summary columns instead of normalized; recipes not summarised yet are skipped
+    columns = ", ".join(LIBRARY_LIST_COLUMNS + SUMMARY_COLUMNS)
+    if search:
+        page = await repos.recipe_library.list(course, search, MAX_CANDIDATES_PER_COURSE, columns=columns)
+        rows = [
+            row for row in page.rows
+            if row.get("critical_path_minutes") is not None and row["critical_path_minutes"] <= window_minutes
+        ]
+    else:
+        rows = await repos.recipe_library.list_by_load(
+            course, window_minutes, MAX_CANDIDATES_PER_COURSE, columns
+        )
+    return [Candidate({c: row.get(c) for c in LIBRARY_LIST_COLUMNS}, StationLoad.from_row(row)) for row in rows]
+
+
+@router.post("/build", response_model=MenuBuildResponse)
+async def build_menu(
+    request: MenuBuildRequest,
+    user_id: str = Depends(require_auth),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Suggest library menus whose cooking fits the host's oven and burners
+    within window_minutes of serve_time. Menus are checked against per-recipe
+    station-load summaries rather than full schedules; generate the event
+    plan for the exact timeline. Requires authentication.
+    """
+    try:
+        repos = get_repositories()
+        profile = await repos.profiles.get(user_id, "oven_capacity_lbs, burner_count")
+        limits = KitchenLimits.from_profile(request.window_minutes, request.headcount, profile)
+
+        pinned = []
+        if request.include_ids:
+            # normalized stands in for the summary of recipes not summarised yet
+            rows = await repos.recipe_library.get_many(
+                list(dict.fromkeys(request.include_ids)),
+                ", ".join(LIBRARY_LIST_COLUMNS + SUMMARY_COLUMNS + ("normalized",)),
+            )
+            by_id = {str(row["id"]): row for row in rows}
+            for recipe_id in dict.fromkeys(request.include_ids):
+                row = by_id.get(recipe_id)
+                if not row:
+                    raise HTTPException(status_code=404, detail=f"Library recipe {recipe_id} not found")
+                pinned.append(Candidate({c: row.get(c) for c in LIBRARY_LIST_COLUMNS}, StationLoad.from_row(row)))
+
+        candidates = {
+            course: await _candidates(course, request.search, request.window_minutes)
+            for course in request.courses
+        }
+        menus, evaluated = build_menus(candidates, request.courses, limits, pinned, request.limit)
+
+        return MenuBuildResponse(
+            menus=[
+                MenuResponse(
+                    recipes=[library_recipe_response(row) for row in menu.recipes],
+                    start_by=request.serve_time - timedelta(minutes=menu.load.span_minutes(limits)),
+                    load=MenuLoadResponse(**menu.load.as_dict(limits)),
+                    warnings=menu.load.warnings(),
+                )
+                for menu in menus
+            ],
+            evaluated=evaluated,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build menus: {str(e)}")
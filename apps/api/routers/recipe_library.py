@@ -3,16 +3,30 @@ Recipe Library Router
 Public recipe library endpoints for browsing and searching recipes.
 """
 
-from typing import Optional, List
-from fastapi import APIRouter, Query, HTTPException, Depends
+from typing import Dict, Optional, List, Union
+from fastapi import APIRouter, Query, HTTPException, Depends, Request
 from pydantic import BaseModel
 
 from ..dependencies import get_settings, Settings, require_auth_optional
-from ..lib.supabase_client import require_supabase
-from ..models.recipes import Recipe as RecipeModel
+from ..repositories import get_repositories
+from ..lib.projection import expand_columns
+from ..lib.pagination import decode_cursor
+from ..lib.http_cache import cached_json, strong_etag
+from ..lib.metrics import CACHE_LOOKUPS
+from ..services.library_index import INDEX_CURSOR_SOURCE, get_library_index
+from ..services.similarity import get_similarity_index
+from ..services.station_load import with_load_summary
+from ..models.recipes import PublicNormalized, Recipe as RecipeModel
 
 router = APIRouter(prefix="/recipes/library", tags=["recipe-library"])
 
+# Columns returned by the list endpoint; normalized is opt-in via ?expand=normalized
+LIBRARY_LIST_COLUMNS = (
+    "id", "title", "category", "base_headcount", "prep_time_minutes", "cook_time_minutes",
+    "method", "day_before_ok", "description", "image_url", "tags", "created_at",
+)
+LIBRARY_EXPANDABLE_COLUMNS = ("normalized",)
+
 
 class LibraryRecipeResponse(BaseModel):
     """Response model for library recipes."""
@@ -27,108 +41,238 @@ class LibraryRecipeResponse(BaseModel):
     description: Optional[str] = None
     image_url: Optional[str] = None
     tags: List[str] = []
-    normalized: dict  # Full recipe data
+    normalized: PublicNormalized = None  # Full recipe data (detail requests, or list with ?expand=normalized)
     created_at: str
 
 
 class LibraryRecipeListResponse(BaseModel):
-    """Paginated list response."""
+    """Cursor-paginated list response."""
     recipes: List[LibraryRecipeResponse]
-    total: int
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page; None on the last page
+    total: Optional[int] = None  # Only with ?include_total=true; an estimate on large libraries
     limit: int
-    offset: int
+
+
+class FacetCount(BaseModel):
+    value: Union[bool, str]
+    count: int
+
+
+class LibraryFacetsResponse(BaseModel):
+    """Result counts per facet value, most common first."""
+    category: List[FacetCount]
+    method: List[FacetCount]
+    day_before_ok: List[FacetCount]
+
+
+class SimilarRecipe(BaseModel):
+    recipe: LibraryRecipeResponse
+    score: float  # Cosine similarity of ingredient vectors, 0-1
+
+
+class SimilarRecipesResponse(BaseModel):
+    recipes: List[SimilarRecipe]
+
+
+class MenuComplementsResponse(BaseModel):
+    """Suggestions for each course not yet on the menu."""
+    suggestions: Dict[str, List[SimilarRecipe]]
+
+
+def library_recipe_response(row: dict) -> LibraryRecipeResponse:
+    return LibraryRecipeResponse(
+        id=str(row["id"]),
+        title=row["title"],
+        category=row["category"],
+        base_headcount=row["base_headcount"],
+        prep_time_minutes=row.get("prep_time_minutes", 0),
+        cook_time_minutes=row.get("cook_time_minutes", 0),
+        method=row["method"],
+        day_before_ok=row.get("day_before_ok", False),
+        description=row.get("description"),
+        image_url=row.get("image_url"),
+        tags=row.get("tags", []),
+        normalized=row.get("normalized"),
+        created_at=row["created_at"],
+    )
+
+
+async def _similar_recipes(scored: list[tuple[str, float]]) -> List[SimilarRecipe]:
+    """Attach list metadata to (recipe_id, score) pairs, skipping recipes that no longer exist."""
+    repos = get_repositories()
+    index = get_library_index()
+    use_index = await index.ensure_ready(repos)
+    results = []
+    for recipe_id, score in scored:
+        if use_index:
+            row = index.get(recipe_id, ", ".join(LIBRARY_LIST_COLUMNS))
+        else:
+            row = await repos.recipe_library.get(recipe_id)
+            if row:
+                row = {c: row.get(c) for c in LIBRARY_LIST_COLUMNS}
+        if row:
+            results.append(SimilarRecipe(recipe=library_recipe_response(row), score=round(score, 4)))
+    return results
+
+
+def _require_similarity_index():
+    index = get_similarity_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Similar recipes are unavailable")
+    return index
 
 
 @router.get("", response_model=LibraryRecipeListResponse)
 async def list_library_recipes(
+    request: Request,
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search query"),
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: bool = Query(False, description="Include an (estimated) total match count"),
+    expand: Optional[str] = Query(None, description="Comma-separated heavy fields to include: normalized"),
     settings: Settings = Depends(get_settings),
 ):
     """
     List public recipes from the library.
     No authentication required - this is public.
+    Returns metadata only; fetch a recipe by ID (or pass ?expand=normalized) for the full recipe.
+    Cacheable: carries an ETag of the body and honours If-None-Match.
     """
+    columns = expand_columns(LIBRARY_LIST_COLUMNS, expand, LIBRARY_EXPANDABLE_COLUMNS)
+    after = decode_cursor(cursor)
     try:
-        supabase = require_supabase()
-        
-        query = supabase.table("recipe_library").select("*", count="exact")
-        
-        # Apply filters
-        if category:
-            query = query.eq("category", category)
-        
-        if search:
-            # Use PostgreSQL full-text search
-            query = query.or_(f"title.ilike.%{search}%,description.ilike.%{search}%")
-        
-        # Apply pagination
-        query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
-        
-        response = query.execute()
-        
-        recipes = [
-            LibraryRecipeResponse(
-                id=str(row["id"]),
-                title=row["title"],
-                category=row["category"],
-                base_headcount=row["base_headcount"],
-                prep_time_minutes=row.get("prep_time_minutes", 0),
-                cook_time_minutes=row.get("cook_time_minutes", 0),
-                method=row["method"],
-                day_before_ok=row.get("day_before_ok", False),
-                description=row.get("description"),
-                image_url=row.get("image_url"),
-                tags=row.get("tags", []),
-                normalized=row["normalized"],
-                created_at=row["created_at"],
+        repos = get_repositories()
+        index = get_library_index()
+        use_index = await index.ensure_ready(repos)
+        
+        # Index and database rank search results on different scales, so a
+        # ranked cursor only pages through results from the same source
+        if after is not None and after.rank is not None and (after.source == INDEX_CURSOR_SOURCE) != use_index:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor is from an earlier search that can no longer be continued; search again",
             )
-            for row in response.data
-        ]
         
-        total = response.count if hasattr(response, 'count') and response.count else len(recipes)
+        if use_index:
+            CACHE_LOOKUPS.inc("library_index", "hit")
+            page = index.search(category, search, limit, after, columns, include_total)
+            # The index leaves out the heavy JSON; fetch it for this page only
+            if "normalized" in columns and page.rows:
+                stored = await repos.recipe_library.get_many([str(r["id"]) for r in page.rows], "id, normalized")
+                normalized = {str(r["id"]): r["normalized"] for r in stored}
+                for row in page.rows:
+                    row["normalized"] = normalized.get(str(row["id"]))
+        else:
+            CACHE_LOOKUPS.inc("library_index", "miss")
+            page = await repos.recipe_library.list(category, search, limit, after, columns, include_total)
+        
+        recipes = [library_recipe_response(row) for row in page.rows]
         
-        return LibraryRecipeListResponse(
+        return cached_json(request, LibraryRecipeListResponse(
             recipes=recipes,
-            total=total,
+            next_cursor=page.next_cursor,
+            total=page.total,
             limit=limit,
-            offset=offset,
-        )
+        ), settings)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch library recipes: {str(e)}")
 
 
+@router.get("/facets", response_model=LibraryFacetsResponse)
+async def get_library_facets(
+    request: Request,
+    search: Optional[str] = Query(None, description="Search query"),
+    category: Optional[str] = Query(None),
+    method: Optional[str] = Query(None),
+    day_before_ok: Optional[bool] = Query(None),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Facet counts for the library, for the current search and filters.
+    Served from the in-process index; public endpoint.
+    """
+    repos = get_repositories()
+    index = get_library_index()
+    try:
+        ready = await index.ensure_ready(repos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load library facets: {str(e)}")
+    if not ready:
+        raise HTTPException(status_code=503, detail="Library facets are unavailable")
+    
+    counts = index.facets(search, category, method, day_before_ok)
+    return cached_json(request, LibraryFacetsResponse(**{
+        facet: [FacetCount(value=value, count=count) for value, count in pairs]
+        for facet, pairs in counts.items()
+    }), settings)
+
+
+@router.get("/complements", response_model=MenuComplementsResponse)
+async def get_menu_complements(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated library recipe IDs already on the menu"),
+    k: int = Query(3, ge=1, le=20),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Suggest library recipes for the courses a menu is missing, ranked by
+    ingredient overlap with the recipes already on it. Public endpoint.
+    """
+    recipe_ids = [i.strip() for i in ids.split(",") if i.strip()][:20]
+    similarity = _require_similarity_index()
+    try:
+        suggestions = similarity.complements(recipe_ids, k)
+        response = MenuComplementsResponse(suggestions={
+            category: await _similar_recipes(scored) for category, scored in suggestions.items()
+        })
+        return cached_json(request, response, settings)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to suggest recipes: {str(e)}")
+
+
+@router.get("/{recipe_id}/similar", response_model=SimilarRecipesResponse)
+async def get_similar_recipes(
+    recipe_id: str,
+    request: Request,
+    k: int = Query(10, ge=1, le=50),
+    settings: Settings = Depends(get_settings),
+):
+    """Library recipes with the most similar ingredient lists. Public endpoint."""
+    similarity = _require_similarity_index()
+    if similarity.position(recipe_id) is None:
+        raise HTTPException(status_code=404, detail="Recipe not found in similarity index")
+    try:
+        scored = similarity.similar([recipe_id], k)[recipe_id]
+        response = SimilarRecipesResponse(recipes=await _similar_recipes(scored))
+        return cached_json(request, response, settings)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find similar recipes: {str(e)}")
+
+
 @router.get("/{recipe_id}", response_model=LibraryRecipeResponse)
 async def get_library_recipe(
     recipe_id: str,
+    request: Request,
     settings: Settings = Depends(get_settings),
 ):
-    """Get a single library recipe by ID. Public endpoint."""
+    """
+    Get a single library recipe by ID. Public endpoint.
+    Cacheable: the ETag and Last-Modified come from the row's updated_at.
+    """
     try:
-        supabase = require_supabase()
-        response = supabase.table("recipe_library").select("*").eq("id", recipe_id).single().execute()
+        repos = get_repositories()
+        row = await repos.recipe_library.get(recipe_id)
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=404, detail="Recipe not found")
         
-        row = response.data
-        return LibraryRecipeResponse(
-            id=str(row["id"]),
-            title=row["title"],
-            category=row["category"],
-            base_headcount=row["base_headcount"],
-            prep_time_minutes=row.get("prep_time_minutes", 0),
-            cook_time_minutes=row.get("cook_time_minutes", 0),
-            method=row["method"],
-            day_before_ok=row.get("day_before_ok", False),
-            description=row.get("description"),
-            image_url=row.get("image_url"),
-            tags=row.get("tags", []),
-            normalized=row["normalized"],
-            created_at=row["created_at"],
+        etag = strong_etag("recipe_library", row["id"], row["updated_at"])
+        return cached_json(
+            request, library_recipe_response(row), settings, etag=etag, updated_at=row["updated_at"]
         )
         
     except HTTPException:
@@ -151,15 +295,14 @@ async def save_library_recipe(
         raise HTTPException(status_code=401, detail="Authentication required")
     
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Get the library recipe
-        library_response = supabase.table("recipe_library").select("*").eq("id", recipe_id).single().execute()
+        library_recipe = await repos.recipe_library.get(recipe_id)
         
-        if not library_response.data:
+        if not library_recipe:
             raise HTTPException(status_code=404, detail="Library recipe not found")
         
-        library_recipe = library_response.data
         
         # Create a copy in user's recipes table
         recipe_data = {
@@ -177,12 +320,12 @@ async def save_library_recipe(
             "notes": f"Saved from recipe library: {library_recipe.get('description', '')}",
         }
         
-        response = supabase.table("recipes").insert(recipe_data).execute()
+        row = await repos.recipes.create(with_load_summary(recipe_data))
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=500, detail="Failed to save recipe")
         
-        return {"id": str(response.data[0]["id"]), "message": "Recipe saved to your collection"}
+        return {"id": str(row["id"]), "message": "Recipe saved to your collection"}
         
     except HTTPException:
         raise
@@ -1,15 +1,28 @@
 from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from datetime import datetime
 
 from ..dependencies import require_auth, Settings, get_settings
-from ..models.recipes import Recipe as RecipeModel
-from ..lib.supabase_client import require_supabase
+from ..models.recipes import PublicNormalized, Recipe as RecipeModel
+from ..repositories import get_repositories
+from ..repositories.base import iter_pages
+from ..lib.projection import expand_columns
+from ..lib.pagination import STREAM_BATCH_SIZE, decode_cursor, set_page_headers
+from ..lib.serialization import Id, ndjson_response, validated_json
+from ..services.station_load import with_load_summary
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
 
+# Columns returned by list endpoints; the heavy JSONB columns are opt-in via ?expand=
+RECIPE_LIST_COLUMNS = (
+    "id", "user_id", "title", "category", "base_headcount", "prep_time_minutes",
+    "cook_time_minutes", "method", "day_before_ok", "source_type", "notes",
+    "created_at", "updated_at",
+)
+RECIPE_EXPANDABLE_COLUMNS = ("normalized", "source_raw")
+
 
 # Request/Response models for API
 class RecipeCreateRequest(BaseModel):
@@ -41,8 +54,8 @@ class RecipeUpdateRequest(BaseModel):
 
 
 class RecipeResponse(BaseModel):
-    id: str
-    user_id: str
+    id: Id
+    user_id: Id
     title: str
     category: str
     base_headcount: int
@@ -52,7 +65,7 @@ class RecipeResponse(BaseModel):
     day_before_ok: bool
     source_type: str
     source_raw: Optional[dict] = None
-    normalized: Optional[dict] = None
+    normalized: PublicNormalized = None
     notes: Optional[str] = None
     created_at: str
     updated_at: str
@@ -60,36 +73,39 @@ class RecipeResponse(BaseModel):
 
 @router.get("", response_model=list[RecipeResponse])
 async def list_recipes(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    include_total: bool = Query(False, description="Report an (estimated) total in X-Total-Count"),
+    expand: Optional[str] = Query(None, description="Comma-separated heavy fields to include: normalized, source_raw"),
+    stream: bool = Query(False, description="Stream every recipe after the cursor as NDJSON instead of one page"),
     user_id: str = Depends(require_auth),
     settings: Settings = Depends(get_settings),
 ):
     """
-    List all recipes for the current user.
+    List recipes for the current user, newest first.
+    Returns metadata only unless heavy fields are requested with ?expand=.
+    Paginated by cursor: pass the X-Next-Cursor response header back as ?cursor=.
+    With ?stream=true, returns all remaining recipes as NDJSON, one per line,
+    fetched and sent in batches; limit does not apply.
     """
+    columns = expand_columns(RECIPE_LIST_COLUMNS, expand, RECIPE_EXPANDABLE_COLUMNS)
+    after = decode_cursor(cursor)
     try:
-        supabase = require_supabase()
-        response = supabase.table("recipes").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+        repos = get_repositories()
+        if stream:
+            first = await repos.recipes.list_for_user(user_id, columns, STREAM_BATCH_SIZE, after, include_total)
+            response = ndjson_response(RecipeResponse, iter_pages(
+                first, lambda after: repos.recipes.list_for_user(user_id, columns, STREAM_BATCH_SIZE, after)
+            ))
+            set_page_headers(response, None, first.total)
+            return response
+        
+        page = await repos.recipes.list_for_user(user_id, columns, limit, after, include_total)
         
-        return [
-            RecipeResponse(
-                id=str(row["id"]),
-                user_id=str(row["user_id"]),
-                title=row["title"],
-                category=row["category"],
-                base_headcount=row["base_headcount"],
-                prep_time_minutes=row["prep_time_minutes"],
-                cook_time_minutes=row["cook_time_minutes"],
-                method=row["method"],
-                day_before_ok=row["day_before_ok"],
-                source_type=row["source_type"],
-                source_raw=row.get("source_raw"),
-                normalized=row.get("normalized"),
-                notes=row.get("notes"),
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
-            for row in response.data
-        ]
+        # Rows are validated once, straight into the response body
+        response = validated_json(list[RecipeResponse], page.rows)
+        set_page_headers(response, page.next_cursor, page.total)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch recipes: {str(e)}")
 
@@ -104,7 +120,7 @@ async def create_recipe(
     Create a new recipe.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Validate category and method enums
         if request.category not in ["main", "side", "dessert", "app", "other"]:
@@ -114,7 +130,7 @@ async def create_recipe(
         if request.source_type not in ["text", "url", "pdf", "image"]:
             raise HTTPException(status_code=400, detail="Invalid source_type")
         
-        response = supabase.table("recipes").insert({
+        row = await repos.recipes.create(with_load_summary({
             "user_id": user_id,
             "title": request.title,
             "category": request.category,
@@ -127,29 +143,12 @@ async def create_recipe(
             "source_raw": request.source_raw,
             "normalized": request.normalized,
             "notes": request.notes,
-        }).execute()
+        }))
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=500, detail="Failed to create recipe")
         
-        row = response.data[0]
-        return RecipeResponse(
-            id=str(row["id"]),
-            user_id=str(row["user_id"]),
-            title=row["title"],
-            category=row["category"],
-            base_headcount=row["base_headcount"],
-            prep_time_minutes=row["prep_time_minutes"],
-            cook_time_minutes=row["cook_time_minutes"],
-            method=row["method"],
-            day_before_ok=row["day_before_ok"],
-            source_type=row["source_type"],
-            source_raw=row.get("source_raw"),
-            normalized=row.get("normalized"),
-            notes=row.get("notes"),
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-        )
+        return validated_json(RecipeResponse, row, status_code=201)
     except HTTPException:
         raise
     except Exception as e:
@@ -167,30 +166,13 @@ async def get_recipe(
     Only returns recipes owned by the current user.
     """
     try:
-        supabase = require_supabase()
-        response = supabase.table("recipes").select("*").eq("id", recipe_id).eq("user_id", user_id).execute()
+        repos = get_repositories()
+        row = await repos.recipes.get(recipe_id, user_id)
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=404, detail="Recipe not found")
         
-        row = response.data[0]
-        return RecipeResponse(
-            id=str(row["id"]),
-            user_id=str(row["user_id"]),
-            title=row["title"],
-            category=row["category"],
-            base_headcount=row["base_headcount"],
-            prep_time_minutes=row["prep_time_minutes"],
-            cook_time_minutes=row["cook_time_minutes"],
-            method=row["method"],
-            day_before_ok=row["day_before_ok"],
-            source_type=row["source_type"],
-            source_raw=row.get("source_raw"),
-            normalized=row.get("normalized"),
-            notes=row.get("notes"),
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-        )
+        return validated_json(RecipeResponse, row)
     except HTTPException:
         raise
     except Exception as e:
@@ -209,11 +191,10 @@ async def update_recipe(
     Only allows updating recipes owned by the current user.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # First verify the recipe exists and belongs to the user
-        check_response = supabase.table("recipes").select("id").eq("id", recipe_id).eq("user_id", user_id).execute()
-        if not check_response.data:
+        if not await repos.recipes.exists(recipe_id, user_id):
             raise HTTPException(status_code=404, detail="Recipe not found")
         
         # Build update dict from non-None fields
@@ -251,29 +232,13 @@ async def update_recipe(
             # No fields to update, just return the existing recipe
             return await get_recipe(recipe_id, user_id, settings)
         
-        response = supabase.table("recipes").update(update_data).eq("id", recipe_id).eq("user_id", user_id).execute()
+        # Keep the station-load summary in step with the task list
+        row = await repos.recipes.update(recipe_id, user_id, with_load_summary(update_data))
         
-        if not response.data:
+        if not row:
             raise HTTPException(status_code=500, detail="Failed to update recipe")
         
-        row = response.data[0]
-        return RecipeResponse(
-            id=str(row["id"]),
-            user_id=str(row["user_id"]),
-            title=row["title"],
-            category=row["category"],
-            base_headcount=row["base_headcount"],
-            prep_time_minutes=row["prep_time_minutes"],
-            cook_time_minutes=row["cook_time_minutes"],
-            method=row["method"],
-            day_before_ok=row["day_before_ok"],
-            source_type=row["source_type"],
-            source_raw=row.get("source_raw"),
-            normalized=row.get("normalized"),
-            notes=row.get("notes"),
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-        )
+        return validated_json(RecipeResponse, row)
     except HTTPException:
         raise
     except Exception as e:
@@ -291,8 +256,8 @@ async def delete_recipe(
     Only allows deleting recipes owned by the current user.
     """
     try:
-        supabase = require_supabase()
-        response = supabase.table("recipes").delete().eq("id", recipe_id).eq("user_id", user_id).execute()
+        repos = get_repositories()
+        await repos.recipes.delete(recipe_id, user_id)
         
         # Supabase returns empty data on successful delete
         # We can't easily check if it existed, but RLS will prevent unauthorized deletes
@@ -5,7 +5,7 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 
 from ..dependencies import Settings, get_settings
-from ..lib.supabase_client import require_supabase
+from ..repositories import get_repositories
 
 logger = logging.getLogger(__name__)
 
@@ -28,32 +28,31 @@ async def add_to_waitlist(
     Used for marketing email capture.
     """
     try:
-        supabase = require_supabase()
+        repos = get_repositories()
         
         # Check if email already exists
-        existing = supabase.table("waitlist").select("email").eq("email", request.email).execute()
+        existing = await repos.waitlist.get_by_email(request.email)
         
-        if existing.data:
+        if existing:
             # Already exists, update preferences
-            supabase.table("waitlist").update({
+            await repos.waitlist.update_by_email(request.email, {
                 "wants_tips": request.wants_tips,
                 "source": request.source,
-                "updated_at": "now()",
-            }).eq("email", request.email).execute()
+            })
             
-            logger.info(f"Waitlist updated for {request.email}")
+            logger.info("Waitlist updated for %s", request.email)
         else:
             # New entry
-            supabase.table("waitlist").insert({
+            await repos.waitlist.create({
                 "email": request.email,
                 "wants_tips": request.wants_tips,
                 "source": request.source or "landing_page",
-            }).execute()
+            })
             
-            logger.info(f"New waitlist signup: {request.email}")
+            logger.info("New waitlist signup: %s", request.email)
         
         return {"success": True, "message": "Added to waitlist"}
     except Exception as e:
-        logger.error(f"Failed to add to waitlist: {str(e)}", exc_info=True)
+        logger.error("Failed to add to waitlist: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to add to waitlist")
 
@@ -5,7 +5,7 @@ import random
 import string
 from datetime import datetime, timedelta
 from typing import Optional
-from ..lib.supabase_client import require_supabase
+from ..repositories import get_repositories
 
 
 def generate_gift_code() -> str:
@@ -19,7 +19,7 @@ def generate_gift_code() -> str:
     return f"CBM-{letters}-{digits}"
 
 
-def create_gift_code(
+async def create_gift_code(
     plan: str = "pro_annual",
     purchaser_email: Optional[str] = None,
     recipient_name: Optional[str] = None,
@@ -31,7 +31,7 @@ def create_gift_code(
     
     Returns the gift code record with the generated code.
     """
-    supabase = require_supabase()
+    repos = get_repositories()
     
     # Generate unique code
     code = generate_gift_code()
@@ -39,8 +39,7 @@ def create_gift_code(
     # Ensure code is unique (retry if collision)
     max_retries = 10
     for _ in range(max_retries):
-        existing = supabase.table("gift_codes").select("code").eq("code", code).execute()
-        if not existing.data:
+        if not await repos.gift_codes.code_exists(code):
             break
         code = generate_gift_code()
     else:
@@ -50,7 +49,7 @@ def create_gift_code(
     expires_at = (datetime.utcnow() + timedelta(days=365)).isoformat()
     
     # Insert gift code
-    response = supabase.table("gift_codes").insert({
+    gift_code = await repos.gift_codes.create({
         "code": code,
         "purchaser_email": purchaser_email,
         "recipient_name": recipient_name,
@@ -59,30 +58,29 @@ def create_gift_code(
         "plan": plan,
         "status": "new",
         "expires_at": expires_at,
-    }).execute()
+    })
     
-    if not response.data:
+    if not gift_code:
         raise ValueError("Failed to create gift code")
     
-    return response.data[0]
+    return gift_code
 
 
-def redeem_gift_code(code: str, user_id: str) -> dict:
+async def redeem_gift_code(code: str, user_id: str) -> dict:
     """
     Redeem a gift code for a user.
     
     Returns the updated gift code record.
     Raises ValueError if code is invalid, expired, or already redeemed.
     """
-    supabase = require_supabase()
+    repos = get_repositories()
     
     # Fetch gift code
-    response = supabase.table("gift_codes").select("*").eq("code", code).execute()
+    gift_code = await repos.gift_codes.get_by_code(code)
     
-    if not response.data:
+    if not gift_code:
         raise ValueError("Gift code not found")
     
-    gift_code = response.data[0]
     
     # Validate code
     if gift_code["status"] == "redeemed":
@@ -95,49 +93,43 @@ def redeem_gift_code(code: str, user_id: str) -> dict:
     expires_at = datetime.fromisoformat(gift_code["expires_at"].replace("Z", "+00:00"))
     if datetime.utcnow() > expires_at:
         # Mark as expired
-        supabase.table("gift_codes").update({
+        await repos.gift_codes.update(gift_code["id"], {
             "status": "expired"
-        }).eq("id", gift_code["id"]).execute()
+        })
         raise ValueError("This gift code has expired")
     
     # Update gift code
     redeemed_at = datetime.utcnow().isoformat()
-    update_response = supabase.table("gift_codes").update({
+    redeemed = await repos.gift_codes.update(gift_code["id"], {
         "status": "redeemed",
         "redeemed_by": user_id,
         "redeemed_at": redeemed_at,
-    }).eq("id", gift_code["id"]).execute()
+    })
     
-    if not update_response.data:
+    if not redeemed:
         raise ValueError("Failed to update gift code")
     
     # Update user profile to Pro tier
     renewal_date = (datetime.utcnow() + timedelta(days=365)).isoformat()
-    profile_response = supabase.table("profiles").update({
+    profile = await repos.profiles.update(user_id, {
         "tier": "pro",
         "subscription_status": "gift",
         "renewal_date": renewal_date,
-    }).eq("id", user_id).execute()
+    })
     
-    if not profile_response.data:
+    if not profile:
         # Gift code was redeemed but profile update failed
         # This is a problem, but we'll log it and continue
         # In production, you might want to rollback or retry
         pass
     
-    return update_response.data[0]
+    return redeemed
 
 
-def get_gift_code(code: str) -> Optional[dict]:
+async def get_gift_code(code: str) -> Optional[dict]:
     """
     Get gift code details by code (public, for certificate viewing).
     """
-    supabase = require_supabase()
-    
-    response = supabase.table("gift_codes").select("*").eq("code", code).execute()
-    
-    if not response.data:
-        return None
-    
-    return response.data[0]
+    repos = get_repositories()
+    return await repos.gift_codes.get_by_code(code)
 
@@ -0,0 +1,365 @@
+"""
+In-process search index for the public recipe library.
+
+The library is public, unauthenticated and read-mostly, and the search box
+queries it on every keystroke. LibraryIndex keeps a read-only copy of the
+library in process memory, with an inverted index over the same fields the
+database searches (title, tags, ingredient names and description) plus facet
+sets for category, method and day_before_ok, so search, listing and facet
+counts are answered without a database round-trip.
+
+Matching is not the database's either: terms are prefix-matched against
+unstemmed words, while Postgres (english config) and SQLite FTS5 (porter)
+stem both sides. A prefix still finds longer forms ("potato" matches
+"potatoes"), but not shorter ones: "potatoes" finds recipes that say
+"potatoes" and misses those that only say "potato", which the database
+finds. Its relevance scores are not on the database's scale, so ranked pages
+it serves carry cursors marked with INDEX_CURSOR_SOURCE, and callers must
+not hand such a cursor to the database (or a database cursor to the index).
+
+Refresh lag
+-----------
+The index loads on first use. After that, any request that finds it older
+than LIBRARY_INDEX_REFRESH_SECONDS starts a background refresh that fetches
+only rows whose (updated_at, id) is past the watermark, and keeps serving
+the current copy meanwhile. New and edited recipes therefore show up within
+LIBRARY_INDEX_REFRESH_SECONDS plus one refresh query of the next request.
+A watermark cannot see deletes (or a transaction that commits with an
+older updated_at), so the whole index is rebuilt and swapped in every
+LIBRARY_INDEX_REBUILD_SECONDS.
+
+Memory
+------
+The heavy JSON columns (normalized, source_raw) are never kept (each entry
+keeps its StationLoad summary for the menu builder instead), tokens are
+interned, and the index stops at LIBRARY_INDEX_MAX_DOCUMENTS: beyond that it
+reports itself unavailable and callers fall back to the database.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import sys
+import time
+from functools import lru_cache
+from typing import Any, Optional
+
+from ..dependencies import get_settings
+from ..lib.pagination import Cursor
+from ..lib.search import FIELD_WEIGHTS, document_fields, search_terms, tokenize
+from ..repositories.base import Page, Repositories, make_page, parse_columns, project
+from ..repositories.tables import TABLES
+from .station_load import StationLoad
+
+logger = logging.getLogger(__name__)
+
+# Searchable fields and their weights
+INDEXED_FIELDS = dict(FIELD_WEIGHTS)
+
+# Cursor source of ranked pages served from the index
+INDEX_CURSOR_SOURCE = "index"
+
+FACETS = ("category", "method", "day_before_ok")
+
+# Fetched on refresh; normalized is only read for ingredient names, then dropped
+_FETCH_COLUMNS = ", ".join(c for c in TABLES["recipe_library"].columns if c != "source_raw")
+_HEAVY_COLUMNS = ("normalized", "source_raw")
+
+REFRESH_BATCH_SIZE = 1000
+
+
+class _Entry:
+    __slots__ = ("row", "key", "tokens", "load")
+
+    def __init__(self, row: dict, tokens: dict[str, float], load: StationLoad):
+        self.row = row
+        self.key = (row["created_at"], str(row["id"]))
+        self.tokens = tokens
+        self.load = load
+
+
+class _State:
+    """One generation of the index. Rebuilds fill a new one and swap it in."""
+
+    def __init__(self):
+        self.entries: dict[str, _Entry] = {}
+        # token -> doc id -> weight of the fields containing it
+        self.postings: dict[str, dict[str, float]] = {}
+        # sorted tokens, for prefix lookup
+        self.vocabulary: list[str] = []
+        # (created_at, id) ascending, for newest-first listing
+        self.ordered: list[tuple[str, str]] = []
+        # facet -> value -> doc ids
+        self.facets: dict[str, dict[Any, set[str]]] = {facet: {} for facet in FACETS}
+        # (updated_at, id) of the newest change applied
+        self.watermark: Optional[tuple[str, str]] = None
+
+    def upsert(self, row: dict) -> None:
+        doc_id = str(row["id"])
+        if doc_id in self.entries:
+            self.remove(doc_id)
+
+        tokens: dict[str, float] = {}
+        for name, text in document_fields(row).items():
+            weight = INDEXED_FIELDS.get(name)
+            if weight is None:
+                continue
+            for token in set(tokenize(text)):
+                token = sys.intern(token)
+                tokens[token] = tokens.get(token, 0.0) + weight
+
+        entry = _Entry(
+            {k: v for k, v in row.items() if k not in _HEAVY_COLUMNS},
+            tokens,
+            StationLoad.from_row(row),
+        )
+        self.entries[doc_id] = entry
+        for token, weight in tokens.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+            posting[doc_id] = weight
+        bisect.insort(self.ordered, entry.key)
+        for facet in FACETS:
+            self.facets[facet].setdefault(row.get(facet), set()).add(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        entry = self.entries.pop(doc_id)
+        for token in entry.tokens:
+            posting = self.postings[token]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+        del self.ordered[bisect.bisect_left(self.ordered, entry.key)]
+        for facet in FACETS:
+            value = entry.row.get(facet)
+            bucket = self.facets[facet][value]
+            bucket.discard(doc_id)
+            if not bucket:
+                del self.facets[facet][value]
+
+    def match(self, terms: list[str]) -> dict[str, float]:
+        """Doc id -> score for docs where every term prefix-matches a token."""
+        scores: Optional[dict[str, float]] = None
+        for term in terms:
+            term_scores: dict[str, float] = {}
+            i = bisect.bisect_left(self.vocabulary, term)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+                for doc_id, weight in self.postings[self.vocabulary[i]].items():
+                    if weight > term_scores.get(doc_id, 0.0):
+                        term_scores[doc_id] = weight
+                i += 1
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+
+class LibraryIndex:
+    """Read-only, incrementally refreshed copy of the recipe library."""
+
+    def __init__(
+        self,
+        refresh_seconds: float = 30.0,
+        rebuild_seconds: float = 3600.0,
+        max_documents: int = 200_000,
+        enabled: bool = True,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.max_documents = max_documents
+        self.available = enabled
+        self._state: Optional[_State] = None
+        self._refreshed_at = 0.0
+        self._built_at = 0.0
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def size(self) -> int:
+        return len(self._state.entries) if self._state else 0
+
+    async def ensure_ready(self, repos: Repositories) -> bool:
+        """
+        Load the index on first use and start a background refresh when it
+        is stale. Returns False if callers should query the database instead.
+        """
+        if not self.available:
+            return False
+        if self._state is None:
+            if self._load_lock is None:
+                self._load_lock = asyncio.Lock()
+            async with self._load_lock:
+                if self._state is None and self.available:
+                    await self.rebuild(repos)
+            return self._state is not None
+
+        if time.monotonic() - self._refreshed_at >= self.refresh_seconds and (
+            self._task is None or self._task.done()
+        ):
+            self._task = asyncio.create_task(self._refresh_in_background(repos))
+        return True
+
+    async def rebuild(self, repos: Repositories) -> None:
+        """Load the whole library into a fresh index and swap it in."""
+        state = _State()
+        await self._load(state, repos)
+        self._state = state if self.available else None
+        self._built_at = self._refreshed_at = time.monotonic()
+
+    async def refresh(self, repos: Repositories) -> int:
+        """Apply rows changed since the watermark. Returns how many were applied."""
+        if self._state is None:
+            await self.rebuild(repos)
+            return self.size
+        applied = await self._load(self._state, repos)
+        self._refreshed_at = time.monotonic()
+        return applied
+
+    async def _refresh_in_background(self, repos: Repositories) -> None:
+        try:
+            if time.monotonic() - self._built_at >= self.rebuild_seconds:
+                await self.rebuild(repos)
+            else:
+                await self.refresh(repos)
+        except Exception:
+            # Keep serving the current copy; try again after the next interval
+            self._refreshed_at = time.monotonic()
+            logger.exception("Recipe library index refresh failed")
+
+    async def _load(self, state: _State, repos: Repositories) -> int:
+        applied = 0
+        while True:
+            rows = await repos.recipe_library.list_updated_since(
+                state.watermark, REFRESH_BATCH_SIZE, _FETCH_COLUMNS
+            )
+            # Apply each batch synchronously so searches never see half of it
+            for row in rows:
+                state.upsert(row)
+            applied += len(rows)
+            if len(state.entries) > self.max_documents:
+                logger.warning(
+                    "Recipe library has more than %d recipes; in-process index disabled",
+                    self.max_documents,
+                )
+                self.available = False
+                self._state = None
+                return applied
+            if rows:
+                state.watermark = (rows[-1]["updated_at"], str(rows[-1]["id"]))
+            if len(rows) < REFRESH_BATCH_SIZE:
+                return applied
+
+    def get(self, recipe_id: str, columns: str = "*") -> Optional[dict]:
+        """A recipe's list columns, or None if it is not indexed."""
+        entry = self._state.entries.get(recipe_id) if self._state else None
+        return project(entry.row, parse_columns(columns)) if entry else None
+
+    def candidates(
+        self, category: str, search: Optional[str] = None, columns: str = "*"
+    ) -> list[tuple[dict, StationLoad]]:
+        """(row, station load) for every recipe in a category, optionally matching a search."""
+        state = self._state
+        names = parse_columns(columns)
+        doc_ids = state.facets["category"].get(category, set())
+        terms = search_terms(search)
+        if terms:
+            doc_ids = doc_ids & state.match(terms).keys()
+        return [
+            (project(state.entries[doc_id].row, names), state.entries[doc_id].load)
+            for doc_id in sorted(doc_ids)
+        ]
+
+    def search(
+        self,
+        category: Optional[str],
+        search: Optional[str],
+        limit: int,
+        after: Optional[Cursor] = None,
+        columns: str = "*",
+        with_total: bool = False,
+    ) -> Page:
+        """Same contract as RecipeLibraryRepository.list, minus the heavy columns."""
+        state = self._state
+        names = parse_columns(columns)
+        allowed = state.facets["category"].get(category, set()) if category else None
+
+        terms = search_terms(search)
+        if terms:
+            scores = state.match(terms)
+            ranked = [
+                ((score, *state.entries[doc_id].key), doc_id)
+                for doc_id, score in scores.items()
+                if allowed is None or doc_id in allowed
+            ]
+            total = len(ranked) if with_total else None
+            if after is not None:
+                bound = (after.rank or 0.0, after.created_at, after.id)
+                ranked = [item for item in ranked if item[0] < bound]
+            top = heapq.nlargest(limit + 1, ranked)
+            rows = [
+                {**project(state.entries[doc_id].row, names), "rank": key[0]}
+                for key, doc_id in top
+            ]
+            return make_page(rows, limit, total, INDEX_CURSOR_SOURCE)
+
+        total = (len(allowed) if allowed is not None else len(state.entries)) if with_total else None
+        i = bisect.bisect_left(state.ordered, (after.created_at, after.id)) if after else len(state.ordered)
+        rows = []
+        while i > 0 and len(rows) <= limit:
+            i -= 1
+            doc_id = state.ordered[i][1]
+            if allowed is None or doc_id in allowed:
+                rows.append(project(state.entries[doc_id].row, names))
+        return make_page(rows, limit, total)
+
+    def facets(
+        self,
+        search: Optional[str] = None,
+        category: Optional[str] = None,
+        method: Optional[str] = None,
+        day_before_ok: Optional[bool] = None,
+    ) -> dict[str, list[tuple[Any, int]]]:
+        """
+        (value, count) pairs per facet, most common first. Each facet counts
+        the search matches under every filter except its own, so a selected
+        category still shows how many results the other categories have.
+        """
+        state = self._state
+        terms = search_terms(search)
+        matches = set(state.match(terms)) if terms else None
+        filters = {"category": category, "method": method, "day_before_ok": day_before_ok}
+
+        counts = {}
+        for facet in FACETS:
+            candidates = matches
+            for other, value in filters.items():
+                if other == facet or value is None:
+                    continue
+                ids = state.facets[other].get(value, set())
+                candidates = ids if candidates is None else candidates & ids
+            pairs = [
+                (value, len(ids) if candidates is None else len(ids & candidates))
+                for value, ids in state.facets[facet].items()
+            ]
+            counts[facet] = sorted(
+                (pair for pair in pairs if pair[1]), key=lambda pair: (-pair[1], str(pair[0]))
+            )
+        return counts
+
+
+@lru_cache()
+def get_library_index() -> LibraryIndex:
+    """Process-wide library index."""
+    settings = get_settings()
+    return LibraryIndex(
+        refresh_seconds=settings.LIBRARY_INDEX_REFRESH_SECONDS,
+        rebuild_seconds=settings.LIBRARY_INDEX_REBUILD_SECONDS,
+        max_documents=settings.LIBRARY_INDEX_MAX_DOCUMENTS,
+        enabled=settings.LIBRARY_INDEX_ENABLED,
+    )
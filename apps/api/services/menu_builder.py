@@ -0,0 +1,94 @@
+"""
+Capacity-aware menu search over library recipes.
+
+build_menus fills each course slot in turn, depth first, keeping a running
+MenuLoad. A partial menu that already conflicts is dropped together with
+every menu that would extend it, so most combinations are never looked at.
+Complete menus are ranked by how much of the cooking window they leave
+free, easiest first.
+"""
+import heapq
+from typing import Any, NamedTuple, Optional
+
+from .station_load import KitchenLimits, MenuLoad, StationLoad
+
+# Upper bound on menus scored per request, complete or partial
+MAX_EVALUATIONS = 20_000
+
+
+class Candidate(NamedTuple):
+    row: dict[str, Any]
+    load: StationLoad
+
+
+class MenuResult(NamedTuple):
+    recipes: list[dict[str, Any]]
+    load: MenuLoad
+
+
+def build_menus(
+    candidates: dict[str, list[Candidate]],
+    courses: dict[str, int],
+    limits: KitchenLimits,
+    pinned: Optional[list[Candidate]] = None,
+    limit: int = 5,
+    max_evaluations: int = MAX_EVALUATIONS,
+) -> tuple[list[MenuResult], int]:
+    """
+    Best menus with courses[category] recipes from each category, on top of
+    any pinned recipes. Returns the menus and how many (partial) menus were
+    scored.
+    """
+    pinned = pinned or []
+    base = MenuLoad()
+    for candidate in pinned:
+        base = base.add(candidate.load, limits)
+    if base.conflicts(limits):
+        return [], 1
+
+    pinned_ids = {str(c.row["id"]) for c in pinned}
+    # Cheapest recipes first, so good menus turn up before the budget runs out
+    slots = []
+    for category, count in courses.items():
+        pool = sorted(
+            (c for c in candidates.get(category, []) if str(c.row["id"]) not in pinned_ids),
+            key=lambda c: (MenuLoad().add(c.load, limits).span_minutes(limits), str(c.row["id"])),
+        )
+        slots.extend([pool] * count)
+
+    best: list[tuple[tuple[int, int, int], list[Candidate], MenuLoad]] = []
+    evaluated = 0
+    order = 0
+
+    def visit(slot: int, start: int, chosen: list[Candidate], total: MenuLoad) -> None:
+        nonlocal evaluated, order
+        if slot == len(slots):
+            order += 1
+            # Min-heap of the best menus so far, worst at best[0]: shorter span, then less hands-on time
+            key = (-total.span_minutes(limits), -sum(total.lane_minutes[:2]), -order)
+            entry = (key, list(chosen), total)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif key > best[0][0]:
+                heapq.heapreplace(best, entry)
+            return
+        pool = slots[slot]
+        # Slots of the same course pick in increasing order: no repeats or permutations
+        same_course = slot > 0 and slots[slot - 1] is pool
+        for i in range(start if same_course else 0, len(pool)):
+            if evaluated >= max_evaluations:
+                return
+            evaluated += 1
+            extended = total.add(pool[i].load, limits)
+            if extended.conflicts(limits):
+                continue
+            chosen.append(pool[i])
+            visit(slot + 1, i + 1, chosen, extended)
+            chosen.pop()
+
+    visit(0, 0, [], base)
+    menus = sorted(best, key=lambda entry: entry[0], reverse=True)
+    return [
+        MenuResult(recipes=[c.row for c in pinned + chosen], load=total)
+        for _, chosen, total in menus
+    ], evaluated
@@ -1,6 +1,9 @@
 import re
+import time
 import uuid
 from typing import Optional
+from ..lib.metrics import PARSE_SECONDS, TEXT_SIZE_BOUNDS, size_label
+from ..lib.timing import record_phase
 from ..models.recipes import Recipe, Ingredient, AtomicTask
 
 
@@ -11,6 +14,7 @@ def parse_text_recipe(title: Optional[str], headcount: int, raw_text: str) -> Re
     This is a v0 implementation that uses simple rule-based parsing.
     It assumes the text contains an "Ingredients" section and a "Directions" or "Steps" section.
     """
+    started = time.perf_counter()
     recipe_id = str(uuid.uuid4())
     
     # Extract title if not provided
@@ -86,7 +90,7 @@ def parse_text_recipe(title: Optional[str], headcount: int, raw_text: str) -> Re
             tasks.append(task)
             step_num += 1
     
-    return Recipe(
+    recipe = Recipe(
         id=recipe_id,
         title=title,
         headcount=headcount,
@@ -94,6 +98,10 @@ def parse_text_recipe(title: Optional[str], headcount: int, raw_text: str) -> Re
         tasks=tasks,
         source="manual"
     )
+    elapsed = time.perf_counter() - started
+    PARSE_SECONDS.observe(elapsed, size_label(len(raw_text), TEXT_SIZE_BOUNDS))
+    record_phase("parse", started, elapsed)
+    return recipe
 
 
 def _parse_ingredient_line(line: str) -> Optional[Ingredient]:
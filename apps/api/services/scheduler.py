@@ -1,9 +1,44 @@
+import time
 from datetime import datetime, timedelta
 from typing import Iterable, Optional
 from collections import defaultdict
 
-from ..models.recipes import Recipe
-from ..models.schedule import Schedule, ScheduleLane, ScheduledTask
+from ..lib.metrics import SCHEDULE_SECONDS, TASK_COUNT_BOUNDS, size_label
+from ..lib.timing import record_phase
+from ..models.recipes import AtomicTask, Recipe
+from ..models.schedule import Schedule, ScheduleLane
+
+# Simple priority: oven and stove tasks should be scheduled later
+# Prep tasks should be scheduled earlier
+STATION_PRIORITY = {
+    "oven": 1,      # schedule last (closest to serve time)
+    "stove": 2,
+    "counter": 3,
+    "prep": 4,      # schedule first (earliest)
+    "passive": 5,   # can be scheduled anywhere
+}
+
+# Lanes without oven or stove work end this long before serve time
+DEFAULT_LEAD_MINUTES = 120
+
+# Menus with more tasks than this get the too_many_projects warning
+MAX_MENU_TASKS = 20
+
+ONE_MINUTE = timedelta(minutes=1)
+
+
+class _Slot:
+    """
+    A task placed in its lane. Times are minutes relative to serve_time
+    (negative = before serving) so the scheduler does integer arithmetic;
+    datetimes are only built for the returned Schedule.
+    """
+    __slots__ = ("task", "start", "end")
+
+    def __init__(self, task: AtomicTask, start: int, end: int):
+        self.task = task
+        self.start = start
+        self.end = end
 
 
 def build_schedule(
@@ -27,112 +62,91 @@ def build_schedule(
     - Critical path analysis
     - Multi-station coordination
     """
-    # Collect all tasks from all recipes
-    all_tasks = []
+    started = time.perf_counter()
+    
+    # Group tasks from all recipes by station
+    tasks_by_station = defaultdict(list)
+    task_count = 0
     for recipe in recipes:
-        all_tasks.extend(recipe.tasks)
+        for task in recipe.tasks:
+            tasks_by_station[task.station].append(task)
+        task_count += len(recipe.tasks)
     
-    if not all_tasks:
+    if not task_count:
         return Schedule(
             serve_time=serve_time,
             lanes=[],
             notes="No tasks to schedule"
         )
     
-    # Group tasks by station
-    tasks_by_station = defaultdict(list)
-    for task in all_tasks:
-        tasks_by_station[task.station].append(task)
-    
-    # Simple priority: oven and stove tasks should be scheduled later
-    # Prep tasks should be scheduled earlier
-    station_priority = {
-        "oven": 1,      # schedule last (closest to serve time)
-        "stove": 2,
-        "counter": 3,
-        "prep": 4,      # schedule first (earliest)
-        "passive": 5,   # can be scheduled anywhere
-    }
-    
     # Sort stations by priority (lower number = schedule later)
     sorted_stations = sorted(
         tasks_by_station.keys(),
-        key=lambda s: station_priority.get(s, 99)
+        key=lambda s: STATION_PRIORITY.get(s, 99)
     )
     
-    # Build schedule backwards from serve_time
-    # Track current time pointer per station
-    station_pointers = {}
-    
-    # First pass: schedule high-priority stations (oven, stove) backwards
+    # High-priority stations (oven, stove) run back to back up to serve time;
+    # the others work backwards from the earliest time those start
+    slots_by_station = {}
     for station in sorted_stations:
-        if station_priority.get(station, 99) <= 2:
-            current_time = serve_time
-            for task in tasks_by_station[station]:
-                end_time = current_time
-                start_time = end_time - timedelta(minutes=task.duration_minutes)
-                
-                # Store the earliest start time for this station
-                if station not in station_pointers or start_time < station_pointers[station]:
-                    station_pointers[station] = start_time
-                
-                current_time = start_time
-    
-    # Second pass: schedule prep and other tasks, working backwards from
-    # the earliest time we need the high-priority stations
+        if STATION_PRIORITY.get(station, 99) <= 2:
+            slots_by_station[station] = _lay_out(tasks_by_station[station], 0)
     earliest_high_priority = min(
-        station_pointers.values(),
-        default=serve_time - timedelta(hours=2)
+        (slot.start for slots in slots_by_station.values() for slot in slots),
+        default=-DEFAULT_LEAD_MINUTES
     )
-    
     for station in sorted_stations:
-        if station_priority.get(station, 99) > 2:
-            # Start scheduling from earliest_high_priority, working backwards
-            current_time = earliest_high_priority
-            for task in tasks_by_station[station]:
-                end_time = current_time
-                start_time = end_time - timedelta(minutes=task.duration_minutes)
-                current_time = start_time
-    
-    # Now build the actual scheduled tasks
-    scheduled_tasks_by_station = defaultdict(list)
-    
-    for station in sorted_stations:
-        current_time = serve_time if station_priority.get(station, 99) <= 2 else earliest_high_priority
-        
-        for task in tasks_by_station[station]:
-            end_time = current_time
-            start_time = end_time - timedelta(minutes=task.duration_minutes)
-            
-            scheduled_task = ScheduledTask(
-                id=task.id,
-                label=task.label,
-                station=task.station,
-                start_time=start_time,
-                end_time=end_time,
-                notes=task.notes
-            )
-            
-            scheduled_tasks_by_station[station].append(scheduled_task)
-            current_time = start_time
-    
-    # Create lanes
-    lanes = []
-    for station in sorted_stations:
-        tasks = scheduled_tasks_by_station[station]
-        # Sort by start_time (earliest first)
-        tasks.sort(key=lambda t: t.start_time)
-        lanes.append(ScheduleLane(station=station, tasks=tasks))
-    
-    # Check for capacity issues and generate warnings
-    warnings = check_capacity_issues(lanes, serve_time, user_profile)
-    
-    return Schedule(
-        serve_time=serve_time,
-        lanes=lanes,
-        notes=f"Scheduled {len(all_tasks)} tasks across {len(lanes)} stations",
-        warnings=warnings
-    )
+        if station not in slots_by_station:
+            slots_by_station[station] = _lay_out(tasks_by_station[station], earliest_high_priority)
+    
+    for slots in slots_by_station.values():
+        # Earliest first
+        slots.sort(key=lambda s: s.start)
+    
+    warnings = _capacity_warnings(slots_by_station, user_profile)
+    
+    # Datetimes are built once per distinct offset (a task's end is the next
+    # one's start). The whole schedule is then validated from plain dicts in
+    # one call, which is cheaper than building each model on its own.
+    offsets = {slot.start for slots in slots_by_station.values() for slot in slots}
+    offsets.update(slot.end for slots in slots_by_station.values() for slot in slots)
+    times = {offset: serve_time + ONE_MINUTE * offset for offset in offsets}
+    schedule = Schedule.model_validate({
+        "serve_time": serve_time,
+        "lanes": [
+            {
+                "station": station,
+                "tasks": [
+                    {
+                        "id": slot.task.id,
+                        "label": slot.task.label,
+                        "station": slot.task.station,
+                        "start_time": times[slot.start],
+                        "end_time": times[slot.end],
+                        "notes": slot.task.notes,
+                    }
+                    for slot in slots
+                ],
+            }
+            for station, slots in slots_by_station.items()
+        ],
+        "notes": f"Scheduled {task_count} tasks across {len(slots_by_station)} stations",
+        "warnings": warnings,
+    })
+    elapsed = time.perf_counter() - started
+    SCHEDULE_SECONDS.observe(elapsed, size_label(task_count, TASK_COUNT_BOUNDS))
+    record_phase("schedule", started, elapsed)
+    return schedule
+
+
+def _lay_out(tasks: list[AtomicTask], end: int) -> list[_Slot]:
+    """Tasks back to back, in list order, working backwards from end."""
+    slots = []
+    for task in tasks:
+        start = end - task.duration_minutes
+        slots.append(_Slot(task, start, end))
+        end = start
+    return slots
 
 
 def check_capacity_issues(
@@ -149,47 +163,38 @@ def check_capacity_issues(
     - Too many concurrent tasks
     - Stove overbooking (if burner_count is set)
     """
+    def minutes(moment: datetime) -> float:
+        return (moment - serve_time).total_seconds() / 60
+    
+    slots_by_station = {}
+    for lane in lanes:
+        slots = [_Slot(task, minutes(task.start_time), minutes(task.end_time)) for task in lane.tasks]
+        slots.sort(key=lambda s: s.start)
+        slots_by_station.setdefault(lane.station, slots)
+    return _capacity_warnings(slots_by_station, user_profile)
+
+
+def _capacity_warnings(slots_by_station: dict[str, list[_Slot]], user_profile: Optional[dict]) -> list[str]:
+    """check_capacity_issues on lanes of slots, each sorted by start."""
     warnings = []
     
-    # Find oven lane
-    oven_lane = next((lane for lane in lanes if lane.station == "oven"), None)
-    if oven_lane and len(oven_lane.tasks) > 0:
+    oven_slots = slots_by_station.get("oven")
+    prep_slots = slots_by_station.get("prep")
+    if oven_slots:
         # Check for overlapping oven tasks (assuming 1 oven by default)
-        oven_tasks = sorted(oven_lane.tasks, key=lambda t: t.start_time)
-        for i in range(len(oven_tasks) - 1):
-            current = oven_tasks[i]
-            next_task = oven_tasks[i + 1]
-            
-            # If tasks overlap, we have an oven conflict
-            if current.end_time > next_task.start_time:
-                warnings.append("oven_overbooked")
-                break
+        if _overlaps(oven_slots):
+            warnings.append("oven_overbooked")
         
-        # Check if all tasks are oven with no prep time
-        prep_lane = next((lane for lane in lanes if lane.station == "prep"), None)
-        if not prep_lane or len(prep_lane.tasks) == 0:
-            # All oven, no prep - check if there's enough time before first oven task
-            first_oven_task = oven_tasks[0]
-            time_before_oven = (first_oven_task.start_time - serve_time).total_seconds() / 60
-            
-            # If first oven task starts very close to serve time, warn
-            if time_before_oven < 30:  # Less than 30 minutes before serve time
-                warnings.append("all_oven_no_prep")
+        # All oven, no prep - warn if the first oven task starts less than
+        # 30 minutes before serve time
+        if not prep_slots and oven_slots[0].start < 30:
+            warnings.append("all_oven_no_prep")
     
     # Check prep window
-    prep_lane = next((lane for lane in lanes if lane.station == "prep"), None)
-    if prep_lane and len(prep_lane.tasks) > 0:
-        # Find earliest prep task and latest prep task
-        prep_tasks = sorted(prep_lane.tasks, key=lambda t: t.start_time)
-        earliest_prep = prep_tasks[0]
-        latest_prep = prep_tasks[-1]
-        
-        # Total prep time needed
-        total_prep_time = sum(task.duration_minutes for task in prep_tasks)
-        
+    if prep_slots:
+        total_prep_time = sum(slot.end - slot.start for slot in prep_slots)
         # Available window (from earliest prep start to serve time)
-        available_window = (serve_time - earliest_prep.start_time).total_seconds() / 60
-        
+        available_window = -prep_slots[0].start
         # If total prep time is close to or exceeds available window, warn
         if total_prep_time > available_window * 0.9:  # Using 90% threshold
             warnings.append("prep_window_too_short")
@@ -197,25 +202,19 @@ def check_capacity_issues(
     # Check stove capacity if user has burner_count set
     if user_profile and user_profile.get("burner_count"):
         burner_count = user_profile["burner_count"]
-        stove_lane = next((lane for lane in lanes if lane.station == "stove"), None)
-        if stove_lane and len(stove_lane.tasks) > burner_count:
-            # Check for overlapping tasks
-            stove_tasks = sorted(stove_lane.tasks, key=lambda t: t.start_time)
-            overlapping_count = 0
-            for i in range(len(stove_tasks) - 1):
-                current = stove_tasks[i]
-                next_task = stove_tasks[i + 1]
-                if current.end_time > next_task.start_time:
-                    overlapping_count += 1
-            
-            if overlapping_count >= burner_count:
+        stove_slots = slots_by_station.get("stove")
+        if stove_slots and len(stove_slots) > burner_count:
+            if _overlaps(stove_slots) >= burner_count:
                 warnings.append("capacity_overload")
     
     # Check for too many complex recipes (heuristic: many tasks)
-    total_tasks = sum(len(lane.tasks) for lane in lanes)
-    if total_tasks > 20:  # Arbitrary threshold
+    total_tasks = sum(len(slots) for slots in slots_by_station.values())
+    if total_tasks > MAX_MENU_TASKS:
         warnings.append("too_many_projects")
     
-    # Remove duplicates
-    return list(set(warnings))
+    return warnings
+
 
+def _overlaps(slots: list[_Slot]) -> int:
+    """How many slots run past the start of the next one."""
+    return sum(1 for current, next_slot in zip(slots, slots[1:]) if current.end > next_slot.start)
@@ -0,0 +1,296 @@
+"""
+Ingredient-vector similarity for the recipe library.
+
+Each library recipe becomes a sparse, L2-normalised TF-IDF vector over its
+ingredient names, so the dot product of two rows is their cosine
+similarity. The vectors are stored twice, as CSR (rows = recipes, to read a
+recipe's own vector) and CSC (columns = ingredients, to find every recipe
+sharing an ingredient), in plain .npy files that are memory-mapped at
+load. A query only touches the columns of its own ingredients and sums
+them with one np.bincount, so top-k over 100k recipes takes a few
+milliseconds on one core.
+
+The index is built offline from the recipe_library table:
+
+    python -m apps.api.services.similarity build [--out similarity_index]
+
+and picked up by running processes when its files change. numpy is an
+optional dependency; without it (or without an index) the similarity
+endpoints answer 503.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from typing import Any, Iterable, Optional
+
+from ..dependencies import get_settings
+from ..lib.search import ingredient_names
+from ..repositories.base import Repositories
+
+# Files in an index directory
+ARRAYS = ("ids", "categories", "indptr", "indices", "data", "col_ptr", "col_rows", "col_data")
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+_BUILD_BATCH_SIZE = 1000
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def _numpy():
+    """Import numpy lazily; it is only needed for similarity search."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def ingredient_term(name: str) -> str:
+    """Normalise an ingredient name to a vocabulary term: "Green Beans," -> "green bean"."""
+    words = _NON_WORD.sub(" ", name.lower()).split()
+    if words and len(words[-1]) > 3 and words[-1].endswith("s") and not words[-1].endswith("ss"):
+        words[-1] = words[-1][:-1]
+    return " ".join(words)
+
+
+def build_arrays(rows: Iterable[dict]) -> dict[str, Any]:
+    """
+    TF-IDF matrix for library rows (id, category, normalized), as the CSR
+    and CSC arrays saved in an index. Rows are sorted by id so a recipe's
+    position can be found with a binary search on the memory-mapped ids.
+    """
+    np = _numpy()
+    docs = []
+    for row in sorted(rows, key=lambda r: str(r["id"])):
+        terms = Counter(t for t in map(ingredient_term, ingredient_names(row.get("normalized"))) if t)
+        docs.append((str(row["id"]), row.get("category") or "", terms))
+
+    vocabulary: dict[str, int] = {}
+    df: Counter = Counter()
+    for _, _, terms in docs:
+        df.update(terms.keys())
+        for term in terms:
+            vocabulary.setdefault(term, len(vocabulary))
+
+    category_names = sorted({d[1] for d in docs})
+    category_codes = {name: code for code, name in enumerate(category_names)}
+
+    n = len(docs)
+    # Smoothed idf, as in scikit-learn: rare ingredients count for more
+    idf = {term: math.log((1 + n) / (1 + count)) + 1.0 for term, count in df.items()}
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indices, data = [], []
+    for i, (_, _, terms) in enumerate(docs):
+        weights = {vocabulary[t]: (1.0 + math.log(c)) * idf[t] for t, c in terms.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        for col in sorted(weights):
+            indices.append(col)
+            data.append(weights[col] / norm)
+        indptr[i + 1] = len(indices)
+
+    indices = np.asarray(indices, dtype=np.int32)
+    data = np.asarray(data, dtype=np.float32)
+    row_of = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    col_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=len(vocabulary)), out=col_ptr[1:])
+
+    return {
+        "ids": np.asarray([d[0] for d in docs], dtype="U36"),
+        "categories": np.asarray([category_codes[d[1]] for d in docs], dtype=np.uint8),
+        "category_names": category_names,
+        "indptr": indptr,
+        "indices": indices,
+        "data": data,
+        "col_ptr": col_ptr,
+        "col_rows": row_of[order],
+        "col_data": data[order],
+    }
+
+
+def save_index(arrays: dict[str, Any], path: str) -> None:
+    """Write an index directory, replacing any existing one in a single rename."""
+    np = _numpy()
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in ARRAYS:
+        np.save(os.path.join(tmp, f"{name}.npy"), arrays[name])
+    with open(os.path.join(tmp, META_FILE), "w") as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "recipes": int(len(arrays["ids"])),
+            "category_names": arrays["category_names"],
+        }, f)
+
+    old = f"{path}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+async def build_index(repos: Repositories, path: str) -> int:
+    """Rebuild the index at path from the recipe_library table. Returns the recipe count."""
+    rows, watermark = [], None
+    while True:
+        batch = await repos.recipe_library.list_updated_since(
+            watermark, _BUILD_BATCH_SIZE, "id, category, normalized, updated_at"
+        )
+        rows.extend(batch)
+        if len(batch) < _BUILD_BATCH_SIZE:
+            break
+        watermark = (batch[-1]["updated_at"], str(batch[-1]["id"]))
+    save_index(build_arrays(rows), path)
+    return len(rows)
+
+
+class SimilarityIndex:
+    """Memory-mapped TF-IDF index; see the module docstring for the layout."""
+
+    def __init__(self, arrays: dict[str, Any]):
+        self.np = _numpy()
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.category_names: list[str] = list(arrays["category_names"])
+        self.size = len(self.ids)
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityIndex":
+        np = _numpy()
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported similarity index version {meta.get('version')}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        return cls({**arrays, "category_names": meta["category_names"]})
+
+    def position(self, recipe_id: str) -> Optional[int]:
+        i = int(self.np.searchsorted(self.ids, recipe_id))
+        return i if i < self.size and self.ids[i] == recipe_id else None
+
+    def _scores(self, queries: list[tuple[Any, Any]]):
+        """Cosine scores of every recipe against each (term columns, weights) query, as a (q, n) array."""
+        np = self.np
+        rows, weights = [], []
+        for q, (cols, vals) in enumerate(queries):
+            for col, val in zip(cols.tolist(), vals.tolist()):
+                start, end = self.col_ptr[col], self.col_ptr[col + 1]
+                rows.append(self.col_rows[start:end].astype(np.int64) + q * self.size)
+                weights.append(self.col_data[start:end] * val)
+        if not rows:
+            return np.zeros((len(queries), self.size), dtype=np.float64)
+        flat = np.bincount(np.concatenate(rows), np.concatenate(weights), minlength=len(queries) * self.size)
+        return flat.reshape(len(queries), self.size)
+
+    def _row_query(self, position: int):
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def _top(self, scores, k: int) -> list[list[tuple[str, float]]]:
+        """Top-k (id, score) per row of a (q, n) score array, best first, zeros dropped."""
+        np = self.np
+        k = min(k, self.size)
+        if k == 0:
+            return [[] for _ in range(len(scores))]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < self.size else np.tile(
+            np.arange(self.size), (len(scores), 1)
+        )
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [(str(self.ids[i]), float(score)) for i, score in zip(row, row_scores) if score > 0]
+            for row, row_scores in zip(top.tolist(), top_scores.tolist())
+        ]
+
+    def similar(self, recipe_ids: list[str], k: int = 10) -> dict[str, list[tuple[str, float]]]:
+        """Top-k most similar recipes for each recipe id, scored in one batch."""
+        np = self.np
+        positions = {rid: self.position(rid) for rid in recipe_ids}
+        known = [(rid, pos) for rid, pos in positions.items() if pos is not None]
+        if not known:
+            return {rid: [] for rid in recipe_ids}
+        scores = self._scores([self._row_query(pos) for _, pos in known])
+        # A recipe is not similar to itself
+        scores[np.arange(len(known)), [pos for _, pos in known]] = 0.0
+        results = dict(zip((rid for rid, _ in known), self._top(scores, k)))
+        return {rid: results.get(rid, []) for rid in recipe_ids}
+
+    def complements(self, recipe_ids: list[str], k: int = 3) -> dict[str, list[tuple[str, float]]]:
+        """
+        Menu suggestions for the given recipes: the top-k closest recipes in
+        each category not already on the menu, by the menu's combined vector.
+        """
+        np = self.np
+        positions = [p for p in map(self.position, recipe_ids) if p is not None]
+        if not positions:
+            return {}
+        cols = np.concatenate([self._row_query(p)[0] for p in positions])
+        vals = np.concatenate([self._row_query(p)[1] for p in positions]).astype(np.float64)
+        terms, inverse = np.unique(cols, return_inverse=True)
+        summed = np.bincount(inverse, vals)
+        query = (terms, summed / (np.linalg.norm(summed) or 1.0))
+        scores = self._scores([query])[0]
+        scores[positions] = 0.0
+
+        taken = {int(self.categories[p]) for p in positions}
+        missing = [code for code in range(len(self.category_names)) if code not in taken]
+        if not missing:
+            return {}
+        # One row per missing category, with other categories zeroed out
+        codes = np.asarray(missing, dtype=self.categories.dtype)
+        per_category = np.where(self.categories[None, :] == codes[:, None], scores[None, :], 0.0)
+        return {
+            self.category_names[code]: top
+            for code, top in zip(missing, self._top(per_category, k))
+        }
+
+
+_lock = threading.Lock()
+_loaded: dict[str, Any] = {"key": None, "index": None}
+
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """
+    The index at SIMILARITY_INDEX_PATH, reloaded when it is rebuilt.
+    None if numpy is not installed or no index has been built.
+    """
+    if _numpy() is None:
+        return None
+    path = get_settings().SIMILARITY_INDEX_PATH
+    try:
+        stat = os.stat(os.path.join(path, META_FILE))
+    except OSError:
+        return None
+    key = (path, stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        if _loaded["key"] != key:
+            _loaded["index"] = SimilarityIndex.load(path)
+            _loaded["key"] = key
+        return _loaded["index"]
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    from ..repositories import get_repositories
+
+    parser = argparse.ArgumentParser(description="Recipe library similarity index")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--out", default=None, help="Index directory (default: SIMILARITY_INDEX_PATH)")
+    args = parser.parse_args()
+
+    out = args.out or get_settings().SIMILARITY_INDEX_PATH
+    if _numpy() is None:
+        raise SystemExit("numpy is required to build the similarity index")
+    count = asyncio.run(build_index(get_repositories(), out))
+    print(f"Indexed {count} library recipes into {out}")
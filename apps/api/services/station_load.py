@@ -0,0 +1,292 @@
+"""
+Per-recipe station-load summaries and cheap menu feasibility checks.
+
+A summary condenses a recipe's task list into a handful of numbers: minutes
+per station, the critical path through task dependencies, how many tasks
+can run at once, and the ingredient weight. Adding up summaries is enough
+to tell whether a menu fits the kitchen (one oven of oven_capacity_lbs,
+burner_count burners, one cook) inside a cooking window, without running
+build_schedule on every candidate menu.
+
+The checks mirror the scheduler's layout: oven and stove lanes run in
+parallel and finish at serve time; prep, counter and passive lanes run
+before them, each lane back to back.
+
+Summaries are stored in the SUMMARY_COLUMNS of recipes and recipe_library
+(supabase/migrations/add_recipe_load_summaries.sql), written alongside
+normalized by with_load_summary. Rows edited behind the API's back have
+their summary cleared by a trigger and are refilled with
+
+    python -m apps.api.services.station_load backfill
+"""
+import math
+from typing import Any, Iterable, NamedTuple, Optional
+
+from .scheduler import MAX_MENU_TASKS
+
+STATIONS = ("oven", "stove", "prep", "counter", "passive")
+
+GRAMS_PER_LB = 453.592
+
+# Summary columns in recipes and recipe_library
+SUMMARY_COLUMNS = (
+    "station_minutes", "oven_minutes", "stove_minutes", "hands_on_minutes",
+    "critical_path_minutes", "peak_concurrency", "task_count", "ingredient_grams",
+)
+
+
+class StationLoad(NamedTuple):
+    """What one recipe asks of the kitchen, at its base headcount."""
+    station_minutes: dict[str, int]
+    critical_path_minutes: int
+    peak_concurrency: int
+    task_count: int
+    ingredient_grams: float
+    base_headcount: int
+
+    def minutes(self, station: str) -> int:
+        return self.station_minutes.get(station, 0)
+
+    def grams_for(self, headcount: int) -> float:
+        """Ingredient weight scaled like scale_recipe scales quantities."""
+        if not self.base_headcount:
+            return self.ingredient_grams
+        return self.ingredient_grams * headcount / self.base_headcount
+
+    def columns(self) -> dict[str, Any]:
+        """The summary as SUMMARY_COLUMNS values."""
+        return {
+            "station_minutes": self.station_minutes,
+            "oven_minutes": self.minutes("oven"),
+            "stove_minutes": self.minutes("stove"),
+            "hands_on_minutes": self.minutes("prep") + self.minutes("counter"),
+            "critical_path_minutes": self.critical_path_minutes,
+            "peak_concurrency": self.peak_concurrency,
+            "task_count": self.task_count,
+            "ingredient_grams": self.ingredient_grams,
+        }
+
+    @classmethod
+    def from_row(cls, row: dict) -> "StationLoad":
+        """Summary from a row's stored columns, or computed from normalized if it has none yet."""
+        if row.get("critical_path_minutes") is None:
+            return summarize(row.get("normalized"), row.get("base_headcount"))
+        return cls(
+            station_minutes=row.get("station_minutes") or {},
+            critical_path_minutes=row["critical_path_minutes"],
+            peak_concurrency=row.get("peak_concurrency") or 0,
+            task_count=row.get("task_count") or 0,
+            ingredient_grams=float(row.get("ingredient_grams") or 0),
+            base_headcount=row.get("base_headcount") or 0,
+        )
+
+
+def summarize(normalized: Optional[dict], base_headcount: Optional[int] = None) -> StationLoad:
+    """Station-load summary of a normalized Recipe dict."""
+    normalized = normalized or {}
+    tasks = [t for t in normalized.get("tasks") or [] if isinstance(t, dict)]
+    headcount = base_headcount or normalized.get("headcount") or 0
+
+    station_minutes: dict[str, int] = {}
+    for task in tasks:
+        station = task.get("station") or "prep"
+        station_minutes[station] = station_minutes.get(station, 0) + int(task.get("duration_minutes") or 0)
+
+    grams = sum(
+        float(ing.get("normalized_grams") or 0)
+        for ing in normalized.get("ingredients") or []
+        if isinstance(ing, dict)
+    )
+    spans = _earliest_spans(tasks)
+    return StationLoad(
+        station_minutes=station_minutes,
+        critical_path_minutes=max((end for _, end in spans), default=0),
+        peak_concurrency=_peak_overlap(spans),
+        task_count=len(tasks),
+        ingredient_grams=round(grams, 1),
+        base_headcount=int(headcount),
+    )
+
+
+def with_load_summary(data: dict) -> dict:
+    """Row data plus refreshed summary columns, if it sets normalized."""
+    if "normalized" not in data:
+        return data
+    return {**data, **summarize(data["normalized"]).columns()}
+
+
+def _earliest_spans(tasks: list[dict]) -> list[tuple[int, int]]:
+    """
+    (start, end) minutes of each task when every task starts as soon as its
+    dependencies finish. Unknown dependencies are ignored and cycles are
+    broken, so malformed task lists still get a summary.
+    """
+    by_id = {str(t.get("id")): t for t in tasks}
+    deps = {
+        task_id: [str(dep) for dep in task.get("depends_on") or [] if str(dep) in by_id]
+        for task_id, task in by_id.items()
+    }
+    ends: dict[str, int] = {}
+    visiting: set[str] = set()
+
+    # Depth-first with an explicit stack, so long dependency chains cannot
+    # hit the recursion limit. A dependency still being visited is a cycle
+    # and counts as ending at 0.
+    for root in by_id:
+        if root in ends:
+            continue
+        visiting.add(root)
+        stack = [(root, iter(deps[root]))]
+        while stack:
+            task_id, pending = stack[-1]
+            dep = next((d for d in pending if d not in ends and d not in visiting), None)
+            if dep is not None:
+                visiting.add(dep)
+                stack.append((dep, iter(deps[dep])))
+                continue
+            stack.pop()
+            visiting.discard(task_id)
+            start = max((ends.get(d, 0) for d in deps[task_id]), default=0)
+            ends[task_id] = start + int(by_id[task_id].get("duration_minutes") or 0)
+
+    spans = []
+    for task_id, task in by_id.items():
+        end = ends[task_id]
+        spans.append((end - int(task.get("duration_minutes") or 0), end))
+    return spans
+
+
+def _peak_overlap(spans: list[tuple[int, int]]) -> int:
+    events = sorted([(start, 1) for start, end in spans if end > start] + [(end, -1) for start, end in spans if end > start])
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+class KitchenLimits(NamedTuple):
+    """The host's kitchen and how long before serving they can cook."""
+    window_minutes: int
+    headcount: int
+    oven_capacity_lbs: Optional[float] = None
+    burner_count: Optional[int] = None
+
+    @classmethod
+    def from_profile(cls, window_minutes: int, headcount: int, profile: Optional[dict]) -> "KitchenLimits":
+        profile = profile or {}
+        return cls(
+            window_minutes=window_minutes,
+            headcount=headcount,
+            oven_capacity_lbs=profile.get("oven_capacity_lbs") or None,
+            burner_count=profile.get("burner_count") or None,
+        )
+
+
+class MenuLoad(NamedTuple):
+    """Summed station load of a (partial) menu, scaled to the headcount."""
+    oven_minutes: int = 0
+    stove_minutes: int = 0
+    # prep, counter, passive, ... (lanes that run before oven and stove)
+    lane_minutes: tuple[int, ...] = (0, 0, 0)
+    critical_path_minutes: int = 0
+    task_count: int = 0
+
+    def add(self, load: StationLoad, limits: KitchenLimits) -> "MenuLoad":
+        oven = load.minutes("oven")
+        if oven and limits.oven_capacity_lbs:
+            # Food that does not fit goes in in more than one batch
+            batches = math.ceil(load.grams_for(limits.headcount) / GRAMS_PER_LB / limits.oven_capacity_lbs) or 1
+            oven *= batches
+        return MenuLoad(
+            oven_minutes=self.oven_minutes + oven,
+            stove_minutes=self.stove_minutes + load.minutes("stove"),
+            lane_minutes=tuple(
+                total + load.minutes(station) for total, station in zip(self.lane_minutes, STATIONS[2:])
+            ),
+            critical_path_minutes=max(self.critical_path_minutes, load.critical_path_minutes),
+            task_count=self.task_count + load.task_count,
+        )
+
+    def stove_span(self, limits: KitchenLimits) -> int:
+        return math.ceil(self.stove_minutes / (limits.burner_count or 1))
+
+    def span_minutes(self, limits: KitchenLimits) -> int:
+        """Minutes from the first task to serve time, laid out as the scheduler does."""
+        cooking = max(self.oven_minutes, self.stove_span(limits))
+        return max(cooking + max(self.lane_minutes), self.critical_path_minutes)
+
+    def conflicts(self, limits: KitchenLimits) -> list[str]:
+        """
+        Warning codes, named as build_schedule names them, for a menu that
+        does not fit. Every total only grows as recipes are added, so a
+        partial menu with conflicts can be pruned.
+        """
+        window = limits.window_minutes
+        found = []
+        if self.oven_minutes > window:
+            found.append("oven_overbooked")
+        if self.stove_span(limits) > window:
+            found.append("capacity_overload")
+        if self.span_minutes(limits) > window:
+            found.append("prep_window_too_short")
+        return found
+
+    def warnings(self) -> list[str]:
+        """Warning codes for a menu that fits but asks a lot of the host; these do not prune."""
+        return ["too_many_projects"] if self.task_count > MAX_MENU_TASKS else []
+
+    def as_dict(self, limits: KitchenLimits) -> dict[str, Any]:
+        return {
+            "span_minutes": self.span_minutes(limits),
+            "oven_minutes": self.oven_minutes,
+            "stove_minutes": self.stove_minutes,
+            "hands_on_minutes": sum(self.lane_minutes[:2]),
+            "task_count": self.task_count,
+        }
+
+
+def menu_load(loads: Iterable[StationLoad], limits: KitchenLimits) -> MenuLoad:
+    total = MenuLoad()
+    for load in loads:
+        total = total.add(load, limits)
+    return total
+
+
+BACKFILL_BATCH_SIZE = 500
+
+
+async def backfill(repos) -> int:
+    """Fill in missing summaries in recipe_library and recipes. Returns rows updated."""
+    updated = 0
+    while True:
+        rows = await repos.recipe_library.list_missing_summary(BACKFILL_BATCH_SIZE)
+        for row in rows:
+            await repos.recipe_library.update(str(row["id"]), summarize(row.get("normalized")).columns())
+        updated += len(rows)
+        if len(rows) < BACKFILL_BATCH_SIZE:
+            break
+    while True:
+        rows = await repos.recipes.list_missing_summary(BACKFILL_BATCH_SIZE)
+        for row in rows:
+            await repos.recipes.update(
+                str(row["id"]), str(row["user_id"]), summarize(row.get("normalized")).columns()
+            )
+        updated += len(rows)
+        if len(rows) < BACKFILL_BATCH_SIZE:
+            break
+    return updated
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    from ..repositories import get_repositories
+
+    parser = argparse.ArgumentParser(description="Recipe station-load summaries")
+    parser.add_argument("command", choices=["backfill"])
+    parser.parse_args()
+
+    count = asyncio.run(backfill(get_repositories()))
+    print(f"Summarised {count} recipes")
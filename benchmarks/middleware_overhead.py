@@ -0,0 +1,100 @@
+"""
+Per-request latency through the full middleware stack.
+
+Calls the ASGI app directly (no server or socket) on the in-memory backend
+and prints p50/p99 for an exempt path, a rate-limited JSON list and the
+same list streamed as NDJSON. Run it on two commits to compare:
+
+    python -m benchmarks.middleware_overhead [--requests 5000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+os.environ.setdefault("DATA_BACKEND", "memory")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-jwt-secret-0123456789abcdef")
+# Budgets large enough that nothing is ever refused
+os.environ.setdefault(
+    "RATE_LIMIT_BUDGETS", '{"events": [1000000000, 3600], "default": [1000000000, 3600]}'
+)
+
+import jwt  # noqa: E402
+
+from apps.api.main import app  # noqa: E402
+from apps.api.repositories import get_repositories  # noqa: E402
+
+CASES = (
+    ("GET /health (exempt)", "/health", b"", False),
+    ("GET /events (limited)", "/events", b"", True),
+    ("GET /events?stream=true", "/events", b"stream=true", True),
+)
+
+
+async def _call(path: str, query: bytes, headers: list) -> tuple[float, int]:
+    """One request; returns (microseconds, status)."""
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": query,
+        "headers": headers, "http_version": "1.1", "scheme": "http", "server": ("bench", 80),
+        "client": ("bench", 1), "root_path": "",
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # Nothing more to read; StreamingResponse waits here for a disconnect
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = 0
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return (time.perf_counter() - start) * 1e6, status
+
+
+async def main(requests: int) -> None:
+    logging.disable(logging.CRITICAL)
+    await app.router.startup()
+    repos = get_repositories()
+    profile = await repos.profiles.create({"email": "bench@example.com"})
+    for i in range(5):
+        await repos.events.create({
+            "user_id": profile["id"], "name": f"Event {i}", "event_type": "event",
+            "event_date": "2024-06-01T18:00:00+00:00",
+        })
+    token = jwt.encode(
+        {"sub": profile["id"], "aud": "authenticated", "exp": int(time.time()) + 3600},
+        os.environ["SUPABASE_JWT_SECRET"],
+        algorithm="HS256",
+    )
+    auth = [(b"authorization", f"Bearer {token}".encode())]
+
+    for label, path, query, authenticated in CASES:
+        headers = auth if authenticated else []
+        for _ in range(requests // 10):
+            await _call(path, query, headers)
+        samples = []
+        for _ in range(requests):
+            micros, status = await _call(path, query, headers)
+            if status != 200:
+                raise RuntimeError(f"{label}: status {status}")
+            samples.append(micros)
+        samples.sort()
+        p50, p99 = samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+        print(f"{label:26s} p50 {p50:8.1f} us   p99 {p99:8.1f} us")
+    await app.router.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    asyncio.run(main(parser.parse_args().requests))
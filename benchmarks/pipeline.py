@@ -0,0 +1,204 @@
+"""
+Timing and memory of the parse -> scale -> schedule pipeline by input size.
+
+Runs parse_text_recipe, scale_recipe, build_schedule and
+check_capacity_issues (and all three stages back to back) on synthetic
+inputs of 10 to 10,000 tasks, and writes the results as JSON. Every case
+runs --repeat times in each of --rounds passes over all cases; the fastest
+run is what compare uses, as the figure least moved by other load on the
+machine, and the median is kept alongside. Memory is the tracemalloc peak
+of one separate run, so tracing does not slow the timed ones.
+
+    python -m benchmarks.pipeline run [--sizes 10,100,1000,10000] [--output results.json]
+    python -m benchmarks.pipeline compare base.json head.json [--threshold 0.15]
+
+compare lists every case that got slower or allocates more than threshold
+(a fraction) beyond the base and exits with status 1 if there is any.
+Results default to benchmarks/results/<commit>.json, so running `run` on
+two commits and comparing the two files checks a change.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from apps.api.services.parsing import parse_text_recipe
+from apps.api.services.scaling import scale_recipe
+from apps.api.services.scheduler import build_schedule, check_capacity_issues
+
+from .synthetic import SERVE_TIME, make_recipe, make_recipe_text, make_recipes
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Slowdowns smaller than this are treated as noise, however large in proportion
+MIN_TIME_DELTA_SECONDS = 20e-6
+MIN_MEMORY_DELTA_BYTES = 16 * 1024
+
+
+def _cases(size: int, seed: int) -> dict[str, Callable[[], object]]:
+    """The benchmarked calls for one size, with their inputs built up front."""
+    rng = random.Random(seed + size)
+    text = make_recipe_text(rng, size)
+    recipe = make_recipe(rng, size)
+    recipes = make_recipes(rng, size)
+    lanes = build_schedule(recipes, SERVE_TIME).lanes
+    profile = {"oven_capacity_lbs": 20, "burner_count": 4}
+
+    def pipeline():
+        parsed = parse_text_recipe(None, 4, text)
+        return build_schedule([scale_recipe(parsed, 12)], SERVE_TIME, profile)
+
+    return {
+        "parse_text_recipe": lambda: parse_text_recipe(None, 4, text),
+        "scale_recipe": lambda: scale_recipe(recipe, recipe.headcount * 3),
+        "build_schedule": lambda: build_schedule(recipes, SERVE_TIME, profile),
+        "check_capacity_issues": lambda: check_capacity_issues(lanes, SERVE_TIME, profile),
+        "pipeline": pipeline,
+    }
+
+
+def _time(fn: Callable[[], object], repeat: int) -> list[float]:
+    """Run times with the collector off, as timeit does: otherwise each run
+    pays for collections whose cost depends on what earlier cases left."""
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return times
+
+
+def _peak_bytes(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes: list[int], repeat: int, rounds: int, seed: int) -> dict:
+    """Results keyed "function/size"."""
+    cases = {}
+    for size in sizes:
+        # Fewer repeats where a single run already takes a while
+        size_repeat = max(1, repeat * 100 // max(size, 100))
+        for name, fn in _cases(size, seed).items():
+            fn()  # warm-up
+            cases[f"{name}/{size}"] = (name, size, fn, size_repeat)
+
+    # Every case runs in every round, so a slow spell on the machine is
+    # spread over all of them rather than landing on a few
+    times: dict[str, list[float]] = {key: [] for key in cases}
+    for _ in range(rounds):
+        for key, (_, _, fn, size_repeat) in cases.items():
+            times[key] += _time(fn, size_repeat)
+
+    results = {}
+    for key, (name, size, fn, _) in cases.items():
+        result = results[key] = {
+            "function": name,
+            "tasks": size,
+            "min_seconds": min(times[key]),
+            "median_seconds": statistics.median(times[key]),
+            "runs": len(times[key]),
+            "peak_bytes": _peak_bytes(fn),
+        }
+        print(
+            f"{name:22s} {size:6d} tasks  min {result['min_seconds'] * 1e3:9.3f} ms"
+            f"  median {result['median_seconds'] * 1e3:9.3f} ms   peak {result['peak_bytes'] / 1024:9.1f} KiB"
+        )
+    return {
+        "commit": _commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(base: dict, head: dict, threshold: float) -> list[str]:
+    """One line per regression of head against base."""
+    regressions = []
+    for key, new in head["results"].items():
+        old = base["results"].get(key)
+        if old is None:
+            continue
+        checks = (
+            ("time", old["min_seconds"], new["min_seconds"], MIN_TIME_DELTA_SECONDS, 1e3, "ms"),
+            ("memory", old["peak_bytes"], new["peak_bytes"], MIN_MEMORY_DELTA_BYTES, 1 / 1024, "KiB"),
+        )
+        for label, before, after, min_delta, scale, unit in checks:
+            if after - before > max(before * threshold, min_delta):
+                regressions.append(
+                    f"{key:30s} {label:6s} {before * scale:10.3f} -> {after * scale:10.3f} {unit}"
+                    f" (+{(after / before - 1) * 100 if before else float('inf'):.0f}%)"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark this checkout and write JSON results")
+    run_parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated task counts")
+    run_parser.add_argument("--repeat", type=int, default=4, help="timed runs per round at 100 tasks or fewer")
+    run_parser.add_argument("--rounds", type=int, default=5, help="passes over every case")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown or growth, as a fraction")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run([int(size) for size in args.sizes.split(",")], args.repeat, args.rounds, args.seed)
+        output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {output}")
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    regressions = compare(base, head, args.threshold)
+    print(f"{base['commit']} -> {head['commit']}: {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    for line in regressions:
+        print(line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Deterministic synthetic inputs for the pipeline benchmarks.
+
+Every generator takes a random.Random, so the same seed gives the same
+recipes and text on every commit. Task graphs are DAGs: each task depends
+on up to two earlier tasks of its recipe. Stations follow a typical mix:
+mostly prep, with oven, stove, counter and passive work.
+"""
+import random
+from datetime import datetime, timezone
+
+from apps.api.models.recipes import AtomicTask, Ingredient, Recipe
+
+SERVE_TIME = datetime(2024, 11, 28, 17, 0, tzinfo=timezone.utc)
+
+# Tasks per generated recipe; larger sizes are split into several recipes
+TASKS_PER_RECIPE = 40
+
+STATION_WEIGHTS = {"prep": 5, "stove": 3, "oven": 2, "counter": 2, "passive": 1}
+
+INGREDIENTS = (
+    "onions", "garlic", "butter", "flour", "chicken thighs", "carrots", "celery", "potatoes",
+    "heavy cream", "parmesan", "thyme", "rosemary", "lemons", "olive oil", "green beans", "sugar",
+)
+UNITS = ("cups", "tbsp", "tsp", "g", "lb", "oz", "cloves", "whole")
+NOTES = ("finely diced", "softened", "peeled", "room temperature", "chopped", None, None)
+
+# Step text per station, worded so parse_text_recipe assigns that station
+STEP_TEMPLATES = {
+    "prep": ("Dice the {item}", "Peel and chop the {item}", "Whisk the {item} until smooth"),
+    "stove": ("Simmer the {item} for {minutes} minutes", "Heat the {item} in a wide pan for {minutes} minutes"),
+    "oven": ("Bake the {item} for {minutes} minutes", "Roast the {item} for {minutes} minutes"),
+    "counter": ("Arrange the {item} on a platter", "Spoon the {item} into serving bowls"),
+    "passive": ("Let the {item} rest for {minutes} minutes", "Chill the {item} for {minutes} minutes"),
+}
+
+
+def _stations(rng: random.Random, count: int) -> list[str]:
+    return rng.choices(list(STATION_WEIGHTS), weights=list(STATION_WEIGHTS.values()), k=count)
+
+
+def _ingredient(rng: random.Random) -> Ingredient:
+    return Ingredient(
+        name=rng.choice(INGREDIENTS),
+        quantity=round(rng.uniform(0.25, 6), 2),
+        unit=rng.choice(UNITS),
+        notes=rng.choice(NOTES),
+        normalized_grams=round(rng.uniform(5, 900), 1),
+    )
+
+
+def make_recipe(rng: random.Random, task_count: int, recipe_id: str = "recipe-0") -> Recipe:
+    """One recipe with task_count tasks and about half as many ingredients."""
+    tasks = []
+    for i, station in enumerate(_stations(rng, task_count)):
+        earlier = range(max(0, i - 5), i)
+        depends_on = [f"{recipe_id}-task-{j}" for j in rng.sample(earlier, min(len(earlier), rng.randint(0, 2)))]
+        tasks.append(AtomicTask(
+            id=f"{recipe_id}-task-{i}",
+            label=f"{station.title()} step {i}",
+            duration_minutes=rng.randint(2, 60) if station != "counter" else rng.randint(2, 10),
+            station=station,
+            depends_on=depends_on,
+        ))
+    return Recipe(
+        id=recipe_id,
+        title=f"Synthetic recipe {recipe_id}",
+        headcount=rng.choice((2, 4, 6, 8)),
+        ingredients=[_ingredient(rng) for _ in range(max(3, task_count // 2))],
+        tasks=tasks,
+        source="synthetic",
+    )
+
+
+def make_recipes(rng: random.Random, task_count: int) -> list[Recipe]:
+    """Recipes holding task_count tasks in total, TASKS_PER_RECIPE at most each."""
+    recipes = []
+    remaining = task_count
+    while remaining > 0:
+        size = min(remaining, TASKS_PER_RECIPE)
+        recipes.append(make_recipe(rng, size, f"recipe-{len(recipes)}"))
+        remaining -= size
+    return recipes
+
+
+def make_recipe_text(rng: random.Random, step_count: int) -> str:
+    """Cookbook-style text that parse_text_recipe reads as step_count tasks."""
+    lines = [f"Synthetic Feast for {step_count}", "", "Ingredients"]
+    for _ in range(max(3, step_count // 2)):
+        quantity = rng.choice(("1", "2", "1/2", "1 1/2", "3", "250"))
+        note = rng.choice(NOTES)
+        lines.append(f"{quantity} {rng.choice(UNITS)} {rng.choice(INGREDIENTS)}" + (f", {note}" if note else ""))
+    lines += ["", "Directions"]
+    for i, station in enumerate(_stations(rng, step_count), start=1):
+        template = rng.choice(STEP_TEMPLATES[station])
+        lines.append(f"{i}. " + template.format(item=rng.choice(INGREDIENTS), minutes=rng.randint(5, 90)))
+    return "\n".join(lines) + "\n"
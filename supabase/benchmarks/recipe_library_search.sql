@@ -0,0 +1,91 @@
+-- Benchmark: recipe library search against a seeded library of 50k recipes
+--
+-- Requires migrations/add_recipe_library_search.sql. Everything runs in one
+-- transaction that is rolled back, so it is safe on a dev project:
+--
+--   psql "$DATABASE_URL" -f supabase/benchmarks/recipe_library_search.sql
+--
+-- Compare the plans and "Execution Time" lines: the old ILIKE filter scans
+-- every row, the ranked search should be a Bitmap Index Scan on
+-- idx_recipe_library_search_vector.
+
+begin;
+
+-- Seed 50k recipes from combinations of a small vocabulary
+with
+  adjectives as (select unnest(array[
+    'Roasted', 'Smoky', 'Crispy', 'Creamy', 'Spicy', 'Lemony', 'Garlicky', 'Herbed',
+    'Braised', 'Grilled', 'Maple', 'Brown Butter', 'Honey', 'Balsamic', 'Rustic', 'Classic'
+  ]) as word),
+  mains as (select unnest(array[
+    'Chicken', 'Turkey', 'Salmon', 'Pork Loin', 'Short Ribs', 'Brussels Sprouts', 'Sweet Potatoes',
+    'Green Beans', 'Mushrooms', 'Carrots', 'Squash', 'Cauliflower', 'Lamb', 'Tofu', 'Potatoes',
+    'Cornbread', 'Stuffing', 'Apple Pie', 'Pumpkin Pie', 'Cheesecake', 'Risotto', 'Lasagna'
+  ]) as word),
+  seeded as (
+    select
+      n,
+      (select word from adjectives offset (n % 16) limit 1) as adjective,
+      (select word from mains offset ((n / 16) % 22) limit 1) as main
+    from generate_series(1, 50000) as n
+  )
+insert into public.recipe_library (
+  title, category, base_headcount, method, normalized, description, tags, created_at
+)
+select
+  adjective || ' ' || main || ' #' || n,
+  (array['main', 'side', 'dessert', 'app', 'other'])[1 + n % 5],
+  4 + n % 8,
+  (array['oven', 'stovetop', 'no_cook', 'mixed'])[1 + n % 4],
+  jsonb_build_object(
+    'title', adjective || ' ' || main,
+    'headcount', 4,
+    'ingredients', jsonb_build_array(
+      jsonb_build_object('name', lower(main), 'quantity', 1, 'unit', 'lb'),
+      jsonb_build_object('name', (array['garlic', 'butter', 'thyme', 'rosemary', 'sage', 'paprika'])[1 + n % 6]),
+      jsonb_build_object('name', (array['olive oil', 'salt', 'pepper', 'lemon', 'cream'])[1 + n % 5])
+    ),
+    'tasks', '[]'::jsonb
+  ),
+  'A ' || lower(adjective) || ' take on ' || lower(main) || ' for a crowd.',
+  array[(array['easy', 'make-ahead', 'vegetarian', 'holiday', 'weeknight'])[1 + n % 5]],
+  now() - (n || ' minutes')::interval
+from seeded;
+
+analyze public.recipe_library;
+
+-- Before: substring match on title/description (what the API used to send)
+explain (analyze, buffers)
+select id, title, created_at
+from public.recipe_library
+where title ilike '%garlic%' or description ilike '%garlic%'
+order by created_at desc
+limit 21;
+
+-- After: ranked, prefix-matching full-text search
+explain (analyze, buffers)
+select id, title, created_at, rank
+from public.search_recipe_library('garlic:*')
+limit 21;
+
+-- Multi-term prefix query as typed into the search box
+explain (analyze, buffers)
+select id, title, created_at, rank
+from public.search_recipe_library('smok:* & chick:*')
+limit 21;
+
+-- Selective term within one category, second page
+explain (analyze, buffers)
+with first_page as (
+  select rank, created_at, id
+  from public.search_recipe_library('rosemary:* & lamb:*', 'main')
+  limit 20
+)
+select s.id, s.title, s.rank
+from (select * from first_page order by rank, created_at, id limit 1) last_row,
+  public.search_recipe_library(
+    'rosemary:* & lamb:*', 'main', last_row.rank, last_row.created_at, last_row.id
+  ) s
+limit 21;
+
+rollback;
@@ -0,0 +1,21 @@
+-- Migration: Add composite indexes for keyset (cursor) pagination
+-- Run this in Supabase SQL Editor
+
+-- List endpoints page on (created_at desc, id desc) and fetch the next page
+-- with "where (created_at, id) < (cursor)". These indexes let Postgres seek
+-- straight to the cursor, so page 500 costs the same as page 1.
+
+-- GET /recipes: per-user, newest first
+create index if not exists idx_recipes_user_keyset
+on public.recipes(user_id, created_at desc, id desc);
+
+-- GET /events: per-user, newest first
+create index if not exists idx_events_user_keyset
+on public.events(user_id, created_at desc, id desc);
+
+-- GET /recipes/library: all recipes, or one category, newest first
+create index if not exists idx_recipe_library_keyset
+on public.recipe_library(created_at desc, id desc);
+
+create index if not exists idx_recipe_library_category_keyset
+on public.recipe_library(category, created_at desc, id desc);
@@ -0,0 +1,116 @@
+-- Migration: Ranked full-text search for the recipe library
+-- Run this in Supabase SQL Editor
+
+-- Searchable document for a library recipe, weighted by field:
+--   A title, B tags, C ingredient names, D description
+create or replace function public.recipe_library_search_document(
+  doc_title text,
+  doc_description text,
+  doc_tags text[],
+  doc_normalized jsonb
+)
+returns tsvector
+language sql
+stable
+as $$
+  select
+    setweight(to_tsvector('english', coalesce(doc_title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(array_to_string(doc_tags, ' '), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+      select string_agg(ingredient->>'name', ' ')
+      from jsonb_array_elements(
+        case when jsonb_typeof(doc_normalized->'ingredients') = 'array'
+          then doc_normalized->'ingredients'
+          else '[]'::jsonb
+        end
+      ) as ingredient
+    ), '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(doc_description, '')), 'D')
+$$;
+
+-- Stored search vector, kept current by a trigger
+alter table public.recipe_library
+add column if not exists search_vector tsvector;
+
+create or replace function public.update_recipe_library_search_vector()
+returns trigger as $$
+begin
+  new.search_vector := public.recipe_library_search_document(
+    new.title, new.description, new.tags, new.normalized
+  );
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists update_recipe_library_search_vector on public.recipe_library;
+create trigger update_recipe_library_search_vector
+  before insert or update of title, description, tags, normalized on public.recipe_library
+  for each row execute procedure public.update_recipe_library_search_vector();
+
+-- Backfill existing rows without bumping updated_at
+alter table public.recipe_library disable trigger update_recipe_library_updated_at;
+update public.recipe_library
+set search_vector = public.recipe_library_search_document(title, description, tags, normalized);
+alter table public.recipe_library enable trigger update_recipe_library_updated_at;
+
+-- The old expression index was never used: the API searched with ILIKE
+drop index if exists public.idx_recipe_library_search;
+create index if not exists idx_recipe_library_search_vector
+on public.recipe_library using gin(search_vector);
+
+-- Ranked search, paged on (rank, created_at, id).
+-- search_query is a to_tsquery string built by the API from sanitized
+-- terms, e.g. 'chick:* & parm:*'. Pass the last row's rank, created_at and
+-- id to fetch the next page. Plain SQL so PostgREST's limit and
+-- column selection are inlined into the query.
+create or replace function public.search_recipe_library(
+  search_query text,
+  filter_category text default null,
+  after_rank real default null,
+  after_created_at timestamp with time zone default null,
+  after_id uuid default null
+)
+returns table (
+  id uuid,
+  title text,
+  category text,
+  base_headcount integer,
+  prep_time_minutes integer,
+  cook_time_minutes integer,
+  method text,
+  day_before_ok boolean,
+  source_type text,
+  source_raw jsonb,
+  normalized jsonb,
+  description text,
+  image_url text,
+  tags text[],
+  created_at timestamp with time zone,
+  updated_at timestamp with time zone,
+  rank real
+)
+language sql
+stable
+as $$
+  select *
+  from (
+    select
+      l.id, l.title, l.category, l.base_headcount, l.prep_time_minutes,
+      l.cook_time_minutes, l.method, l.day_before_ok, l.source_type,
+      l.source_raw, l.normalized, l.description, l.image_url, l.tags,
+      l.created_at, l.updated_at,
+      ts_rank(l.search_vector, q.query) as rank
+    from public.recipe_library l,
+      to_tsquery('english', search_query) as q(query)
+    where l.search_vector @@ q.query
+      and (filter_category is null or l.category = filter_category)
+  ) ranked
+  where after_id is null
+    or (ranked.rank, ranked.created_at, ranked.id) < (after_rank, after_created_at, after_id)
+  order by ranked.rank desc, ranked.created_at desc, ranked.id desc
+$$;
+
+grant execute on function public.search_recipe_library(text, text, real, timestamp with time zone, uuid)
+  to anon, authenticated, service_role;
+
+comment on column public.recipe_library.search_vector is 'Weighted tsvector of title (A), tags (B), ingredient names (C) and description (D)';
@@ -0,0 +1,133 @@
+-- Migration: Station-load summary columns for recipes and the recipe library
+-- Run this in Supabase SQL Editor, then fill existing rows with:
+--   python -m apps.api.services.station_load backfill
+
+-- Derived from normalized->tasks by apps/api/services/station_load.py and
+-- written by the API alongside normalized. Menu planning and filtering read
+-- these instead of deserializing normalized.
+alter table public.recipes
+  add column if not exists station_minutes jsonb,
+  add column if not exists oven_minutes integer,
+  add column if not exists stove_minutes integer,
+  add column if not exists hands_on_minutes integer,
+  add column if not exists critical_path_minutes integer,
+  add column if not exists peak_concurrency integer,
+  add column if not exists task_count integer,
+  add column if not exists ingredient_grams real;
+
+alter table public.recipe_library
+  add column if not exists station_minutes jsonb,
+  add column if not exists oven_minutes integer,
+  add column if not exists stove_minutes integer,
+  add column if not exists hands_on_minutes integer,
+  add column if not exists critical_path_minutes integer,
+  add column if not exists peak_concurrency integer,
+  add column if not exists task_count integer,
+  add column if not exists ingredient_grams real;
+
+comment on column public.recipe_library.station_minutes is 'Task minutes per station, e.g. {"oven": 60, "prep": 20}';
+comment on column public.recipe_library.hands_on_minutes is 'prep + counter minutes';
+comment on column public.recipe_library.critical_path_minutes is 'Longest chain of dependent tasks; null until summarised';
+comment on column public.recipe_library.peak_concurrency is 'Most tasks running at once when each starts as early as its dependencies allow';
+comment on column public.recipe_library.ingredient_grams is 'Total normalized_grams at base_headcount';
+
+-- Menu builder: candidates per course that fit the cooking window
+create index if not exists idx_recipe_library_category_critical_path
+on public.recipe_library(category, critical_path_minutes);
+
+-- Backfill: rows still waiting for a summary
+create index if not exists idx_recipes_missing_summary
+on public.recipes(id) where critical_path_minutes is null;
+
+create index if not exists idx_recipe_library_missing_summary
+on public.recipe_library(id) where critical_path_minutes is null;
+
+-- Library rows are edited directly in SQL. If normalized changes and the
+-- summary does not, the summary is stale: clear it so the backfill redoes it.
+create or replace function public.clear_recipe_library_load_summary()
+returns trigger as $$
+begin
+  if new.normalized is distinct from old.normalized
+    and new.critical_path_minutes is not distinct from old.critical_path_minutes
+    and new.station_minutes is not distinct from old.station_minutes then
+    new.station_minutes := null;
+    new.oven_minutes := null;
+    new.stove_minutes := null;
+    new.hands_on_minutes := null;
+    new.critical_path_minutes := null;
+    new.peak_concurrency := null;
+    new.task_count := null;
+    new.ingredient_grams := null;
+  end if;
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists recipe_library_clear_load_summary on public.recipe_library;
+create trigger recipe_library_clear_load_summary
+before update on public.recipe_library
+for each row execute procedure public.clear_recipe_library_load_summary();
+
+-- Ranked search returns the summary columns too (the return type changes,
+-- so the function is dropped first)
+drop function if exists public.search_recipe_library(text, text, real, timestamp with time zone, uuid);
+
+create function public.search_recipe_library(
+  search_query text,
+  filter_category text default null,
+  after_rank real default null,
+  after_created_at timestamp with time zone default null,
+  after_id uuid default null
+)
+returns table (
+  id uuid,
+  title text,
+  category text,
+  base_headcount integer,
+  prep_time_minutes integer,
+  cook_time_minutes integer,
+  method text,
+  day_before_ok boolean,
+  source_type text,
+  source_raw jsonb,
+  normalized jsonb,
+  description text,
+  image_url text,
+  tags text[],
+  station_minutes jsonb,
+  oven_minutes integer,
+  stove_minutes integer,
+  hands_on_minutes integer,
+  critical_path_minutes integer,
+  peak_concurrency integer,
+  task_count integer,
+  ingredient_grams real,
+  created_at timestamp with time zone,
+  updated_at timestamp with time zone,
+  rank real
+)
+language sql
+stable
+as $$
+  select *
+  from (
+    select
+      l.id, l.title, l.category, l.base_headcount, l.prep_time_minutes,
+      l.cook_time_minutes, l.method, l.day_before_ok, l.source_type,
+      l.source_raw, l.normalized, l.description, l.image_url, l.tags,
+      l.station_minutes, l.oven_minutes, l.stove_minutes, l.hands_on_minutes,
+      l.critical_path_minutes, l.peak_concurrency, l.task_count, l.ingredient_grams,
+      l.created_at, l.updated_at,
+      ts_rank(l.search_vector, q.query) as rank
+    from public.recipe_library l,
+      to_tsquery('english', search_query) as q(query)
+    where l.search_vector @@ q.query
+      and (filter_category is null or l.category = filter_category)
+  ) ranked
+  where after_id is null
+    or (ranked.rank, ranked.created_at, ranked.id) < (after_rank, after_created_at, after_id)
+  order by ranked.rank desc, ranked.created_at desc, ranked.id desc
+$$;
+
+grant execute on function public.search_recipe_library(text, text, real, timestamp with time zone, uuid)
+  to anon, authenticated, service_role;
@@ -0,0 +1,57 @@
+import time
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from apps.api import dependencies
+from apps.api.dependencies import get_settings
+from apps.api.middleware.rate_limit_stores import get_rate_limit_store
+from apps.api.repositories import get_repositories
+from apps.api.services.library_index import get_library_index
+
+JWT_SECRET = "test-jwt-secret-for-local-api-tests"
+
+
+def make_token(user_id: str, expires_in: int = 3600) -> str:
+    """Create a Supabase-style access token for user_id."""
+    return jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + expires_in},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+@pytest.fixture
+def repos(monkeypatch):
+    """Repositories on a fresh in-memory backend."""
+    monkeypatch.setenv("DATA_BACKEND", "memory")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", JWT_SECRET)
+    get_settings.cache_clear()
+    get_repositories.cache_clear()
+    get_library_index.cache_clear()
+    get_rate_limit_store.cache_clear()
+    dependencies._verified_tokens.clear()
+    yield get_repositories()
+    get_settings.cache_clear()
+    get_repositories.cache_clear()
+    get_library_index.cache_clear()
+    get_rate_limit_store.cache_clear()
+    dependencies._verified_tokens.clear()
+
+
+@pytest.fixture
+def client(repos):
+    from apps.api.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(repos):
+    """Create a profile and return Authorization headers for it."""
+    import asyncio
+
+    profile = asyncio.run(repos.profiles.create({"email": "host@example.com", "burner_count": 4}))
+    return {"Authorization": f"Bearer {make_token(profile['id'])}"}
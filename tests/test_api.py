@@ -0,0 +1,247 @@
+"""End-to-end API tests against the in-memory backend."""
+from .conftest import make_token
+
+RECIPE = {
+    "title": "Roast Chicken",
+    "category": "main",
+    "base_headcount": 4,
+    "method": "oven",
+    "source_type": "text",
+    "source_raw": {"text": "Roast a chicken"},
+    "normalized": {
+        "id": "recipe-1",
+        "title": "Roast Chicken",
+        "headcount": 4,
+        "ingredients": [{"name": "chicken", "quantity": 1.0, "unit": "whole"}],
+        "tasks": [
+            {"id": "task-1", "label": "Season chicken", "duration_minutes": 10, "station": "prep"},
+            {"id": "task-2", "label": "Roast chicken", "duration_minutes": 60, "station": "oven",
+             "depends_on": ["task-1"]},
+        ],
+    },
+}
+
+
+def _create_event_with_recipe(client, auth_headers):
+    recipe = client.post("/recipes", json=RECIPE, headers=auth_headers).json()
+    event = client.post(
+        "/events",
+        json={"name": "Sunday Dinner", "event_type": "event", "event_date": "2024-06-01T18:00:00+00:00"},
+        headers=auth_headers,
+    ).json()
+    attach = client.post(
+        f"/events/{event['id']}/recipes",
+        json={"recipe_id": recipe["id"], "target_headcount": 8},
+        headers=auth_headers,
+    )
+    assert attach.status_code == 200
+    return recipe, event
+
+
+def test_recipe_crud(client, auth_headers):
+    created = client.post("/recipes", json=RECIPE, headers=auth_headers)
+    assert created.status_code == 201
+    recipe_id = created.json()["id"]
+    # Stored columns the response model does not declare stay out
+    assert "oven_minutes" not in created.json()
+
+    listed = client.get("/recipes", headers=auth_headers)
+    assert [r["id"] for r in listed.json()] == [recipe_id]
+
+    updated = client.put(f"/recipes/{recipe_id}", json={"title": "Lemon Chicken"}, headers=auth_headers)
+    assert updated.json()["title"] == "Lemon Chicken"
+
+    assert client.delete(f"/recipes/{recipe_id}", headers=auth_headers).status_code == 204
+    assert client.get(f"/recipes/{recipe_id}", headers=auth_headers).status_code == 404
+
+
+def test_requires_auth(client):
+    assert client.get("/recipes").status_code == 401
+    expired = {"Authorization": f"Bearer {make_token('user-1', expires_in=-60)}"}
+    assert client.get("/recipes", headers=expired).status_code == 401
+
+
+def test_tokens_are_verified_once_and_limited_per_user(client, monkeypatch):
+    from apps.api import dependencies
+
+    decoded = []
+    decode = dependencies.jwt.decode
+    monkeypatch.setattr(dependencies.jwt, "decode", lambda *a, **kw: decoded.append(a[0]) or decode(*a, **kw))
+
+    first = {"Authorization": f"Bearer {make_token('user-1')}"}
+    second = {"Authorization": f"Bearer {make_token('user-2')}"}
+    for _ in range(10):
+        assert client.post("/events/missing/plan", headers=first).status_code == 404
+    limited = client.post("/events/missing/plan", headers={**first, "Origin": "http://localhost:3000"})
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == str(limited.json()["retry_after"])
+    assert limited.headers["access-control-allow-origin"] == "http://localhost:3000"
+    # Tokens share their header prefix, but each user has a budget of its own
+    assert client.post("/events/missing/plan", headers=second).status_code == 404
+    assert len(decoded) == 2
+
+
+def test_event_plan_and_share(client, repos, auth_headers):
+    import asyncio
+
+    recipe, event = _create_event_with_recipe(client, auth_headers)
+
+    detail = client.get(f"/events/{event['id']}", headers=auth_headers).json()
+    assert detail["recipes"][0]["recipe_title"] == "Roast Chicken"
+
+    # Rows stored with a schema_version stamp by earlier versions do not return it
+    stored = asyncio.run(repos.recipes.get(recipe["id"], recipe["user_id"]))
+    asyncio.run(repos.recipes.update(recipe["id"], recipe["user_id"], {
+        "normalized": {**stored["normalized"], "schema_version": 1},
+    }))
+    fetched = client.get(f"/recipes/{recipe['id']}?expand=normalized", headers=auth_headers).json()
+    assert fetched["normalized"] == RECIPE["normalized"]
+
+    plan = client.post(f"/events/{event['id']}/plan", headers=auth_headers)
+    assert plan.status_code == 200
+    stations = {lane["station"] for lane in plan.json()["lanes"]}
+    assert stations == {"oven", "prep"}
+    # Serialized straight from the Schedule model
+    assert set(plan.json()) == {"serve_time", "lanes", "notes", "warnings"}
+    assert plan.json()["lanes"][0]["tasks"][0]["station"] == plan.json()["lanes"][0]["station"]
+
+    token = client.post(f"/events/{event['id']}/share", headers=auth_headers).json()["public_token"]
+    public = client.get(f"/events/public/{token}")
+    assert public.status_code == 200
+    assert public.json()["recipes"][0]["target_headcount"] == 8
+
+
+def test_profile(client, auth_headers):
+    profile = client.put("/users/me", json={"oven_capacity_lbs": 20}, headers=auth_headers)
+    assert profile.status_code == 200
+    assert profile.json()["oven_capacity_lbs"] == 20
+    assert profile.json()["burner_count"] == 4
+
+
+def test_recipe_list_is_lean_unless_expanded(client, auth_headers):
+    client.post("/recipes", json=RECIPE, headers=auth_headers)
+
+    lean = client.get("/recipes", headers=auth_headers).json()[0]
+    assert lean["title"] == "Roast Chicken"
+    assert lean["normalized"] is None and lean["source_raw"] is None
+
+    expanded = client.get("/recipes?expand=normalized", headers=auth_headers).json()[0]
+    assert expanded["normalized"]["tasks"][0]["id"] == "task-1"
+    assert expanded["source_raw"] is None
+
+    assert client.get("/recipes?expand=secrets", headers=auth_headers).status_code == 400
+
+
+def test_recipe_list_pages_by_cursor(client, auth_headers):
+    for i in range(3):
+        client.post("/recipes", json={**RECIPE, "title": f"Recipe {i}"}, headers=auth_headers)
+
+    first = client.get("/recipes?limit=2&include_total=true", headers=auth_headers)
+    assert [r["title"] for r in first.json()] == ["Recipe 2", "Recipe 1"]
+    assert first.headers["X-Total-Count"] == "3"
+
+    cursor = first.headers["X-Next-Cursor"]
+    last = client.get(f"/recipes?limit=2&cursor={cursor}", headers=auth_headers)
+    assert [r["title"] for r in last.json()] == ["Recipe 0"]
+    assert "X-Next-Cursor" not in last.headers
+
+    assert client.get("/recipes?cursor=not-a-cursor", headers=auth_headers).status_code == 400
+
+
+def test_library_list_and_facets_from_index(client, repos):
+    import asyncio
+
+    for title, category in (("Lemon Bars", "dessert"), ("Lemon Chicken", "main"), ("Green Salad", "side")):
+        asyncio.run(repos.recipe_library.create({
+            "title": title, "category": category, "method": "oven", "normalized": RECIPE["normalized"],
+        }))
+
+    listing = client.get("/recipes/library?search=lemon&include_total=true").json()
+    assert [r["title"] for r in listing["recipes"]] == ["Lemon Chicken", "Lemon Bars"]
+    assert listing["total"] == 2
+    assert listing["recipes"][0]["normalized"] is None
+
+    facets = client.get("/recipes/library/facets?search=lemon").json()
+    assert facets["category"] == [{"value": "dessert", "count": 1}, {"value": "main", "count": 1}]
+    assert facets["day_before_ok"] == [{"value": False, "count": 2}]
+
+
+def test_library_search_is_the_same_through_index_and_database(client, repos):
+    import asyncio
+
+    from apps.api.services.library_index import get_library_index
+
+    for title, description in (("Lemon Bars", None), ("Roast Chicken", "Finished with lemon"), ("Green Salad", None)):
+        asyncio.run(repos.recipe_library.create({
+            "title": title, "category": "main", "method": "oven",
+            "description": description, "normalized": RECIPE["normalized"],
+        }))
+
+    def search(query):
+        response = client.get(f"/recipes/library?search=lemon{query}")
+        assert response.status_code == 200
+        return response.json()
+
+    indexed = search("")
+    expanded = search("&expand=normalized")
+    assert [r["title"] for r in indexed["recipes"]] == ["Lemon Bars", "Roast Chicken"]
+    assert [r["id"] for r in expanded["recipes"]] == [r["id"] for r in indexed["recipes"]]
+    assert expanded["recipes"][0]["normalized"]["title"] == "Roast Chicken"
+    index_cursor = search("&limit=1")["next_cursor"]
+
+    # The index becomes unavailable: the database matches the same recipes,
+    # but a cursor ranked by the index cannot continue there
+    get_library_index().available = False
+    from_database = search("&expand=normalized")
+    assert {r["id"] for r in from_database["recipes"]} == {r["id"] for r in indexed["recipes"]}
+    assert client.get(f"/recipes/library?search=lemon&cursor={index_cursor}").status_code == 400
+    database_cursor = search("&limit=1")["next_cursor"]
+    assert len(search(f"&limit=1&cursor={database_cursor}")["recipes"]) == 1
+
+
+def test_public_endpoints_revalidate_with_etags(client, repos, auth_headers):
+    import asyncio
+
+    recipe = asyncio.run(repos.recipe_library.create({
+        "title": "Lemon Bars", "category": "dessert", "method": "oven", "normalized": RECIPE["normalized"],
+    }))
+    first = client.get(f"/recipes/library/{recipe['id']}")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"].startswith("public, max-age=")
+    assert "Last-Modified" in first.headers
+
+    etag = first.headers["ETag"]
+    revalidated = client.get(f"/recipes/library/{recipe['id']}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+
+    repos.recipe_library.table.update(recipe["id"], {"title": "Lemon Squares"})
+    assert client.get(f"/recipes/library/{recipe['id']}", headers={"If-None-Match": etag}).status_code == 200
+
+    _, event = _create_event_with_recipe(client, auth_headers)
+    token = client.post(f"/events/{event['id']}/share", headers=auth_headers).json()["public_token"]
+    shared = client.get(f"/events/public/{token}")
+    assert shared.json()["name"] == "Sunday Dinner"
+    assert client.get(f"/events/public/{token}", headers={"If-None-Match": shared.headers["ETag"]}).status_code == 304
+
+
+def test_recipe_list_streams_ndjson_in_batches(client, auth_headers, monkeypatch):
+    import json
+
+    from apps.api.routers import recipes as recipes_router
+
+    monkeypatch.setattr(recipes_router, "STREAM_BATCH_SIZE", 2)
+    for i in range(5):
+        client.post("/recipes", json={**RECIPE, "title": f"Recipe {i}"}, headers=auth_headers)
+
+    streamed = client.get("/recipes?stream=true&include_total=true&expand=normalized", headers=auth_headers)
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    assert streamed.headers["X-Total-Count"] == "5"
+    rows = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [r["title"] for r in rows] == [f"Recipe {i}" for i in range(4, -1, -1)]
+    assert rows[0]["normalized"]["tasks"][0]["id"] == "task-1"
+
+    # Streams resume after a cursor like pages do
+    cursor = client.get("/recipes?limit=2", headers=auth_headers).headers["X-Next-Cursor"]
+    rest = client.get(f"/recipes?stream=true&cursor={cursor}", headers=auth_headers)
+    assert [json.loads(line)["title"] for line in rest.text.splitlines()] == ["Recipe 2", "Recipe 1", "Recipe 0"]
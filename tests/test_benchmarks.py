@@ -0,0 +1,44 @@
+import random
+
+from apps.api.services.parsing import parse_text_recipe
+from apps.api.services.scheduler import build_schedule
+from benchmarks.pipeline import compare
+from benchmarks.synthetic import SERVE_TIME, STATION_WEIGHTS, make_recipe_text, make_recipes
+
+
+def test_synthetic_inputs_have_the_requested_size():
+    rng = random.Random(7)
+    parsed = parse_text_recipe(None, 4, make_recipe_text(rng, 300))
+    assert len(parsed.tasks) == 300
+    # Step wording lands on every station
+    assert {task.station for task in parsed.tasks} == set(STATION_WEIGHTS)
+
+    recipes = make_recipes(rng, 1000)
+    tasks = [task for recipe in recipes for task in recipe.tasks]
+    assert len(tasks) == 1000
+    # Dependencies only point back to earlier tasks of the same recipe
+    for recipe in recipes:
+        seen = set()
+        for task in recipe.tasks:
+            assert set(task.depends_on) <= seen
+            seen.add(task.id)
+    assert sum(len(lane.tasks) for lane in build_schedule(recipes, SERVE_TIME).lanes) == 1000
+
+    assert make_recipe_text(random.Random(1), 50) == make_recipe_text(random.Random(1), 50)
+
+
+def test_compare_flags_slowdowns_beyond_threshold_and_noise_floor():
+    def results(**cases):
+        return {"commit": "x", "results": {
+            key: {"min_seconds": seconds, "peak_bytes": peak} for key, (seconds, peak) in cases.items()
+        }}
+
+    base = results(**{"a/10": (0.010, 1_000_000), "b/10": (0.00001, 1000), "c/10": (0.010, 1_000_000)})
+    head = results(**{
+        "a/10": (0.013, 1_000_000),  # 30% slower
+        "b/10": (0.00002, 2000),  # twice as slow and as large, but under the noise floors
+        "c/10": (0.0105, 1_500_000),  # 5% slower, 50% more memory
+        "d/10": (1.0, 1),  # not in the base
+    })
+    regressions = compare(base, head, threshold=0.15)
+    assert [line.split()[:2] for line in regressions] == [["a/10", "time"], ["c/10", "memory"]]
@@ -0,0 +1,42 @@
+import json
+
+from apps.api.middleware.compression import negotiate_encoding
+
+from .test_api import RECIPE
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert negotiate_encoding("gzip, deflate, br", ("gzip",)) == "gzip"
+    assert negotiate_encoding("br;q=0.5, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("*", ("br", "gzip")) == "br"
+    assert negotiate_encoding("gzip;q=0, *;q=0.1", ("gzip",)) is None
+    assert negotiate_encoding("identity", ("br", "gzip")) is None
+    assert negotiate_encoding("", ("br", "gzip")) is None
+
+
+def test_large_responses_are_compressed(client, auth_headers):
+    for i in range(10):
+        client.post("/recipes", json={**RECIPE, "title": f"Recipe {i}"}, headers=auth_headers)
+
+    gzip_headers = {**auth_headers, "Accept-Encoding": "gzip"}
+    listed = client.get("/recipes?expand=normalized", headers=gzip_headers)
+    assert listed.headers["Content-Encoding"] == "gzip"
+    assert listed.headers["Vary"] == "Accept-Encoding"
+    assert int(listed.headers["Content-Length"]) < len(listed.content)
+    assert len(listed.json()) == 10
+
+    plain = client.get("/recipes?expand=normalized", headers={**auth_headers, "Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.json() == listed.json()
+
+    # Streams are compressed chunk by chunk
+    streamed = client.get("/recipes?stream=true", headers=gzip_headers)
+    assert streamed.headers["Content-Encoding"] == "gzip"
+    assert len([json.loads(line) for line in streamed.text.splitlines()]) == 10
+
+
+def test_small_responses_are_not_compressed(client):
+    health = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in health.headers
+    assert "Vary" not in health.headers
@@ -0,0 +1,94 @@
+import asyncio
+
+from apps.api.lib.pagination import decode_cursor
+from apps.api.repositories.memory import create_memory_repositories
+from apps.api.services.library_index import LibraryIndex
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _library_recipe(title: str, category: str, method: str, *ingredients: str, **extra) -> dict:
+    return {
+        "title": title,
+        "category": category,
+        "method": method,
+        "normalized": {
+            "title": title,
+            "headcount": 4,
+            "ingredients": [{"name": name, "quantity": 1, "unit": "cup"} for name in ingredients],
+            "tasks": [],
+        },
+        **extra,
+    }
+
+
+def _seeded():
+    repos = create_memory_repositories()
+    run(repos.recipe_library.create(_library_recipe("Lemon Bars", "dessert", "oven", "lemon", "butter")))
+    run(repos.recipe_library.create(_library_recipe("Roast Chicken", "main", "oven", "chicken", "lemon")))
+    run(repos.recipe_library.create(_library_recipe(
+        "Green Salad", "side", "no_cook", "lettuce", tags=["vegetarian"], day_before_ok=True,
+    )))
+    index = LibraryIndex()
+    assert run(index.ensure_ready(repos))
+    return repos, index
+
+
+def test_index_search_matches_repository_order():
+    repos, index = _seeded()
+
+    for search in (None, "lem", "chick lemon", "veg"):
+        expected = run(repos.recipe_library.list(None, search, limit=10, columns="id, title"))
+        actual = index.search(None, search, limit=10, columns="id, title")
+        assert [r["title"] for r in actual.rows] == [r["title"] for r in expected.rows]
+
+    page = index.search(None, "lemon", limit=1, columns="id, title, created_at", with_total=True)
+    assert page.total == 2
+    rest = index.search(None, "lemon", limit=1, after=decode_cursor(page.next_cursor), columns="id, title")
+    assert [r["title"] for r in page.rows + rest.rows] == ["Lemon Bars", "Roast Chicken"]
+
+    assert [r["title"] for r in index.search("main", None, limit=10, columns="title").rows] == ["Roast Chicken"]
+    assert "normalized" not in index.search(None, None, limit=1).rows[0]
+
+    # No stemming: a prefix finds longer forms but a plural misses the singular
+    assert [r["title"] for r in index.search(None, "chick", limit=10, columns="title").rows] == ["Roast Chicken"]
+    assert index.search(None, "chickens", limit=10).rows == []
+
+
+def test_index_facets_skip_their_own_filter():
+    _, index = _seeded()
+
+    facets = index.facets()
+    assert facets["method"] == [("oven", 2), ("no_cook", 1)]
+    assert facets["day_before_ok"] == [(False, 2), (True, 1)]
+
+    facets = index.facets(search="lemon", category="main")
+    assert facets["category"] == [("dessert", 1), ("main", 1)]
+    assert facets["method"] == [("oven", 1)]
+
+
+def test_index_refresh_applies_changes_past_watermark():
+    repos, index = _seeded()
+    salad = index.search(None, "salad", limit=1).rows[0]
+
+    run(repos.recipe_library.create(_library_recipe("Lemon Tart", "dessert", "oven", "lemon")))
+    assert [r["title"] for r in index.search(None, "tart", limit=10).rows] == []
+
+    # Only the new recipe is past the watermark
+    assert run(index.refresh(repos)) == 1
+    assert [r["title"] for r in index.search(None, "tart", limit=10).rows] == ["Lemon Tart"]
+
+    repos.recipe_library.table.update(salad["id"], {"title": "Garden Salad"})
+    assert run(index.refresh(repos)) == 1
+    assert [r["title"] for r in index.search(None, "garden", limit=10).rows] == ["Garden Salad"]
+    assert index.search(None, "green", limit=10).rows == []
+    assert index.size == 4
+
+
+def test_index_disables_itself_past_max_documents():
+    repos, _ = _seeded()
+    index = LibraryIndex(max_documents=2)
+    assert not run(index.ensure_ready(repos))
+    assert not index.available
@@ -0,0 +1,69 @@
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from apps.api.dependencies import get_settings
+from apps.api.lib.log_pipeline import JsonFormatter, configure_logging, stop_logging
+
+from .test_api import _create_event_with_recipe
+
+
+@pytest.fixture
+def log_output(client):
+    """Route logging to a buffer for the test; stop_logging() writes out what is queued."""
+    output = io.StringIO()
+    configure_logging(get_settings(), output)
+    yield output
+    configure_logging(get_settings())
+
+
+def _records(output: io.StringIO) -> list[dict]:
+    stop_logging()
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_json_formatter_keeps_extra_fields():
+    logger = logging.getLogger("tests.logging")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logger.makeRecord(
+            logger.name, logging.ERROR, __file__, 1, "Failed for %s", ("event-1",),
+            exc_info=sys.exc_info(), extra={"event_id": "event-1", "attempt": 2},
+        )
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Failed for event-1"
+    assert entry["level"] == "ERROR"
+    assert entry["event_id"] == "event-1" and entry["attempt"] == 2
+    assert "ValueError: boom" in entry["exc_info"]
+
+
+def test_plan_logs_once_with_route(client, auth_headers, log_output):
+    _, event = _create_event_with_recipe(client, auth_headers)
+    assert client.post(f"/events/{event['id']}/plan", headers=auth_headers).status_code == 200
+
+    [record] = [r for r in _records(log_output) if r["logger"] == "apps.api.routers.events"]
+    assert record["message"] == f"Schedule generated for event {event['id']}"
+    assert record["route"] == "/events/{event_id}/plan" and record["method"] == "POST"
+    assert record["event_id"] == event["id"] and record["task_count"] > 0
+
+
+@pytest.fixture
+def plan_logs_unsampled(monkeypatch):
+    """Keep no info logs of plan requests, and allow one plan a minute (set before the app starts)."""
+    monkeypatch.setenv("LOG_SAMPLE_RATES", '{"POST /events/{event_id}/plan": 0}')
+    monkeypatch.setenv("RATE_LIMIT_BUDGETS", '{"plan": [1, 60]}')
+
+
+def test_sampled_route_drops_info_but_keeps_warnings(plan_logs_unsampled, client, auth_headers, log_output):
+    _, event = _create_event_with_recipe(client, auth_headers)
+    assert client.post(f"/events/{event['id']}/plan", headers=auth_headers).status_code == 200
+    assert client.post(f"/events/{event['id']}/plan", headers=auth_headers).status_code == 429
+
+    records = _records(log_output)
+    assert not [r for r in records if r["logger"] == "apps.api.routers.events"]
+    [warning] = [r for r in records if r["logger"] == "apps.api.middleware.rate_limit"]
+    assert warning["level"] == "WARNING" and warning["method"] == "POST"
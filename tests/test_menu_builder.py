@@ -0,0 +1,170 @@
+import asyncio
+
+from apps.api.repositories import get_repositories
+from apps.api.services.menu_builder import Candidate, build_menus
+from apps.api.services.station_load import KitchenLimits, backfill, menu_load, summarize
+
+
+def _normalized(*tasks, grams: float = 0.0, headcount: int = 4) -> dict:
+    return {
+        "title": "Recipe",
+        "headcount": headcount,
+        "ingredients": [{"name": "food", "normalized_grams": grams}] if grams else [],
+        "tasks": [
+            {"id": task_id, "label": task_id, "station": station, "duration_minutes": minutes, "depends_on": deps}
+            for task_id, station, minutes, deps in tasks
+        ],
+    }
+
+
+def _candidate(recipe_id: str, *tasks, grams: float = 0.0) -> Candidate:
+    return Candidate({"id": recipe_id}, summarize(_normalized(*tasks, grams=grams)))
+
+
+def test_summarize_walks_dependencies():
+    load = summarize(_normalized(
+        ("chop", "prep", 15, []),
+        ("sear", "stove", 10, ["chop"]),
+        ("roast", "oven", 60, ["sear"]),
+        ("dressing", "prep", 5, []),
+        ("rest", "passive", 10, ["roast", "missing"]),
+    ), 4)
+    assert load.station_minutes == {"prep": 20, "stove": 10, "oven": 60, "passive": 10}
+    assert load.critical_path_minutes == 95
+    assert load.peak_concurrency == 2
+    assert load.task_count == 5
+
+    # Cycles are broken instead of recursing forever
+    cyclic = summarize(_normalized(("a", "prep", 5, ["b"]), ("b", "prep", 5, ["a"])))
+    assert cyclic.critical_path_minutes == 10
+
+    # Long chains listed last step first do not hit the recursion limit
+    chain = [(f"t{i}", "prep", 1, [f"t{i + 1}"] if i < 1999 else []) for i in range(2000)]
+    assert summarize(_normalized(*chain)).critical_path_minutes == 2000
+
+
+def test_oven_batches_follow_capacity_and_headcount():
+    roast = summarize(_normalized(("roast", "oven", 60, []), grams=2 * 453.592, headcount=4))
+    small_oven = KitchenLimits(window_minutes=240, headcount=8, oven_capacity_lbs=3)
+    # 4 lb of food at 8 guests needs two batches in a 3 lb oven
+    assert menu_load([roast], small_oven).oven_minutes == 120
+    assert menu_load([roast], small_oven._replace(headcount=4)).oven_minutes == 60
+    assert menu_load([roast, roast], small_oven).conflicts(small_oven) == []
+    tight = small_oven._replace(window_minutes=180)
+    assert "oven_overbooked" in menu_load([roast, roast], tight).conflicts(tight)
+
+
+def test_build_menus_prunes_menus_that_do_not_fit():
+    limits = KitchenLimits(window_minutes=120, headcount=4, burner_count=2)
+    candidates = {
+        "main": [
+            _candidate("roast", ("roast", "oven", 90, [])),
+            _candidate("stew", ("stew", "stove", 100, [])),
+        ],
+        "side": [
+            _candidate("gratin", ("bake", "oven", 45, [])),
+            _candidate("beans", ("boil", "stove", 20, [])),
+            _candidate("salad", ("chop", "prep", 15, [])),
+        ],
+    }
+
+    menus, evaluated = build_menus(candidates, {"main": 1, "side": 2}, limits, limit=10)
+    chosen = [[row["id"] for row in menu.recipes] for menu in menus]
+    # Roast and gratin together overbook the oven
+    assert all(not {"roast", "gratin"} <= set(ids) for ids in chosen)
+    assert ["stew", "beans", "salad"] in chosen or ["stew", "salad", "beans"] in chosen
+    assert all(not menu.load.conflicts(limits) for menu in menus)
+    spans = [menu.load.span_minutes(limits) for menu in menus]
+    assert spans == sorted(spans)
+    assert evaluated < 2 * 3 * 3
+
+    pinned = [_candidate("pie", ("bake", "oven", 60, []))]
+    menus, _ = build_menus(candidates, {"main": 1}, limits, pinned=pinned)
+    assert [[row["id"] for row in menu.recipes] for menu in menus] == [["pie", "stew"]]
+
+    # A menu with many tasks still fits; it only carries a warning
+    busy = _candidate("tapas", *[(f"t{i}", "prep", 1, []) for i in range(25)])
+    menus, _ = build_menus({"side": [busy]}, {"side": 1}, limits)
+    assert [menu.load.warnings() for menu in menus] == [["too_many_projects"]]
+
+
+def test_build_menu_endpoint(client, repos, auth_headers):
+    for title, category, task in (
+        ("Roast Chicken", "main", ("roast", "oven", 90, [])),
+        ("Braised Beef", "main", ("braise", "oven", 200, [])),
+        ("Green Salad", "side", ("chop", "prep", 15, [])),
+    ):
+        asyncio.run(repos.recipe_library.create({
+            "title": title, "category": category, "method": "oven", "normalized": _normalized(task),
+        }))
+
+    response = client.post("/menus/build", json={
+        "headcount": 8,
+        "serve_time": "2024-06-01T18:00:00+00:00",
+        "window_minutes": 180,
+        "courses": {"main": 1, "side": 1},
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    [menu] = response.json()["menus"]
+    assert [r["title"] for r in menu["recipes"]] == ["Roast Chicken", "Green Salad"]
+    assert menu["load"]["span_minutes"] == 105
+    assert menu["start_by"].startswith("2024-06-01T16:15")
+    assert menu["warnings"] == []
+
+    # Pinned recipes are fetched together, and must all exist
+    library = asyncio.run(repos.recipe_library.list("side", None, 10, columns="id, created_at")).rows
+    pinned = client.post("/menus/build", json={
+        "headcount": 8, "serve_time": "2024-06-01T18:00:00+00:00", "window_minutes": 180,
+        "courses": {"main": 1}, "include_ids": [library[0]["id"]],
+    }, headers=auth_headers).json()
+    assert [r["title"] for r in pinned["menus"][0]["recipes"]] == ["Green Salad", "Roast Chicken"]
+    assert client.post("/menus/build", json={
+        "headcount": 8, "serve_time": "2024-06-01T18:00:00+00:00", "include_ids": ["missing"],
+    }, headers=auth_headers).status_code == 404
+    assert client.post("/menus/build", json={
+        "headcount": 8, "serve_time": "2024-06-01T18:00:00+00:00", "include_ids": ["x"] * 9,
+    }, headers=auth_headers).status_code == 422
+
+    assert client.post("/menus/build", json={
+        "headcount": 8, "serve_time": "2024-06-01T18:00:00+00:00", "courses": {"soup": 1},
+    }, headers=auth_headers).status_code == 422
+
+
+def test_menu_candidates_are_the_quickest_recipes(client, repos, monkeypatch):
+    from apps.api.routers import menus
+    from apps.api.services.library_index import get_library_index
+
+    monkeypatch.setattr(menus, "MAX_CANDIDATES_PER_COURSE", 2)
+    for minutes in (90, 30, 60, 15):
+        asyncio.run(repos.recipe_library.create({
+            "title": f"Roast {minutes}", "category": "main", "method": "oven",
+            "normalized": _normalized(("roast", "oven", minutes, [])),
+        }))
+    asyncio.run(backfill(repos))
+
+    def quickest(search):
+        return [c.row["title"] for c in asyncio.run(menus._candidates("main", search, 240))]
+
+    assert quickest(None) == quickest("roast") == ["Roast 15", "Roast 30"]
+    # Without a search the database picks the same ones
+    get_library_index().available = False
+    assert quickest(None) == ["Roast 15", "Roast 30"]
+
+
+def test_recipe_writes_keep_load_summary_in_sync(client, auth_headers):
+    recipe = {
+        "title": "Roast", "category": "main", "base_headcount": 4, "method": "oven",
+        "normalized": _normalized(("prep", "prep", 20, []), ("roast", "oven", 60, ["prep"])),
+    }
+    created = client.post("/recipes", json=recipe, headers=auth_headers).json()
+
+    repos = get_repositories()
+    stored = asyncio.run(repos.recipes.get(created["id"], created["user_id"]))
+    assert (stored["oven_minutes"], stored["hands_on_minutes"], stored["critical_path_minutes"]) == (60, 20, 80)
+
+    client.put(f"/recipes/{created['id']}", json={
+        "normalized": _normalized(("roast", "oven", 45, [])),
+    }, headers=auth_headers)
+    stored = asyncio.run(repos.recipes.get(created["id"], created["user_id"]))
+    assert stored["station_minutes"] == {"oven": 45}
+    assert (stored["critical_path_minutes"], stored["task_count"]) == (45, 1)
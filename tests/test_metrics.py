@@ -0,0 +1,61 @@
+from apps.api.dependencies import get_settings
+from apps.api.lib.metrics import Histogram, reset_metrics, size_label
+
+from .test_api import _create_event_with_recipe
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/a")
+    assert list(histogram.render())[2:] == [
+        'test_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_seconds_bucket{route="/a",le="1"} 3',
+        'test_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_seconds_sum{route="/a"} 3.65',
+        'test_seconds_count{route="/a"} 4',
+    ]
+    assert size_label(10, (10, 100)) == "10"
+    assert size_label(11, (10, 100)) == "100"
+    assert size_label(1000, (10, 100)) == "+Inf"
+
+
+def test_metrics_endpoint_is_off_by_default_and_needs_its_token(client, monkeypatch):
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+    get_settings.cache_clear()
+    assert client.get("/metrics").status_code == 401
+    wrong = client.get("/metrics", headers={"Authorization": "Bearer guess"})
+    assert wrong.status_code == 401
+    assert wrong.headers["www-authenticate"] == "Bearer"
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+
+def test_metrics_endpoint(client, auth_headers, monkeypatch):
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    get_settings.cache_clear()
+    reset_metrics()
+    _, event = _create_event_with_recipe(client, auth_headers)
+    assert client.post(f"/events/{event['id']}/plan", headers=auth_headers).status_code == 200
+    parsed = client.post(
+        "/recipes/parse-text",
+        json={"base_headcount": 4, "raw_text": "Toast\nIngredients\n2 slices bread\nDirections\nToast the bread"},
+        headers=auth_headers,
+    )
+    assert parsed.status_code == 200
+    for _ in range(10):
+        client.post("/events/missing/plan", headers=auth_headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_requests_total{route="/events/{event_id}/plan",method="POST",status="200"} 1' in text
+    assert 'http_requests_total{route="/events/{event_id}/plan",method="POST",status="404"} 9' in text
+    assert 'http_request_duration_seconds_count{route="/events",method="POST"} 1' in text
+    assert 'schedule_build_duration_seconds_count{tasks="10"} 1' in text
+    assert 'recipe_parse_duration_seconds_count{chars="1000"} 1' in text
+    assert 'rate_limit_rejections_total{route="/events/{event_id}/plan",budget="plan"} 1' in text
+    assert 'cache_lookups_total{cache="verified_tokens",result="hit"}' in text
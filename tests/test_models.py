@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+from apps.api.models.recipes import Recipe, public_normalized
+
+NORMALIZED = {
+    "id": "r1",
+    "title": "Roast Chicken",
+    "headcount": "4",
+    "ingredients": [{"name": "chicken", "quantity": "1", "unit": "whole"}],
+    "tasks": [{"id": "t1", "label": "Roast", "duration_minutes": "60", "station": "oven"}],
+    "cuisine": "french",
+}
+
+
+def test_stored_blobs_with_a_schema_version_still_validate_and_hide_it():
+    stamped = {**NORMALIZED, "schema_version": 1}
+    assert Recipe.model_validate(stamped) == Recipe.model_validate(NORMALIZED)
+    assert public_normalized(stamped) == NORMALIZED
+    assert public_normalized(NORMALIZED) is NORMALIZED
+    assert public_normalized(None) is None
+
+    with pytest.raises(ValidationError):
+        Recipe.model_validate({**stamped, "tasks": [{"id": "t1"}]})
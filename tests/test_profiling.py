@@ -0,0 +1,70 @@
+import json
+import os
+import time
+
+import pytest
+
+from apps.api.dependencies import get_settings
+from apps.api.middleware.profiling import compile_profiled_routes
+
+PARSE_REQUEST = {"base_headcount": 4, "raw_text": "Toast\nIngredients\n2 slices bread\nDirections\nToast the bread"}
+
+
+def _wait_for_files(directory, count: int) -> list[str]:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        names = sorted(n for n in os.listdir(directory) if not n.endswith(".tmp")) if directory.exists() else []
+        if len(names) >= count:
+            return names
+        time.sleep(0.01)
+    raise AssertionError(f"expected {count} profiles in {directory}")
+
+
+def test_enabled_profiler_writes_speedscope_for_allowlisted_routes(client, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILER_ENABLED", "true")
+    monkeypatch.setenv("PROFILER_SAMPLE_RATE", "1")
+    monkeypatch.setenv("PROFILER_INTERVAL_SECONDS", "0.0005")
+    monkeypatch.setenv("PROFILER_DIR", str(tmp_path))
+    get_settings.cache_clear()
+
+    assert client.get("/health").status_code == 200
+    response = client.post("/recipes/parse-text", json=PARSE_REQUEST)
+    assert response.status_code == 200
+    # Only a token names the file
+    assert "x-profile-file" not in response.headers
+
+    [name] = _wait_for_files(tmp_path, 1)
+    assert name.endswith("POST__recipes_parse_text.speedscope.json")
+    profile = json.loads((tmp_path / name).read_text())
+    [sampled] = profile["profiles"]
+    assert sampled["type"] == "sampled"
+    assert len(sampled["samples"]) == len(sampled["weights"])
+    frames = len(profile["shared"]["frames"])
+    assert all(0 <= index < frames for sample in sampled["samples"] for index in sample)
+
+
+def test_token_forces_a_collapsed_profile(client, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILER_TOKEN", "profile-secret")
+    monkeypatch.setenv("PROFILER_FORMAT", "collapsed")
+    monkeypatch.setenv("PROFILER_DIR", str(tmp_path))
+    get_settings.cache_clear()
+
+    assert "x-profile-file" not in client.post("/recipes/parse-text", json=PARSE_REQUEST).headers
+    assert "x-profile-file" not in client.post(
+        "/recipes/parse-text", json=PARSE_REQUEST, headers={"X-Profile-Token": "wrong"}
+    ).headers
+
+    response = client.post("/recipes/parse-text", json=PARSE_REQUEST, headers={"X-Profile-Token": "profile-secret"})
+    assert response.status_code == 200
+    name = response.headers["x-profile-file"]
+    assert _wait_for_files(tmp_path, 1) == [name]
+    for line in (tmp_path / name).read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and stack
+
+
+def test_unknown_profiled_route_is_rejected():
+    from apps.api.main import app
+
+    with pytest.raises(ValueError, match="GET /nowhere"):
+        compile_profiled_routes(app.routes, ["POST /schedule/generate", "GET /nowhere"])
@@ -0,0 +1,206 @@
+import sqlite3
+import time
+
+import pytest
+
+from apps.api.dependencies import get_settings
+from apps.api.middleware import rate_limit, rate_limit_stores
+from apps.api.middleware.rate_limit import RatePolicy, check_rate_limit, clear_rate_limit, compile_policies
+from apps.api.middleware.rate_limit_stores import (
+    MemoryRateLimitStore,
+    RateLimitStore,
+    RateLimitStoreUnavailable,
+    RedisRateLimitStore,
+    SQLiteRateLimitStore,
+)
+
+RECIPES = RatePolicy("/recipes", "recipes", 20, 3600, 1)
+EVENTS = RatePolicy("/events", "events", 20, 3600, 1)
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path, monkeypatch):
+    """Each store backend in turn; Redis against fakeredis, a local stand-in."""
+    if request.param == "memory":
+        store = MemoryRateLimitStore()
+    elif request.param == "sqlite":
+        store = SQLiteRateLimitStore(str(tmp_path / "rate_limits.db"))
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        store = RedisRateLimitStore(fakeredis.FakeRedis())
+    monkeypatch.setattr(rate_limit, "get_rate_limit_store", lambda: store)
+    return store
+
+
+def test_limit_is_enforced_over_a_sliding_window(store):
+    """20 an hour on /recipes; the previous window counts in proportion to its overlap."""
+    for i in range(20):
+        assert check_rate_limit("user-1", RECIPES, now=1000.0 + i) == (True, 0)
+    allowed, retry_after = check_rate_limit("user-1", RECIPES, now=1020.0)
+    assert not allowed
+    assert retry_after == 3761  # The next window opens at 4600, then 1 of the 20 must slide out
+
+    # Other users and endpoints are counted separately
+    assert check_rate_limit("user-2", RECIPES, now=1020.0) == (True, 0)
+    assert check_rate_limit("user-1", EVENTS, now=1020.0) == (True, 0)
+
+    # A quarter into the next window, 15 of the previous 20 still count
+    for _ in range(5):
+        assert check_rate_limit("user-1", RECIPES, now=5500.0)[0]
+    allowed, retry_after = check_rate_limit("user-1", RECIPES, now=5500.0)
+    assert not allowed
+    assert retry_after == 181  # Another of the previous 20 slides out every 180 seconds
+
+    # Two windows later nothing counts
+    assert check_rate_limit("user-1", RECIPES, now=11800.0) == (True, 0)
+
+
+def test_memory_records_are_evicted():
+    store = MemoryRateLimitStore(max_keys=100)
+    for i in range(250):
+        store.hit(f"user-{i}", "recipes", 20, 3600, 1, now=1000.0)
+    assert len(store.records) == 100
+    assert ("user-249", "recipes") in store.records
+
+    # Idle records go once their windows have passed
+    for i in range(20):
+        store.hit(f"late-{i}", "recipes", 20, 3600, 1, now=9000.0)
+    assert len(store.records) == 100 - 20
+
+    store.clear("late-0")
+    assert ("late-0", "recipes") not in store.records
+
+
+def test_sqlite_store_is_shared_and_swept(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+    # Two workers on one host
+    first, second = SQLiteRateLimitStore(path, max_keys=5), SQLiteRateLimitStore(path, max_keys=5)
+    for i in range(10):
+        assert (first if i % 2 else second).hit("user-1", "plan", 10, 60, 1, now=1000.0) == 0
+    assert first.hit("user-1", "plan", 10, 60, 1, now=1000.0) > 0
+
+    for i in range(8):
+        second.hit(f"user-{i + 2}", "plan", 10, 60, 1, now=1100.0 + i)
+    second._sweep(now=1120.0)
+    users = [row[0] for row in second.conn.execute("select user_id from rate_limits order by expires_at")]
+    # user-1 expired; of the rest, those expiring soonest made way for max_keys
+    assert users == ["user-5", "user-6", "user-7", "user-8", "user-9"]
+
+
+def test_stores_must_implement_the_interface():
+    class Incomplete(RateLimitStore):
+        def hit(self, user_id, budget, limit, window, cost, now):
+            return 0
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_contended_sqlite_store_gives_up_quickly(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+    store = SQLiteRateLimitStore(path, busy_timeout=0.005)
+    # Another worker holding the write lock
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("begin immediate")
+
+    started = time.perf_counter()
+    with pytest.raises(RateLimitStoreUnavailable):
+        store.hit("user-1", "plan", 10, 60, 1, now=1000.0)
+    assert time.perf_counter() - started < 0.5
+
+    other.execute("rollback")
+    assert store.hit("user-1", "plan", 10, 60, 1, now=1000.0) == 0
+    other.close()
+
+
+def test_sqlite_stores_sharing_a_file_wait_for_each_other(tmp_path):
+    import threading
+
+    path = str(tmp_path / "rate_limits.db")
+    # One store per worker, each with its own connection
+    workers = [SQLiteRateLimitStore(path) for _ in range(2)]
+    errors = []
+
+    def spend_budget(store):
+        for _ in range(200):
+            try:
+                store.hit("user-1", "plan", 400, 60, 1, now=1000.0)
+            except RateLimitStoreUnavailable as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=spend_budget, args=(store,)) for store in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every check was counted, so the shared budget is spent exactly
+    assert errors == []
+    assert workers[0].hit("user-1", "plan", 400, 60, 1, now=1000.0) > 0
+
+    # A lock held for a few milliseconds is waited out
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute("begin immediate")
+    threading.Timer(0.01, other.execute, ("rollback",)).start()
+    assert workers[1].hit("user-2", "plan", 10, 60, 1, now=1000.0) == 0
+    other.close()
+    for store in workers:
+        store.close()
+
+
+@pytest.fixture
+def contended_sqlite_backend(tmp_path, monkeypatch):
+    """RATE_LIMIT_BACKEND=sqlite on a file whose write lock another connection holds."""
+    path = str(tmp_path / "rate_limits.db")
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "sqlite")
+    monkeypatch.setenv("RATE_LIMIT_SQLITE_PATH", path)
+    SQLiteRateLimitStore(path).close()
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("begin immediate")
+    yield
+    other.execute("rollback")
+    other.close()
+
+
+def test_middleware_fails_open_or_closed_when_the_store_is_busy(contended_sqlite_backend, client, monkeypatch):
+    # Let through to the auth check, which refuses the anonymous request
+    assert client.get("/recipes").status_code == 401
+
+    monkeypatch.setenv("RATE_LIMIT_FAIL_OPEN", "false")
+    get_settings.cache_clear()
+    refused = client.get("/recipes")
+    assert refused.status_code == 503
+    assert refused.headers["retry-after"] == "1"
+
+
+def test_costs_are_weighted(store):
+    write = RatePolicy("/recipes", "recipes", 20, 3600, 3)
+    for i in range(6):
+        assert check_rate_limit("user-1", write, now=1000.0) == (True, 0)
+    allowed, retry_after = check_rate_limit("user-1", write, now=1000.0)
+    assert not allowed
+    # Next window opens at 4600; 18 units carried over must fall to 17
+    assert retry_after == 3600 + 200 + 1
+    # A read still fits
+    assert check_rate_limit("user-1", RECIPES, now=1000.0) == (True, 0)
+
+
+def test_policies_follow_route_templates():
+    from apps.api.main import app
+
+    table = compile_policies(app.routes)
+    plan = table.lookup("POST", "/events/123/plan")
+    assert (plan.template, plan.budget, plan.cost) == ("/events/{event_id}/plan", "plan", 1)
+    assert table.lookup("POST", "/schedule/generate").budget == "schedule"
+    assert table.lookup("GET", "/events/123").cost == 1
+    assert table.lookup("PUT", "/events/123").cost == 3
+    assert table.lookup("POST", "/recipes/parse-text").template == "/recipes/parse-text"
+    assert table.lookup("GET", "/recipes/library/abc") is None
+    assert table.lookup("GET", "/health") is None
+    assert table.lookup("GET", "/nowhere").budget == "default"
+
+    overridden = compile_policies(app.routes, {"plan": (5, 60), "default": (100, 3600)}, {"POST /events/{event_id}/plan": ("plan", 2)})
+    assert overridden.lookup("POST", "/events/1/plan") == ("/events/{event_id}/plan", "plan", 5, 60, 2)
+    with pytest.raises(ValueError):
+        compile_policies(app.routes, {"default": (100, 3600)}, {"/health": ("missing", 1)})
@@ -0,0 +1,239 @@
+import asyncio
+
+import pytest
+
+from apps.api.lib.pagination import decode_cursor
+from apps.api.repositories import DuplicateKeyError
+from apps.api.repositories.memory import create_memory_repositories
+from apps.api.repositories.sqlite import SQLiteDatabase, create_sqlite_repositories
+from apps.api.services.station_load import backfill
+
+NORMALIZED = {
+    "id": "r1",
+    "title": "Roast Chicken",
+    "headcount": 4,
+    "ingredients": [{"name": "chicken", "quantity": 1, "unit": "whole"}],
+    "tasks": [{"id": "t1", "label": "Roast", "duration_minutes": 60, "station": "oven"}],
+}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repos(request):
+    if request.param == "memory":
+        yield create_memory_repositories()
+    else:
+        db = SQLiteDatabase(":memory:")
+        yield create_sqlite_repositories(db)
+        db.close()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _recipe(user_id: str, title: str = "Roast Chicken") -> dict:
+    return {
+        "user_id": user_id,
+        "title": title,
+        "category": "main",
+        "base_headcount": 4,
+        "method": "oven",
+        "source_type": "text",
+        "normalized": NORMALIZED,
+    }
+
+
+def test_profile_defaults_and_update(repos):
+    profile = run(repos.profiles.create({"email": "a@example.com"}))
+    assert profile["tier"] == "free"
+    assert profile["onboarding_completed"] is False
+
+    updated = run(repos.profiles.update(profile["id"], {"burner_count": 6, "stripe_customer_id": "cus_1"}))
+    assert updated["burner_count"] == 6
+    assert updated["updated_at"] >= profile["updated_at"]
+
+    assert run(repos.profiles.get(profile["id"], "burner_count")) == {"burner_count": 6}
+    assert run(repos.profiles.get_by_stripe_customer("cus_1"))["id"] == profile["id"]
+    assert run(repos.profiles.update("missing", {"burner_count": 1})) is None
+
+
+def test_recipes_are_scoped_to_owner(repos):
+    owner = run(repos.profiles.create({"email": "owner@example.com"}))["id"]
+    other = run(repos.profiles.create({"email": "other@example.com"}))["id"]
+    first = run(repos.recipes.create(_recipe(owner, "First")))
+    second = run(repos.recipes.create(_recipe(owner, "Second")))
+
+    assert second["normalized"] == NORMALIZED
+    assert second["day_before_ok"] is False
+    assert [r["title"] for r in run(repos.recipes.list_for_user(owner)).rows] == ["Second", "First"]
+    assert run(repos.recipes.list_for_user(other)).rows == []
+    assert run(repos.recipes.get(first["id"], other)) is None
+    assert run(repos.recipes.update(first["id"], other, {"title": "Stolen"})) is None
+
+    run(repos.recipes.delete(first["id"], other))
+    assert run(repos.recipes.exists(first["id"], owner))
+    run(repos.recipes.delete(first["id"], owner))
+    assert not run(repos.recipes.exists(first["id"], owner))
+
+
+def test_event_recipes_join_and_cascade(repos):
+    user_id = run(repos.profiles.create({"email": "host@example.com"}))["id"]
+    recipe = run(repos.recipes.create(_recipe(user_id)))
+    event = run(repos.events.create({"user_id": user_id, "name": "Dinner", "event_type": "event"}))
+
+    run(repos.event_recipes.attach({"event_id": event["id"], "recipe_id": recipe["id"], "target_headcount": 8}))
+    with pytest.raises(DuplicateKeyError):
+        run(repos.event_recipes.attach({"event_id": event["id"], "recipe_id": recipe["id"], "target_headcount": 8}))
+
+    attached = run(repos.event_recipes.list_for_event(event["id"], "normalized, base_headcount"))
+    assert len(attached) == 1
+    assert attached[0]["target_headcount"] == 8
+    assert attached[0]["is_primary"] is False
+    assert attached[0]["recipes"] == {"normalized": NORMALIZED, "base_headcount": 4}
+
+    run(repos.events.update(event["id"], user_id, {"public_token": "tok"}))
+    assert run(repos.events.get_by_public_token("tok"))["id"] == event["id"]
+
+    run(repos.recipes.delete(recipe["id"], user_id))
+    assert run(repos.event_recipes.list_for_event(event["id"], "title")) == []
+
+
+def test_library_filters_and_pages(repos):
+    for i in range(5):
+        run(repos.recipe_library.create({
+            "title": f"Soup {i}" if i % 2 else f"Cake {i}",
+            "category": "side" if i % 2 else "dessert",
+            "method": "stovetop",
+            "normalized": NORMALIZED,
+            "tags": ["easy"],
+        }))
+
+    page = run(repos.recipe_library.list(None, None, limit=2, with_total=True))
+    assert page.total == 5
+    assert [r["title"] for r in page.rows] == ["Cake 4", "Soup 3"]
+
+    page = run(repos.recipe_library.list(None, None, limit=2, after=decode_cursor(page.next_cursor)))
+    assert page.total is None
+    assert [r["title"] for r in page.rows] == ["Cake 2", "Soup 1"]
+
+    page = run(repos.recipe_library.list("side", "SOUP", limit=1, with_total=True))
+    assert page.total == 2
+    assert [r["title"] for r in page.rows] == ["Soup 3"]
+    page = run(repos.recipe_library.list("side", "SOUP", limit=1, after=decode_cursor(page.next_cursor)))
+    assert [r["title"] for r in page.rows] == ["Soup 1"]
+    assert page.rows[0]["tags"] == ["easy"]
+    assert page.next_cursor is None
+
+    ids = [r["id"] for r in run(repos.recipe_library.list(None, None, limit=2, columns="id, created_at")).rows]
+    fetched = run(repos.recipe_library.get_many(ids + ["missing"], "id, normalized"))
+    assert sorted(fetched, key=lambda r: r["id"]) == sorted(
+        ({"id": i, "normalized": NORMALIZED} for i in ids), key=lambda r: r["id"]
+    )
+    assert run(repos.recipe_library.get_many([])) == []
+
+
+def test_load_summary_backfill_and_list_by_load(repos):
+    owner = run(repos.profiles.create({"email": "owner@example.com"}))["id"]
+    recipe = run(repos.recipes.create(_recipe(owner)))
+    quick = {**NORMALIZED, "tasks": [{"id": "t1", "label": "Toss", "duration_minutes": 10, "station": "prep"}]}
+    salad = run(repos.recipe_library.create({"title": "Salad", "category": "side", "method": "no_cook", "normalized": quick}))
+    run(repos.recipe_library.create({"title": "Gratin", "category": "side", "method": "oven", "normalized": NORMALIZED}))
+
+    # Nothing is summarised until the backfill runs
+    assert run(repos.recipe_library.list_by_load("side", 120, 10)) == []
+    assert len(run(repos.recipes.list_missing_summary(10))) == 1
+    assert run(backfill(repos)) == 3
+    assert run(repos.recipes.list_missing_summary(10)) == []
+
+    stored = run(repos.recipes.get(recipe["id"], owner))
+    assert stored["station_minutes"] == {"oven": 60}
+    assert (stored["oven_minutes"], stored["critical_path_minutes"], stored["task_count"]) == (60, 60, 1)
+
+    rows = run(repos.recipe_library.list_by_load("side", 120, 10, "title, critical_path_minutes"))
+    assert rows == [
+        {"title": "Salad", "critical_path_minutes": 10},
+        {"title": "Gratin", "critical_path_minutes": 60},
+    ]
+    assert [r["title"] for r in run(repos.recipe_library.list_by_load("side", 30, 10, "title"))] == ["Salad"]
+    assert run(repos.recipe_library.update("missing", {"task_count": 1})) is None
+    assert run(repos.recipe_library.update(salad["id"], {"task_count": 2}))["task_count"] == 2
+
+
+def test_library_edits_clear_stale_load_summary_like_postgres(repos):
+    gratin = run(repos.recipe_library.create({"title": "Gratin", "category": "side", "method": "oven", "normalized": NORMALIZED}))
+    run(backfill(repos))
+    quick = {**NORMALIZED, "tasks": [{"id": "t1", "label": "Toss", "duration_minutes": 10, "station": "prep"}]}
+
+    # A new summary written with the new normalized JSON is kept, even if only station minutes change
+    run(repos.recipe_library.update(gratin["id"], {"normalized": quick, "station_minutes": {"prep": 60}}))
+    kept = run(repos.recipe_library.get(gratin["id"]))
+    assert (kept["station_minutes"], kept["critical_path_minutes"]) == ({"prep": 60}, 60)
+    # normalized changing on its own leaves the summary stale, so it is cleared
+    run(repos.recipe_library.update(gratin["id"], {"normalized": NORMALIZED}))
+    cleared = run(repos.recipe_library.get(gratin["id"]))
+    assert (cleared["station_minutes"], cleared["critical_path_minutes"]) == (None, None)
+
+
+def test_library_search_is_ranked_prefix_and_punctuation_safe(repos):
+    def normalized(*names):
+        return {**NORMALIZED, "ingredients": [{"name": n, "quantity": 1, "unit": "cup"} for n in names]}
+
+    run(repos.recipe_library.create({
+        "title": "Lemon Bars", "category": "dessert", "method": "oven",
+        "description": "Bright and tart", "normalized": normalized("lemon", "butter"),
+    }))
+    run(repos.recipe_library.create({
+        "title": "Roast Chicken", "category": "main", "method": "oven",
+        "description": "Finished with lemon", "normalized": normalized("chicken", "thyme"),
+    }))
+    run(repos.recipe_library.create({
+        "title": "Green Salad", "category": "side", "method": "no_cook",
+        "normalized": normalized("lettuce"), "tags": ["vegetarian"],
+    }))
+
+    page = run(repos.recipe_library.list(None, "lem", limit=10, with_total=True))
+    assert [r["title"] for r in page.rows] == ["Lemon Bars", "Roast Chicken"]
+    assert page.total == 2
+
+    punctuated = run(repos.recipe_library.list(None, "chick, thyme.", limit=10))
+    assert [r["title"] for r in punctuated.rows] == ["Roast Chicken"]
+    assert [r["title"] for r in run(repos.recipe_library.list(None, "veg", limit=10)).rows] == ["Green Salad"]
+    assert run(repos.recipe_library.list(None, "lemon lettuce", limit=10)).rows == []
+    assert run(repos.recipe_library.list("side", "lemon", limit=10)).rows == []
+
+    first = run(repos.recipe_library.list(None, "lemon", limit=1))
+    second = run(repos.recipe_library.list(None, "lemon", limit=1, after=decode_cursor(first.next_cursor)))
+    assert [r["title"] for r in first.rows + second.rows] == ["Lemon Bars", "Roast Chicken"]
+    assert second.next_cursor is None
+
+
+def test_keyset_pages_break_created_at_ties_by_id(repos):
+    user_id = run(repos.profiles.create({"email": "busy@example.com"}))["id"]
+    created_at = "2024-11-28T12:00:00+00:00"
+    for i in range(7):
+        run(repos.recipes.create({**_recipe(user_id, f"Recipe {i}"), "created_at": created_at}))
+
+    seen, after = [], None
+    while True:
+        page = run(repos.recipes.list_for_user(user_id, "id, created_at", limit=3, after=after))
+        seen += [r["id"] for r in page.rows]
+        if page.next_cursor is None:
+            break
+        after = decode_cursor(page.next_cursor)
+
+    assert seen == sorted(seen, reverse=True)
+    assert len(set(seen)) == 7
+
+
+def test_gift_codes_and_waitlist_unique_keys(repos):
+    gift = run(repos.gift_codes.create({"code": "CBM-ABCD-1234"}))
+    assert gift["status"] == "new" and gift["expires_at"]
+    assert run(repos.gift_codes.code_exists("CBM-ABCD-1234"))
+    with pytest.raises(DuplicateKeyError):
+        run(repos.gift_codes.create({"code": "CBM-ABCD-1234"}))
+    assert run(repos.gift_codes.update(gift["id"], {"status": "redeemed"}))["status"] == "redeemed"
+
+    run(repos.waitlist.create({"email": "fan@example.com"}))
+    updated = run(repos.waitlist.update_by_email("fan@example.com", {"wants_tips": True}))
+    assert updated["wants_tips"] is True
+    assert run(repos.waitlist.get_by_email("fan@example.com"))["wants_tips"] is True
@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from apps.api.models.recipes import Recipe, Ingredient, AtomicTask
-from apps.api.services.scheduler import build_schedule
+from apps.api.services.scheduler import build_schedule, check_capacity_issues
 
 
 def test_build_schedule_basic():
@@ -137,3 +137,42 @@ def test_build_schedule_multiple_recipes():
         for task in lane.tasks:
             assert task.end_time <= serve_time
 
+
+
+def test_build_schedule_large_input_lays_lanes_back_to_back():
+    """Lanes stay contiguous and warnings match check_capacity_issues on the output."""
+    stations = ["prep", "oven", "stove", "counter", "passive"]
+    recipes = [
+        Recipe(
+            id=f"recipe-{r}",
+            title="Recipe",
+            headcount=4,
+            ingredients=[],
+            tasks=[
+                AtomicTask(
+                    id=f"task-{r}-{i}",
+                    label="Task",
+                    duration_minutes=(r * 7 + i) % 30 + 1,
+                    station=stations[(r + i) % len(stations)],
+                    depends_on=[]
+                )
+                for i in range(50)
+            ],
+        )
+        for r in range(20)
+    ]
+    serve_time = datetime(2024, 1, 1, 19, 0)
+    profile = {"burner_count": 4}
+
+    schedule = build_schedule(recipes, serve_time, profile)
+
+    assert [lane.station for lane in schedule.lanes] == ["oven", "stove", "counter", "prep", "passive"]
+    assert sum(len(lane.tasks) for lane in schedule.lanes) == 1000
+    lanes = {lane.station: lane.tasks for lane in schedule.lanes}
+    earliest_cooking = min(lanes["oven"][0].start_time, lanes["stove"][0].start_time)
+    for station, tasks in lanes.items():
+        assert tasks[-1].end_time == (serve_time if station in ("oven", "stove") else earliest_cooking)
+        for current, next_task in zip(tasks, tasks[1:]):
+            assert current.end_time == next_task.start_time
+    assert sorted(schedule.warnings) == sorted(check_capacity_issues(schedule.lanes, serve_time, profile))
+    assert "too_many_projects" in schedule.warnings
@@ -0,0 +1,50 @@
+import json
+
+from apps.api.dependencies import get_settings
+
+from .test_api import _create_event_with_recipe
+
+
+def _server_timing(response) -> dict:
+    entries = {}
+    for entry in response.headers["server-timing"].split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+def test_sampled_plan_reports_phases(client, auth_headers, monkeypatch):
+    _, event = _create_event_with_recipe(client, auth_headers)
+
+    monkeypatch.setenv("SERVER_TIMING_SAMPLE_RATE", "0")
+    get_settings.cache_clear()
+    response = client.post(f"/events/{event['id']}/plan", headers=auth_headers)
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+    monkeypatch.setenv("SERVER_TIMING_SAMPLE_RATE", "1")
+    get_settings.cache_clear()
+    response = client.post(f"/events/{event['id']}/plan", headers=auth_headers)
+    assert response.status_code == 200
+    timing = _server_timing(response)
+    # The rate limiter and the auth dependency each check the token
+    assert timing["auth"]["desc"] == '"2x"'
+    assert {"rate_limit", "hydrate", "scale", "schedule", "serialize", "total"} <= set(timing)
+    assert float(timing["total"]["dur"]) >= float(timing["schedule"]["dur"])
+    assert "x-server-timing-detail" not in response.headers
+
+
+def test_debug_header_returns_spans(client, auth_headers, monkeypatch):
+    _, event = _create_event_with_recipe(client, auth_headers)
+    monkeypatch.setenv("SERVER_TIMING_SAMPLE_RATE", "0")
+    monkeypatch.setenv("SERVER_TIMING_DEBUG", "true")
+    get_settings.cache_clear()
+
+    response = client.post(
+        f"/events/{event['id']}/plan", headers={**auth_headers, "X-Debug-Timing": "1"}
+    )
+    assert response.status_code == 200
+    spans = json.loads(response.headers["x-server-timing-detail"])
+    assert [span["phase"] for span in spans] == ["auth", "rate_limit", "auth", "hydrate", "scale", "schedule", "serialize"]
+    assert all(span["ms"] >= 0 and span["start_ms"] >= 0 for span in spans)
+    assert spans == sorted(spans, key=lambda span: span["start_ms"])
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from apps.api.dependencies import get_settings
+from apps.api.repositories.memory import create_memory_repositories
+from apps.api.services.similarity import SimilarityIndex, build_index, ingredient_term
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _library_recipe(title: str, category: str, *ingredients: str) -> dict:
+    return {
+        "title": title,
+        "category": category,
+        "method": "oven",
+        "normalized": {
+            "title": title,
+            "headcount": 4,
+            "ingredients": [{"name": name, "quantity": 1, "unit": "cup"} for name in ingredients],
+            "tasks": [],
+        },
+    }
+
+
+def _seeded(repos, path):
+    created = {}
+    for recipe in (
+        _library_recipe("Roast Chicken", "main", "chicken", "lemon", "garlic", "thyme"),
+        _library_recipe("Lemon Chicken", "main", "Chicken", "Lemons", "garlic"),
+        _library_recipe("Beef Stew", "main", "beef", "carrots", "onion"),
+        _library_recipe("Garlic Green Beans", "side", "green beans", "garlic", "lemon"),
+        _library_recipe("Carrot Salad", "side", "carrots", "onion", "vinegar"),
+        _library_recipe("Lemon Bars", "dessert", "lemons", "butter", "sugar"),
+    ):
+        row = run(repos.recipe_library.create(recipe))
+        created[row["title"]] = row["id"]
+    assert run(build_index(repos, str(path))) == len(created)
+    return created
+
+
+def test_ingredient_term_normalises_names():
+    assert ingredient_term("Green Beans,") == "green bean"
+    assert ingredient_term("Lemons") == "lemon"
+    assert ingredient_term("swiss") == "swiss"
+    assert ingredient_term("  ") == ""
+
+
+def test_similar_ranks_by_ingredient_overlap(tmp_path):
+    ids = _seeded(create_memory_repositories(), tmp_path / "index")
+    index = SimilarityIndex.load(str(tmp_path / "index"))
+
+    results = index.similar([ids["Roast Chicken"], "missing"], k=2)
+    assert [rid for rid, _ in results[ids["Roast Chicken"]]] == [ids["Lemon Chicken"], ids["Garlic Green Beans"]]
+    assert results["missing"] == []
+
+    scores = [score for _, score in index.similar([ids["Beef Stew"]], k=10)[ids["Beef Stew"]]]
+    assert scores == sorted(scores, reverse=True)
+    assert ids["Beef Stew"] not in dict(index.similar([ids["Beef Stew"]], k=10)[ids["Beef Stew"]])
+    assert all(0 < score <= 1 for score in scores)
+
+
+def test_complements_only_suggest_missing_courses(tmp_path):
+    ids = _seeded(create_memory_repositories(), tmp_path / "index")
+    index = SimilarityIndex.load(str(tmp_path / "index"))
+
+    suggestions = index.complements([ids["Roast Chicken"]], k=1)
+    assert set(suggestions) == {"side", "dessert"}
+    assert suggestions["side"][0][0] == ids["Garlic Green Beans"]
+    assert suggestions["dessert"][0][0] == ids["Lemon Bars"]
+
+
+def test_similar_endpoint(client, repos, tmp_path, monkeypatch):
+    assert client.get("/recipes/library/complements?ids=x").status_code == 503
+
+    monkeypatch.setenv("SIMILARITY_INDEX_PATH", str(tmp_path / "index"))
+    get_settings.cache_clear()
+    ids = _seeded(repos, tmp_path / "index")
+
+    response = client.get(f"/recipes/library/{ids['Roast Chicken']}/similar?k=1")
+    assert response.status_code == 200
+    [similar] = response.json()["recipes"]
+    assert similar["recipe"]["title"] == "Lemon Chicken"
+    assert similar["recipe"]["normalized"] is None
+
+    assert client.get("/recipes/library/missing/similar").status_code == 404
+
+    complements = client.get(f"/recipes/library/complements?ids={ids['Beef Stew']}&k=1").json()
+    assert complements["suggestions"]["side"][0]["recipe"]["title"] == "Carrot Salad"